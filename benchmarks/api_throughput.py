@@ -0,0 +1,61 @@
+"""
+Throughput of /api/calculate (one state per request) against
+/api/calculate/batch (many states per request), measured in-process with
+the Flask test client so no server or network is involved.
+
+    python benchmarks/api_throughput.py --states 2000 --batch-size 500
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'thermo-calculator'))
+
+import numpy as np
+
+import app as flask_app
+
+
+def make_states(n, seed=0):
+    """Random water states spread over the saturation temperature range."""
+    rng = np.random.default_rng(seed)
+    temperatures = rng.uniform(5, 350, n)
+    enthalpies = rng.uniform(0, 3200, n)
+    return [{
+        'substance': 'water',
+        'firstProperty': 'temperature',
+        'firstValue': float(t),
+        'secondProperty': 'enthalpy',
+        'secondValue': float(h)
+    } for t, h in zip(temperatures, enthalpies)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--states', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    client = flask_app.app.test_client()
+    states = make_states(args.states)
+
+    start = time.perf_counter()
+    for state in states:
+        client.post('/api/calculate', json=state)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, len(states), args.batch_size):
+        client.post('/api/calculate/batch', json=states[i:i + args.batch_size])
+    batch = time.perf_counter() - start
+
+    print(f"{'endpoint':<24} {'states':>8} {'seconds':>9} {'states/s':>10}")
+    print(f"{'/api/calculate':<24} {len(states):>8} {single:>9.3f} {len(states) / single:>10.0f}")
+    print(f"{'/api/calculate/batch':<24} {len(states):>8} {batch:>9.3f} {len(states) / batch:>10.0f}")
+    print(f"batch speed-up: {single / batch:.1f}x (batch size {args.batch_size})")
+
+
+if __name__ == '__main__':
+    main()
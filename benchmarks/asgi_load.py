@@ -0,0 +1,110 @@
+"""
+Load test of the coalescing ASGI service (thermo-calculator/asgi.py).
+
+A local stand-in client calls the ASGI application in-process (no server
+or sockets), with --clients concurrent clients each sending --requests
+sequential /api/calculate requests. Runs once with coalescing disabled
+(every request evaluated on its own) and once with micro-batching, and
+reports requests/s and p50/p99 latency for both.
+
+    python benchmarks/asgi_load.py --clients 200 --requests 20 --window-ms 2 --max-batch 256
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'thermo-calculator'))
+
+import numpy as np
+
+import asgi
+
+
+async def post(application, path, payload):
+    """Stand-in HTTP client: drive one request through the ASGI callable."""
+    body = json.dumps(payload).encode()
+    scope = {'type': 'http', 'method': 'POST', 'path': path, 'headers': [(b'content-type', b'application/json')]}
+    sent = False
+    response = {}
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {'type': 'http.disconnect'}
+        sent = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            response['body'] = message.get('body', b'')
+
+    await application(scope, receive, send)
+    return response['status'], json.loads(response['body'])
+
+
+def make_states(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{
+        'substance': 'water',
+        'firstProperty': 'temperature',
+        'firstValue': float(t),
+        'secondProperty': 'enthalpy',
+        'secondValue': float(h)
+    } for t, h in zip(rng.uniform(5, 350, n), rng.uniform(0, 3200, n))]
+
+
+async def run_load(application, clients, requests):
+    states = make_states(clients * requests)
+    latencies = []
+
+    async def client(k):
+        for state in states[k * requests:(k + 1) * requests]:
+            start = time.perf_counter()
+            status, result = await post(application, '/api/calculate', state)
+            latencies.append(time.perf_counter() - start)
+            if status != 200 or result.get('status') != 'success':
+                raise RuntimeError(f"Request failed: {result}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(k) for k in range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies)
+    return {
+        'requests': latencies.shape[0],
+        'seconds': elapsed,
+        'requests_per_s': latencies.shape[0] / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50) * 1e3),
+        'p99_ms': float(np.percentile(latencies, 99) * 1e3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=20, help="requests per client")
+    parser.add_argument('--window-ms', type=float, default=2.0)
+    parser.add_argument('--max-batch', type=int, default=256)
+    args = parser.parse_args()
+
+    modes = {
+        'no coalescing': asgi.make_app(max_batch=1, window=0),
+        f"window {args.window_ms:g} ms / max {args.max_batch}": asgi.make_app(max_batch=args.max_batch,
+                                                                             window=args.window_ms / 1000.0)
+    }
+    print(f"{'mode':<28} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'mean batch':>11}")
+    for mode, application in modes.items():
+        result = asyncio.run(run_load(application, args.clients, args.requests))
+        stats = application.batcher.stats()
+        application.batcher.close()
+        print(f"{mode:<28} {result['requests']:>9} {result['requests_per_s']:>9.0f} "
+              f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {stats['mean_batch_size']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Per-worker memory with private vs memory-mapped table stores.
+
+Starts a pool of worker processes; each one loads every compiled table
+(saturation, superheated and compressed liquid), touches all of the
+arrays and reports its RSS before and after. In copy mode the arrays land
+in each worker's private (anonymous) memory; in mmap mode they are
+file-backed pages shared by all workers.
+
+    python benchmarks/shared_store_rss.py --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import thermo_calc_python as thermo
+from thermo_cache import process_rss
+
+
+def table_arrays(table):
+    """The arrays backing a compiled table (views such as `key` are skipped)."""
+    for slot in type(table).__slots__:
+        value = getattr(table, slot, None)
+        if isinstance(value, np.ndarray) and slot != 'key':
+            yield value
+
+
+def worker(mmap):
+    before = process_rss()
+    store = thermo.load_all_data(mmap=mmap)
+    store.preload()
+    nbytes = 0
+    checksum = 0.0
+    for name in store:
+        for array in table_arrays(store[name]):
+            checksum += float(np.nansum(array))
+            nbytes += array.nbytes
+    after = process_rss()
+    return os.getpid(), before, after, nbytes
+
+
+def run(mode, workers):
+    ctx = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+    with ctx.Pool(workers) as pool:
+        results = pool.map(worker, [mode == 'mmap'] * workers)
+
+    print(f"\n{mode} store, {workers} workers")
+    print(f"{'pid':>8} {'table MB':>9} {'RSS before':>11} {'RSS after':>10} {'anon +MB':>9} {'file +MB':>9}")
+    for pid, before, after, nbytes in results:
+        if before is None:
+            print(f"{pid:>8} {nbytes / 2**20:>9.2f}  (RSS not available on this platform)")
+            continue
+        print(f"{pid:>8} {nbytes / 2**20:>9.2f} {before['total'] / 2**20:>11.1f} {after['total'] / 2**20:>10.1f} "
+              f"{(after['anon'] - before['anon']) / 2**20:>9.2f} {(after['file'] - before['file']) / 2**20:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--mode', choices=['copy', 'mmap', 'both'], default='both')
+    args = parser.parse_args()
+
+    # Build the cache once up front so workers never compile
+    thermo.load_all_data()
+    for mode in (['copy', 'mmap'] if args.mode == 'both' else [args.mode]):
+        run(mode, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Memory allocated per evaluated state, measured with tracemalloc.
+
+For one reachable water state per branch (enthalpy at 100 °C, or at 50 bar
+for the compressed liquid) the scalar path is called --states times and the
+results are kept, then the batch path evaluates the same states with one
+call per first property. Reports per state:
+
+    retained    bytes still allocated for a kept result
+    blocks      memory blocks those bytes are spread over
+    peak        largest transient allocation of a single call (scalar only)
+
+Scalar paths are determine_state_and_properties (5-tuple with a details
+string and a properties dict) and, where present, determine_state
+(StateResult record); batch paths are evaluate_states into a dict of arrays
+and, where present, into a STATE_DTYPE structured array.
+
+    python benchmarks/state_allocations.py --states 10000
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import thermo_calc_python as thermo
+from thermo_tables import PROPERTY_INDEX, SAT_LIQUID, SAT_VAPOR
+
+
+# Saturation table each first property is read from
+TABLES = {'temperature': 'water_temp_table', 'pressure': 'water_pressure_table'}
+
+
+def branch_cases(data_dict):
+    """(first property, first value, enthalpy) of one water state per branch."""
+    row = thermo.get_row_by_property(data_dict['water_temp_table'], 'temperature', 100.0)
+    k = PROPERTY_INDEX['enthalpy']
+    hf = float(row.values[SAT_LIQUID[k]])
+    hg = float(row.values[SAT_VAPOR[k]])
+    return {
+        # No CL pressure reaches below hf at 100 °C; at 50 bar hf = 1154.6 kJ/kg
+        "compressed_liquid": ('pressure', 50.0, 500.0),
+        "saturated_liquid": ('temperature', 100.0, hf),
+        "saturated_mixture": ('temperature', 100.0, 0.5 * (hf + hg)),
+        "saturated_vapor": ('temperature', 100.0, hg),
+        # At 100 °C the grids only reach a few kJ/kg above saturation
+        "superheated_vapor": ('temperature', 100.0, hg + 5.0)
+    }
+
+
+def branch_rows(data_dict, cases):
+    """Saturation row of every case; raises ValueError for a state the tables do not reach."""
+    rows = {}
+    for branch, (first_property, first_value, h) in cases.items():
+        row = thermo.get_row_by_property(data_dict[TABLES[first_property]], first_property, first_value)
+        _, _, properties, temperature, pressure = thermo.determine_state_and_properties(
+            row, 'enthalpy', h, data_dict)
+        if not np.isfinite([temperature, pressure, *properties.values()]).all():
+            raise ValueError(f"{branch} case {first_property} = {first_value}, h = {h} is not in the tables")
+        rows[branch] = row
+    return rows
+
+
+def retained(make, count):
+    """Bytes and blocks per item held by `count` results of make(i)."""
+    gc.collect()
+    before = tracemalloc.take_snapshot()
+    results = [make(i) for i in range(count)]
+    after = tracemalloc.take_snapshot()
+    stats = after.compare_to(before, 'filename')
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    # The list holding the results is not part of a result
+    size -= sys.getsizeof(results)
+    blocks -= 1
+    del results
+    return size / count, blocks / count
+
+
+def peak(call, count):
+    """Largest transient allocation of one call, in bytes."""
+    worst = 0
+    for _ in range(count):
+        gc.collect()
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        result = call()
+        worst = max(worst, tracemalloc.get_traced_memory()[1] - start)
+        del result
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--states', type=int, default=10000)
+    parser.add_argument('--peak-calls', type=int, default=200)
+    args = parser.parse_args()
+
+    data_dict = thermo.load_all_data()
+    cases = branch_cases(data_dict)
+    rows = branch_rows(data_dict, cases)
+
+    scalar = {'determine_state_and_properties': thermo.determine_state_and_properties}
+    if hasattr(thermo, 'determine_state'):
+        scalar['determine_state'] = thermo.determine_state
+
+    tracemalloc.start()
+    print(f"{'path':<34} {'branch':<20} {'retained B':>11} {'blocks':>7} {'peak B':>8}")
+    for name, function in scalar.items():
+        for branch, (_, _, h) in cases.items():
+            row = rows[branch]
+            # Warm up table compilation and solver caches outside the measurement
+            function(row, 'enthalpy', h, data_dict)
+            # A distinct float per state, as real inputs would be
+            values = [h + 1e-9 * (i % 7) for i in range(args.states)]
+            size, blocks = retained(lambda i: function(row, 'enthalpy', values[i], data_dict), args.states)
+            worst = peak(lambda: function(row, 'enthalpy', h, data_dict), args.peak_calls)
+            print(f"{name:<34} {branch:<20} {size:>11.1f} {blocks:>7.2f} {worst:>8}")
+
+    # The branches in equal shares, one contiguous block per first property
+    ordered = sorted(cases.values(), key=lambda case: case[0])
+    share = np.sort(np.resize(np.arange(len(ordered)), args.states))
+    first = np.array([ordered[i][1] for i in share])
+    second = np.array([ordered[i][2] for i in share])
+    blocks = []
+    for first_property in TABLES:
+        indices = np.flatnonzero([ordered[i][0] == first_property for i in share])
+        if indices.size:
+            blocks.append((first_property, indices[0], indices[-1] + 1))
+
+    def evaluate(out=None):
+        return [thermo.evaluate_states(data_dict, 'water', first_property, first[start:stop], 'enthalpy',
+                                       second[start:stop], out=None if out is None else out[start:stop])
+                for first_property, start, stop in blocks]
+
+    batch = {'evaluate_states -> dict of arrays': evaluate}
+    if hasattr(thermo, 'STATE_DTYPE'):
+        batch['evaluate_states -> STATE_DTYPE'] = lambda: evaluate(np.empty(args.states, dtype=thermo.STATE_DTYPE))
+    for name, function in batch.items():
+        function()
+        gc.collect()
+        start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = function()
+        current, highest = tracemalloc.get_traced_memory()
+        print(f"{name:<34} {'all (batch)':<20} {(current - start) / args.states:>11.1f} "
+              f"{'':>7} {(highest - start) / args.states:>8.1f}")
+        del result
+    tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""
+Benchmark suite for the lookup engine.
+
+Covers load_all_data cold and warm start, get_row_by_property for every
+saturation table, each branch of determine_state_and_properties and
+determine_state, get_property_value on the superheated grids and
+evaluate_states batch throughput. Results are written as JSON so runs on different commits can
+be compared; --compare flags every benchmark that got slower than the
+baseline by more than --threshold and exits with status 1.
+
+    python benchmarks/suite.py --output before.json
+    python benchmarks/suite.py --output after.json --compare before.json --threshold 0.10
+
+--quick skips the 1e7-point batch (evaluated in 1e6-point chunks).
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import cycle
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import thermo_calc_python as thermo
+from thermo_tables import PROPERTY_INDEX, SAT_LIQUID, SAT_VAPOR
+
+# Largest batch passed to evaluate_states at once; bigger runs are chunked
+BATCH_CHUNK = 1_000_000
+
+
+def measure(func, rounds=5, min_time=0.2):
+    """
+    Time `func` (which takes no arguments). The number of calls per round
+    is calibrated so a round lasts about `min_time`; returns seconds per
+    call for each round.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed * 1.2))
+
+    times = [elapsed / number]
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return times
+
+
+def summarize(times, items=1):
+    median = statistics.median(times)
+    return {
+        "median_s": median,
+        "min_s": min(times),
+        "max_s": max(times),
+        "rounds": len(times),
+        "items": items,
+        "items_per_s": items / median if median else None
+    }
+
+
+class Suite:
+    def __init__(self, rounds):
+        self.rounds = rounds
+        self.results = {}
+
+    def add(self, name, func, items=1, rounds=None, min_time=0.2):
+        times = measure(func, rounds=rounds or self.rounds, min_time=min_time)
+        self.results[name] = summarize(times, items)
+        result = self.results[name]
+        print(f"{name:<58} {result['median_s'] * 1e6:>12.2f} us", file=sys.stderr)
+
+
+def bench_load(suite):
+    original = thermo.cache_dir
+
+    def cold():
+        directory = tempfile.mkdtemp(prefix='thermo_cache_')
+        try:
+            thermo.cache_dir = directory
+            thermo.load_all_data().preload()
+        finally:
+            thermo.cache_dir = original
+            shutil.rmtree(directory, ignore_errors=True)
+
+    suite.add("load_all_data[cold]", cold, rounds=3, min_time=0)
+    thermo.load_all_data()
+    suite.add("load_all_data[warm]", lambda: thermo.load_all_data().preload(), rounds=5, min_time=0)
+
+
+def bench_rows(suite, data_dict):
+    rng = np.random.default_rng(0)
+    for name in sorted(data_dict):
+        if not name.endswith(('_temp_table', '_pressure_table')):
+            continue
+        table = data_dict[name]
+        property_type = 'pressure' if name.endswith('_pressure_table') else 'temperature'
+        values = cycle(rng.uniform(table.key[0], table.key[-1], 1024).tolist())
+        suite.add(f"get_row_by_property[{name}]",
+                  lambda: thermo.get_row_by_property(table, property_type, next(values)))
+
+
+def bench_branches(suite, data_dict):
+    """
+    One reachable water state per branch: enthalpy at 100 °C, or at 50 bar
+    for the compressed liquid (no CL pressure reaches below hf at 100 °C).
+    """
+    row = thermo.get_row_by_property(data_dict['water_temp_table'], 'temperature', 100.0)
+    k = PROPERTY_INDEX['enthalpy']
+    hf = float(row.values[SAT_LIQUID[k]])
+    hg = float(row.values[SAT_VAPOR[k]])
+    cases = {
+        "compressed_liquid": (thermo.get_row_by_property(data_dict['water_pressure_table'], 'pressure', 50.0),
+                              500.0),
+        "saturated_liquid": (row, hf),
+        "saturated_mixture": (row, 0.5 * (hf + hg)),
+        "saturated_vapor": (row, hg),
+        # At 100 °C the grids only reach a few kJ/kg above saturation
+        "superheated_vapor": (row, hg + 5.0)
+    }
+    for branch, (row, h) in cases.items():
+        # Time the lookup, not the early exit for a state outside the tables
+        _, _, properties, temperature, pressure = thermo.determine_state_and_properties(
+            row, 'enthalpy', h, data_dict)
+        if not np.isfinite([temperature, pressure, *properties.values()]).all():
+            raise ValueError(f"{branch} case h = {h} is not in the tables")
+        suite.add(f"determine_state_and_properties[{branch}]",
+                  lambda row=row, h=h: thermo.determine_state_and_properties(row, 'enthalpy', h, data_dict))
+        suite.add(f"determine_state[{branch}]",
+                  lambda row=row, h=h: thermo.determine_state(row, 'enthalpy', h, data_dict))
+
+
+def bench_superheated(suite, data_dict):
+    rng = np.random.default_rng(1)
+    for name in sorted(data_dict):
+        if not name.endswith('_shv_table'):
+            continue
+        grid = data_dict[name]
+        # Points on the tabulated side of every block, so no lookup raises
+        i = rng.integers(0, grid.pressures.shape[0], 1024)
+        pressures = grid.pressures[i]
+        temperatures = grid.t_min[i] + rng.uniform(0, 1, 1024) * (grid.t_max[i] - grid.t_min[i])
+        points = cycle(np.stack([temperatures, pressures], axis=1).tolist())
+
+        def lookup(grid=grid, points=points):
+            temperature, pressure = next(points)
+            thermo.get_property_value(grid, temperature, pressure)
+
+        suite.add(f"get_property_value[{name}]", lookup)
+
+
+def bench_batches(suite, data_dict, sizes):
+    rng = np.random.default_rng(2)
+    for n in sizes:
+        chunk = min(n, BATCH_CHUNK)
+        temperatures = rng.uniform(5, 370, chunk)
+        enthalpies = rng.uniform(0, 3500, chunk)
+
+        def run(n=n, chunk=chunk, temperatures=temperatures, enthalpies=enthalpies):
+            for _ in range(n // chunk):
+                thermo.evaluate_states(data_dict, 'water', 'temperature', temperatures, 'enthalpy', enthalpies)
+
+        rounds = 3 if n >= 10 * BATCH_CHUNK else None
+        suite.add(f"evaluate_states[n={n:.0e}]", run, items=n, rounds=rounds, min_time=0 if rounds else 0.2)
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the ratio to the baseline for every shared benchmark and return the regressions."""
+    regressions = []
+    print(f"\n{'benchmark':<58} {'baseline':>12} {'current':>12} {'ratio':>7}", file=sys.stderr)
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["median_s"]
+        ratio = result["median_s"] / before if before else float('inf')
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<58} {before * 1e6:>10.2f}us {result['median_s'] * 1e6:>10.2f}us {ratio:>7.2f}{flag}",
+              file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', help="write the results to this JSON file (default: stdout)")
+    parser.add_argument('--compare', help="baseline JSON file from an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="relative slow-down counted as a regression (default 0.10)")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help="skip the 1e7-point batch")
+    args = parser.parse_args()
+
+    suite = Suite(args.rounds)
+    bench_load(suite)
+    data_dict = thermo.load_all_data().preload()
+    bench_rows(suite, data_dict)
+    bench_branches(suite, data_dict)
+    bench_superheated(suite, data_dict)
+    bench_batches(suite, data_dict, [10 ** 3, 10 ** 5] if args.quick else [10 ** 3, 10 ** 5, 10 ** 7])
+
+    report = {"environment": environment(), "threshold": args.threshold, "results": suite.results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(suite.results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than baseline by more than "
+                  f"{args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
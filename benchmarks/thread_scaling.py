@@ -0,0 +1,66 @@
+"""
+Thread scaling of the batch lookup engine (thermo_parallel).
+
+Evaluates the same random batch with 1, 2, ... N threads writing into one
+preallocated result and reports states/s and the speedup over one thread.
+Every run is checked against the single-threaded result.
+
+    python benchmarks/thread_scaling.py --states 2000000 --max-threads 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import thermo_calc_python as thermo
+from thermo_calc_python import STATE_KEYS, allocate_states
+from thermo_parallel import CHUNK_SIZE, parallel_evaluate_states
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--states', type=int, default=2_000_000)
+    parser.add_argument('--max-threads', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--substance', default='water')
+    args = parser.parse_args()
+
+    data_dict = thermo.load_all_data()
+    rng = np.random.default_rng(0)
+    temperature = rng.uniform(5, 350, args.states)
+    enthalpy = rng.uniform(0, 3200, args.states)
+
+    reference = parallel_evaluate_states(data_dict, args.substance, 'temperature', temperature, 'enthalpy',
+                                         enthalpy, threads=1, chunk_size=args.chunk_size)
+    out = allocate_states(args.states)
+
+    print(f"{args.states} states, chunks of {args.chunk_size}, {os.cpu_count()} CPUs")
+    print(f"{'threads':>7} {'seconds':>9} {'states/s':>12} {'speedup':>8}")
+    baseline = None
+    for threads in range(1, args.max_threads + 1):
+        seconds = best_time(lambda: parallel_evaluate_states(
+            data_dict, args.substance, 'temperature', temperature, 'enthalpy', enthalpy,
+            threads=threads, chunk_size=args.chunk_size, out=out), args.repeat)
+        for key in STATE_KEYS:
+            if not np.array_equal(out[key], reference[key], equal_nan=True):
+                raise RuntimeError(f"{threads} threads: '{key}' differs from the single-threaded result")
+        baseline = baseline or seconds
+        print(f"{threads:>7} {seconds:>9.3f} {args.states / seconds:>12.0f} {baseline / seconds:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import thermo_calc_python as thermo
+
+
+@pytest.fixture(scope='session')
+def data_dict():
+    tables = thermo.load_all_data()
+    assert tables is not None, "could not load the thermodynamic tables"
+    return tables
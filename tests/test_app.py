@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_cors')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'thermo-calculator'))
+
+import app
+
+
+def state(substance='water', first='temperature', first_value=100.0, second='enthalpy', second_value=1000.0):
+    return {'substance': substance, 'firstProperty': first, 'firstValue': first_value,
+            'secondProperty': second, 'secondValue': second_value}
+
+
+@pytest.mark.parametrize('first, second', [
+    (None, 'enthalpy'), (['temperature'], 'enthalpy'), ('enthalpy', 'entropy'),
+    ('temperature', 7), ('temperature', {'a': 1}), ('temperature', 'density'), ('pressure', 'pressure')
+])
+def test_parse_state_request_rejects_unknown_property_names(first, second):
+    with pytest.raises(ValueError):
+        app.parse_state_request(state(first=first, second=second))
+
+
+@pytest.mark.parametrize('first, first_value, second, second_value', [
+    ('temperature', 300.0, 'pressure', 10.0), ('pressure', 10.0, 'temperature', 300.0)
+])
+def test_temperature_and_pressure_resolve_a_single_phase_state(first, first_value, second, second_value):
+    result = app.calculate_states([('water', first, first_value, second, second_value)])[0]
+    assert result['status'] == 'success'
+    assert result['state'] == 'Superheated Vapor'
+    properties = result['saturationProperties']
+    assert properties['Temperature (°C)'] == 300.0 and properties['Pressure (bar)'] == 10.0
+    assert properties['Enthalpy (kJ/kg)'] == pytest.approx(3051.5, rel=1e-3)
+
+
+def test_calculate_states_isolates_failing_groups():
+    results = app.calculate_states([
+        ('water', 'temperature', 100.0, 'enthalpy', 1000.0),
+        ('unobtainium', 'temperature', 100.0, 'enthalpy', 1000.0),
+        ('water', 'temperature', 120.0, 'enthalpy', 1000.0)
+    ])
+    assert [result['status'] for result in results] == ['success', 'error', 'success']
+    assert results[1]['message'] == "No data table for unobtainium with temperature"
+
+
+def test_batch_endpoint_reports_bad_items_only():
+    client = app.app.test_client()
+    response = client.post('/api/calculate/batch', json=[
+        state(), state(first=['temperature']), state(second='density'), state(second_value=2000.0)
+    ])
+    results = response.get_json()
+    assert [result['status'] for result in results] == ['success', 'error', 'error', 'success']
+
+
+def test_diagram_rejects_too_many_levels():
+    client = app.app.test_client()
+    cached = len(app.diagrams._entries)
+    levels = ','.join(str(10.0 + i) for i in range(app.MAX_DIAGRAM_LINES + 1))
+    response = client.get(f'/api/diagram/water?isobars={levels}')
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+    assert len(app.diagrams._entries) == cached
+
+
+def test_ndjson_batch_reports_malformed_lines_only():
+    client = app.app.test_client()
+    body = '\n'.join([json.dumps(state()), '{bad', '', json.dumps(state(second_value=2000.0))]) + '\n'
+    response = client.post('/api/calculate/batch', data=body, content_type='application/x-ndjson')
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [result['status'] for result in results] == ['success', 'error', 'success']
+    assert results[1]['message'].startswith("Invalid state request")
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_cors')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'thermo-calculator'))
+
+from asgi import MicroBatcher
+
+
+def evaluate(items):
+    if 'bad' in items:
+        raise RuntimeError("bad item in batch")
+    return [item.upper() for item in items]
+
+
+def validate(item):
+    if not isinstance(item, str):
+        raise ValueError(f"not a string: {item!r}")
+    return item
+
+
+async def submit_all(batcher, items):
+    return await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+
+
+def test_failing_item_does_not_fail_its_batch():
+    batcher = MicroBatcher(evaluate, max_batch=16, window=0.01)
+    try:
+        results = asyncio.run(submit_all(batcher, ['a', 'bad', 'b']))
+    finally:
+        batcher.close()
+    assert results[0] == 'A' and results[2] == 'B'
+    assert isinstance(results[1], RuntimeError)
+    assert batcher.batches == 1
+
+
+def test_invalid_item_is_rejected_before_queueing():
+    batcher = MicroBatcher(evaluate, max_batch=16, window=0.01, validate=validate)
+    try:
+        results = asyncio.run(submit_all(batcher, ['a', 42, 'b']))
+    finally:
+        batcher.close()
+    assert results[0] == 'A' and results[2] == 'B'
+    assert isinstance(results[1], ValueError)
+    assert batcher.items == 2
+
+
+def test_batch_tasks_are_referenced_until_done():
+    batcher = MicroBatcher(evaluate, max_batch=2, window=0.01)
+
+    async def run():
+        pending = asyncio.gather(batcher.submit('a'), batcher.submit('b'))
+        await asyncio.sleep(0)
+        assert len(batcher._tasks) == 1
+        return await pending
+
+    try:
+        assert asyncio.run(run()) == ['A', 'B']
+        assert not batcher._tasks
+    finally:
+        batcher.close()
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import thermo_bulk
+
+CHUNKS = [
+    # The first chunk has only integer values, the next one floats
+    pd.DataFrame({'substance': ['water', 'water'], 'first_property': ['temperature', 'temperature'],
+                  'first_value': [100, 120], 'second_property': ['enthalpy', 'enthalpy'],
+                  'second_value': [1000, 2000]}),
+    pd.DataFrame({'substance': ['water', 'water'], 'first_property': ['temperature', 'temperature'],
+                  'first_value': [100.5, 120.5], 'second_property': ['enthalpy', 'enthalpy'],
+                  'second_value': [1000.5, 2000.5]})
+]
+
+
+def test_normalized_values_are_float64():
+    for chunk in CHUNKS:
+        normalized = thermo_bulk.normalize_chunk(chunk.copy(), {})
+        assert normalized['first_value'].dtype == np.float64
+        assert normalized['second_value'].dtype == np.float64
+
+
+def test_parquet_schema_is_stable_across_chunks(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    pytest.importorskip('pyarrow.parquet')
+    source = tmp_path / 'states.csv'
+    pd.concat(CHUNKS).to_csv(source, index=False)
+    target = tmp_path / 'results.parquet'
+
+    rows, _ = thermo_bulk.run(str(source), str(target), chunksize=2)
+    assert rows == 4
+    parquet_file = pa.parquet.ParquetFile(target)
+    assert parquet_file.num_row_groups == 2
+    assert parquet_file.schema_arrow.field('first_value').type == pa.float64()
+    assert parquet_file.schema_arrow.field('second_value').type == pa.float64()
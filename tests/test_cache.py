@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import thermo_calc_python as thermo
+from thermo_cache import TableStore, build_cache, compile_saturation_sheet, read_manifest
+
+SHEETS = ['Sat Water-Temp Table', 'R-134a-Temp Table']
+
+
+@pytest.fixture(scope='module')
+def raw_sheets():
+    xls = pd.ExcelFile(thermo.excel_file)
+    return {sheet: pd.read_excel(xls, sheet_name=sheet, header=None) for sheet in SHEETS}
+
+
+def write_workbook(path, sheets):
+    with pd.ExcelWriter(path) as writer:
+        for sheet, raw in sheets.items():
+            raw.to_excel(writer, sheet_name=sheet, header=False, index=False)
+    # A rewrite within the mtime resolution must still count as a change
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+@pytest.fixture
+def workbook(tmp_path, raw_sheets):
+    path = str(tmp_path / 'saturation.xlsx')
+    write_workbook(path, raw_sheets)
+    compiled = []
+
+    def compile_sheet(xls, sheet_name):
+        compiled.append(sheet_name)
+        return compile_saturation_sheet(xls, sheet_name)
+
+    return path, {path: compile_sheet}, compiled, str(tmp_path / 'cache')
+
+
+def test_only_the_edited_sheet_is_recompiled(workbook, raw_sheets):
+    path, sources, compiled, cache_dir = workbook
+    manifest = build_cache(cache_dir, sources)
+    assert sorted(compiled) == sorted(SHEETS)
+    assert sorted(manifest['tables']) == ['r_134a_temp_table', 'water_temp_table']
+    water = dict(manifest['tables']['water_temp_table'])
+
+    # Unchanged workbook: nothing is compiled
+    compiled.clear()
+    build_cache(cache_dir, sources)
+    assert compiled == []
+
+    edited = dict(raw_sheets)
+    edited['R-134a-Temp Table'] = raw_sheets['R-134a-Temp Table'].copy()
+    edited['R-134a-Temp Table'].iloc[2, 4] += 0.5
+    write_workbook(path, edited)
+    compiled.clear()
+    manifest = build_cache(cache_dir, sources)
+    assert compiled == ['R-134a-Temp Table']
+    assert manifest['tables']['water_temp_table'] == water
+    hf = float(raw_sheets['R-134a-Temp Table'].iloc[2, 4])
+    assert TableStore(cache_dir, manifest)['r_134a_temp_table'].data[4, 0] == pytest.approx(hf + 0.5)
+
+
+def test_removed_sheet_drops_its_table(workbook, raw_sheets):
+    path, sources, compiled, cache_dir = workbook
+    build_cache(cache_dir, sources)
+    write_workbook(path, {'Sat Water-Temp Table': raw_sheets['Sat Water-Temp Table']})
+    compiled.clear()
+    manifest = build_cache(cache_dir, sources)
+    assert compiled == []
+    assert list(manifest['tables']) == ['water_temp_table']
+    assert read_manifest(cache_dir) == manifest
+
+
+@pytest.mark.parametrize('row, column, value', [(5, 4, 'n/a'), (5, 1, -1.0), (5, 8, 0.0)])
+def test_bad_values_are_rejected_and_the_cache_is_kept(workbook, raw_sheets, row, column, value):
+    path, sources, compiled, cache_dir = workbook
+    before = build_cache(cache_dir, sources)
+    bad = dict(raw_sheets)
+    bad['R-134a-Temp Table'] = raw_sheets['R-134a-Temp Table'].copy()
+    bad['R-134a-Temp Table'].iloc[row, column] = value
+    write_workbook(path, bad)
+    with pytest.raises(ValueError, match="R-134a-Temp Table"):
+        build_cache(cache_dir, sources)
+    assert read_manifest(cache_dir) == before
+
+
+def test_checksum_mismatch_rebuilds_the_table(workbook):
+    path, sources, compiled, cache_dir = workbook
+    manifest = build_cache(cache_dir, sources)
+    expected = TableStore(cache_dir, manifest)['water_temp_table'].data.copy()
+
+    damaged = os.path.join(cache_dir, manifest['tables']['water_temp_table']['files']['data']['path'])
+    values = np.load(damaged)
+    values[0, 0] += 1.0
+    np.save(damaged, values)
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        TableStore(cache_dir, manifest)['water_temp_table']
+    compiled.clear()
+    store = TableStore(cache_dir, manifest, sources=sources)
+    np.testing.assert_array_equal(store['water_temp_table'].data, expected)
+    assert compiled == SHEETS
+
+
+def test_process_excel_data_goes_through_the_cache(workbook, monkeypatch):
+    path, _, _, cache_dir = workbook
+    monkeypatch.setattr(thermo, 'cache_dir', cache_dir)
+    tables = thermo.process_excel_data(path)
+    assert sorted(tables) == ['r_134a_temp_table', 'water_temp_table']
+    assert sorted(read_manifest(cache_dir)['tables']) == sorted(tables)
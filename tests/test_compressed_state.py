@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+import thermo_calc_python as thermo
+
+SUBSTANCES = ['water', 'r_134a', 'ammonia', 'propane', 'co2']
+
+
+@pytest.mark.parametrize('substance', SUBSTANCES)
+@pytest.mark.parametrize('second_property', ['enthalpy', 'specific_volume', 'entropy'])
+def test_temperature_first_returns_the_input_property(data_dict, substance, second_property):
+    table = data_dict[f'{substance}_temp_table']
+    temperature = np.repeat(np.linspace(table.key[0], table.key[-1], 40), 40)
+    z_f = np.interp(temperature, table.key, table.data[thermo.SAT_LIQUID[thermo.PROPERTY_INDEX[second_property]]])
+    # Anywhere from far below to just below the saturated liquid value
+    second_value = z_f - np.abs(z_f) * np.tile(np.geomspace(1e-7, 0.5, 40), 40)
+
+    result = thermo.evaluate_states(data_dict, substance, 'temperature', temperature, second_property, second_value)
+    compressed = result['phase'] == thermo.PHASE_COMPRESSED_LIQUID
+    assert compressed.any()
+    solved = compressed & ~np.isnan(result['pressure'])
+    assert solved.any()
+    np.testing.assert_allclose(result[second_property][solved], second_value[solved], rtol=1e-6, atol=1e-9)
+    # Unsolved states carry no properties at all
+    assert np.isnan(result[second_property][compressed & ~solved]).all()
+
+
+def test_unreachable_liquid_state_is_nan(data_dict):
+    # h = 400 kJ/kg is below hf(100 °C) = 419.17 but no CL pressure reaches it
+    row = thermo.get_row_by_property(data_dict['water_temp_table'], 'temperature', 100.0)
+    result = thermo.determine_state(row, 'enthalpy', 400.0, data_dict)
+    assert result.phase == thermo.PHASE_COMPRESSED_LIQUID
+    assert np.isnan(result.pressure)
+    assert np.isnan(result.enthalpy)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import thermo_calc_python as thermo
+import thermo_cycles
+
+
+def test_ideal_rankine_cycle(data_dict):
+    # Water, 80 bar / 480 °C into the turbine, condenser at 0.08 bar
+    result = thermo_cycles.rankine_cycle(t_high=480.0).evaluate(data_dict, p_low=0.08, p_high=80.0)
+    assert result['efficiency'] == pytest.approx(0.397, abs=1e-3)
+    phases = [int(state['phase']) for state in result['states']]
+    assert phases == [thermo.PHASE_SATURATED_LIQUID, thermo.PHASE_COMPRESSED_LIQUID,
+                      thermo.PHASE_SUPERHEATED_VAPOR, thermo.PHASE_SATURATED_MIXTURE,
+                      thermo.PHASE_SATURATED_LIQUID]
+    assert result['states'][-1]['enthalpy'] == pytest.approx(result['states'][0]['enthalpy'])
+    assert result['net_work'] == pytest.approx(result['heat_in'] - result['heat_out'])
+
+
+def test_rankine_cycle_variants(data_dict):
+    saturated = thermo_cycles.rankine_cycle().evaluate(data_dict, p_low=0.08, p_high=80.0)
+    assert saturated['efficiency'] == pytest.approx(0.371, abs=1e-3)
+    irreversible = thermo_cycles.rankine_cycle(t_high=480.0, eta_pump=0.85, eta_turbine=0.85)
+    assert irreversible.evaluate(data_dict, p_low=0.08, p_high=80.0)['efficiency'] == pytest.approx(0.337, abs=1e-3)
+
+
+def test_vapor_compression_cycle(data_dict):
+    # R-134a between 1.4 bar and 8 bar
+    result = thermo_cycles.vapor_compression_cycle().evaluate(data_dict, p_low=1.4, p_high=8.0)
+    assert result['cop_refrigeration'] == pytest.approx(3.97, abs=0.01)
+    assert result['cop_heat_pump'] == pytest.approx(result['cop_refrigeration'] + 1.0)
+    valve_in, valve_out = result['states'][2], result['states'][3]
+    assert valve_out['enthalpy'] == pytest.approx(valve_in['enthalpy'])
+
+
+def test_sweep_matches_single_cases(data_dict):
+    cycle = thermo_cycles.rankine_cycle(t_high='t_high')
+    t_high = np.linspace(400.0, 550.0, 7)
+    sweep = cycle.evaluate(data_dict, p_low=0.08, p_high=80.0, t_high=t_high)['efficiency']
+    single = [cycle.evaluate(data_dict, p_low=0.08, p_high=80.0, t_high=t)['efficiency'] for t in t_high]
+    np.testing.assert_allclose(sweep, single)
+    assert (np.diff(sweep) > 0).all()
+
+
+def test_states_outside_the_tables_are_nan(data_dict):
+    rankine = thermo_cycles.rankine_cycle(t_high=480.0)
+    efficiency = rankine.evaluate(data_dict, p_low=0.08, p_high=np.array([80.0, 1e5]))['efficiency']
+    assert np.isfinite(efficiency[0]) and np.isnan(efficiency[1])
+    refrigeration = thermo_cycles.vapor_compression_cycle()
+    cop = refrigeration.evaluate(data_dict, p_low=np.array([1.4, 1e-6]), p_high=8.0)['cop_refrigeration']
+    assert np.isfinite(cop[0]) and np.isnan(cop[1])
+
+
+def test_unknown_substance_raises(data_dict):
+    with pytest.raises(KeyError):
+        thermo_cycles.rankine_cycle(substance='unobtainium').evaluate(data_dict, p_low=0.08, p_high=80.0)
+    with pytest.raises(ValueError):
+        thermo_cycles.Isobaric()
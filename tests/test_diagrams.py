@@ -0,0 +1,41 @@
+import numpy as np
+
+import thermo_diagrams
+from thermo_diagrams import LINE_PROPERTIES
+
+
+def test_supercritical_isotherm_is_one_continuous_line(data_dict):
+    ranges = thermo_diagrams.diagram_ranges(data_dict, 'water')
+    resolution = 50
+    lines = thermo_diagrams.isotherm_lines(data_dict, 'water', [390.0], resolution, ranges)
+    pressure = lines['pressure'][0]
+    assert pressure.shape == (3 * resolution,)
+
+    finite = np.flatnonzero(np.isfinite(pressure))
+    run = pressure[finite[0]:finite[-1] + 1]
+    # No dome gap: every step between the first and last covered point is
+    # one of the evenly spaced logarithmic pressure steps
+    assert np.isfinite(run).all()
+    step = (ranges['p_min'] / ranges['p_max']) ** (1.0 / (3 * resolution - 1))
+    np.testing.assert_allclose(run[1:] / run[:-1], step)
+    # Covered from well inside the old dome gap (the SHV grid ends near 190 bar) to below 1 bar
+    assert run[0] > 150.0 and run[-1] < 1.0
+
+
+def test_supercritical_isobar_has_no_dome(data_dict):
+    ranges = thermo_diagrams.diagram_ranges(data_dict, 'water')
+    lines = thermo_diagrams.isobar_lines(data_dict, 'water', [250.0], 50, ranges)
+    temperature = lines['temperature'][0]
+    finite = np.isfinite(temperature)
+    step = np.diff(temperature[finite])
+    np.testing.assert_allclose(step, step.min() * np.rint(step / step.min()))
+    assert temperature[finite].max() > 750.0
+
+
+def test_points_outside_the_tables_are_missing_in_every_property(data_dict):
+    diagram = thermo_diagrams.compute_diagram(data_dict, 'water', resolution=40, isotherms=[50.0, 390.0, 600.0],
+                                              isobars=[1.0, 100.0, 250.0])
+    for name in ('isobar', 'isotherm'):
+        family = diagram['families'][name]
+        missing = np.stack([np.isnan(family[key]) for key in LINE_PROPERTIES])
+        assert (missing.all(axis=0) == missing.any(axis=0)).all()
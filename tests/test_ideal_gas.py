@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+import thermo_ideal_gas as ideal
+from thermo_tables import IDEAL_H, IDEAL_PR, IDEAL_S0, IDEAL_TEMPERATURE
+
+
+def test_properties_match_the_table_rows(data_dict):
+    table = data_dict['air_ideal_table']
+    rows = table.data[:, ::7]
+    temperature = rows[IDEAL_TEMPERATURE]
+    np.testing.assert_allclose(ideal.enthalpy(data_dict, 'air', temperature), rows[IDEAL_H])
+    np.testing.assert_allclose(ideal.standard_entropy(data_dict, 'air', temperature), rows[IDEAL_S0])
+    np.testing.assert_allclose(ideal.relative_pressure(data_dict, 'air', temperature), rows[IDEAL_PR])
+    # Air at 300 K as tabulated in ideal_table.xlsx
+    assert ideal.enthalpy(data_dict, 'air', 300.0) == pytest.approx(300.1)
+    assert ideal.relative_pressure(data_dict, 'air', 300.0) == pytest.approx(1.386)
+    # Linear between rows
+    assert ideal.enthalpy(data_dict, 'air', 302.5) == pytest.approx(0.5 * (300.1 + 305.2))
+
+
+def test_outside_the_table_is_nan(data_dict):
+    table = data_dict['air_ideal_table']
+    h = ideal.enthalpy(data_dict, 'air', [table.temperatures[0] - 1.0, table.temperatures[-1] + 1.0])
+    assert np.isnan(h).all()
+
+
+def test_inverse_lookups(data_dict):
+    assert ideal.temperature_from(data_dict, 'air', 'enthalpy', 300.1) == pytest.approx(300.0)
+    assert ideal.temperature_from(data_dict, 'air', 'relative_pressure', 1.386) == pytest.approx(300.0)
+    temperature = np.linspace(250.0, 1500.0, 50)
+    h = ideal.enthalpy(data_dict, 'n2', temperature)
+    np.testing.assert_allclose(ideal.temperature_from(data_dict, 'n2', 'enthalpy', h), temperature)
+
+
+def test_basis_conversion(data_dict):
+    molar_mass = data_dict['co2_ideal_table'].molar_mass
+    h_molar = ideal.enthalpy(data_dict, 'co2', 300.0)
+    assert ideal.enthalpy(data_dict, 'co2', 300.0, basis='molar') == h_molar
+    assert ideal.enthalpy(data_dict, 'co2', 300.0, basis='mass') == pytest.approx(h_molar / molar_mass)
+    assert ideal.enthalpy(data_dict, 'air', 300.0, basis='molar') == pytest.approx(300.1 * 28.97)
+    # Relative pressure is a ratio and has no basis
+    assert ideal.relative_pressure(data_dict, 'air', 300.0) == ideal.property_value(
+        data_dict, 'air', 'relative_pressure', 300.0, basis='molar')
+    h = ideal.enthalpy(data_dict, 'co2', 500.0, basis='mass')
+    assert ideal.temperature_from(data_dict, 'co2', 'enthalpy', h, basis='mass') == pytest.approx(500.0)
+    with pytest.raises(ValueError):
+        ideal.enthalpy(data_dict, 'co2', 300.0, basis='volume')
+
+
+def test_isentropic_relations(data_dict):
+    # Compression of air from 300 K by a pressure ratio of 8: pr2 = 8 pr1
+    pr = ideal.relative_pressure(data_dict, 'air', 300.0)
+    t2 = ideal.temperature_from(data_dict, 'air', 'relative_pressure', 8.0 * pr)
+    assert t2 == pytest.approx(539.8, abs=0.1)
+    assert ideal.isentropic_temperature(data_dict, 'air', 300.0, 8.0) == pytest.approx(t2, abs=0.1)
+    # By a volume ratio of 8: vr2 = vr1 / 8
+    vr = ideal.relative_volume(data_dict, 'air', 300.0)
+    assert ideal.temperature_from(data_dict, 'air', 'relative_volume', vr / 8.0) == pytest.approx(673.0, abs=1.0)
+
+
+def test_entropy_at_the_reference_pressure_is_standard_entropy(data_dict):
+    for gas in ('air', 'o2'):
+        s0 = ideal.standard_entropy(data_dict, gas, 800.0)
+        assert ideal.entropy(data_dict, gas, 800.0, ideal.REFERENCE_PRESSURE) == pytest.approx(s0)
+        table = data_dict[f'{gas}_ideal_table']
+        assert ideal.entropy(data_dict, gas, 800.0, 10 * ideal.REFERENCE_PRESSURE) == pytest.approx(
+            s0 - table.gas_constant * np.log(10.0))
+
+
+def test_unknown_gas_raises(data_dict):
+    with pytest.raises(KeyError):
+        ideal.enthalpy(data_dict, 'unobtainium', 300.0)
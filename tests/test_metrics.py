@@ -0,0 +1,108 @@
+import pytest
+
+import thermo_calc_python as thermo
+import thermo_metrics
+from thermo_metrics import Histogram, MetricsRegistry, instrumented
+
+
+@pytest.fixture
+def metrics():
+    enabled = thermo_metrics.is_enabled()
+    thermo_metrics.registry.reset()
+    thermo_metrics.enable()
+    yield thermo_metrics.registry
+    thermo_metrics.registry.reset()
+    if not enabled:
+        thermo_metrics.disable()
+
+
+def test_histogram_quantiles_interpolate_inside_the_bucket():
+    bounds = (1.0, 2.0, 4.0)
+    histogram = Histogram(len(bounds))
+    assert histogram.quantile(0.5, bounds) is None
+    # Two observations in (0, 1], two in (2, 4]
+    histogram.counts = [2, 0, 2, 0]
+    histogram.count = 4
+    assert histogram.quantile(0.25, bounds) == pytest.approx(0.5)
+    assert histogram.quantile(0.5, bounds) == pytest.approx(1.0)
+    assert histogram.quantile(0.75, bounds) == pytest.approx(3.0)
+    # Observations past the last bound are reported at that bound
+    histogram.counts = [0, 0, 0, 1]
+    histogram.count = 1
+    assert histogram.quantile(0.99, bounds) == 4.0
+
+
+def test_registry_snapshot():
+    registry = MetricsRegistry(buckets=(1e-3, 1e-2))
+    for seconds in (5e-4, 5e-3, 5e-3, 5e-2):
+        registry.observe('stage', 'water', 'Saturated Mixture', seconds, items=10)
+    entry = registry.snapshot()[('stage', 'water', 'Saturated Mixture')]
+    assert (entry['count'], entry['items']) == (4, 40)
+    assert entry['sum_s'] == pytest.approx(0.0605)
+    assert 1e-3 < entry['p50_s'] <= 1e-2
+    assert entry['p99_s'] == 1e-2
+
+
+def test_render_prometheus_format():
+    registry = MetricsRegistry(buckets=(1e-3, 1e-2))
+    registry.observe('lookup', 'water', None, 5e-4)
+    registry.observe('lookup', 'water', None, 5e-3, items=3)
+    registry.add_items('batch', 'r_134a', 'Compressed Liquid', 7)
+    registry.add_items('batch', 'r_134a', 'Compressed Liquid', 2)
+    registry.observe('lookup', 'say "hi"\n', None, 5e-4)
+    lines = registry.render_prometheus().splitlines()
+
+    labels = 'stage="lookup",substance="water",phase=""'
+    assert f'thermo_stage_seconds_bucket{{{labels},le="0.001"}} 1' in lines
+    assert f'thermo_stage_seconds_bucket{{{labels},le="0.01"}} 2' in lines
+    assert f'thermo_stage_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    assert f'thermo_stage_seconds_count{{{labels}}} 2' in lines
+    assert f'thermo_stage_seconds_sum{{{labels}}} {5e-4 + 5e-3!r}' in lines
+    assert f'thermo_stage_items_total{{{labels}}} 4' in lines
+    assert 'thermo_phase_items_total{stage="batch",substance="r_134a",phase="Compressed Liquid"} 9' in lines
+    assert any(line.startswith('thermo_stage_p99_seconds{' + labels) for line in lines)
+    assert any('substance="say \\"hi\\"\\n"' in line for line in lines)
+    for name in ('thermo_stage_seconds', 'thermo_stage_items_total', 'thermo_phase_items_total',
+                 'thermo_stage_p50_seconds', 'thermo_stage_p99_seconds'):
+        assert f'# TYPE {name} ' in '\n'.join(lines)
+    # Every sample line is `name{labels} value`
+    for line in lines:
+        if not line.startswith('#'):
+            float(line.rsplit(' ', 1)[1])
+
+
+def test_disabled_instrumentation_records_nothing():
+    enabled = thermo_metrics.is_enabled()
+    thermo_metrics.disable()
+    calls = []
+
+    @instrumented('noop', labels=lambda args, kwargs, result: calls.append('labels'))
+    def double(x):
+        return 2 * x
+
+    try:
+        thermo_metrics.registry.reset()
+        assert double(21) == 42
+        assert calls == []
+        assert thermo_metrics.registry.snapshot() == {}
+        assert thermo_metrics.registry.phase_items() == {}
+    finally:
+        if enabled:
+            thermo_metrics.enable()
+
+
+def test_evaluate_states_records_each_phase(data_dict, metrics):
+    # Compressed liquid, mixture and superheated vapor at 50 bar, plus one state outside the table
+    thermo.evaluate_states(data_dict, 'water', 'pressure', [50.0, 50.0, 50.0, 50.0, 1e5], 'enthalpy',
+                           [500.0, 2000.0, 3000.0, 3100.0, 2000.0])
+    items = metrics.phase_items()
+    assert items[('evaluate_states', 'water', 'Compressed Liquid')] == 1
+    assert items[('evaluate_states', 'water', 'Saturated Mixture')] == 1
+    assert items[('evaluate_states', 'water', 'Superheated Vapor')] == 2
+    assert items[('evaluate_states', 'water', 'Unknown')] == 1
+
+    snapshot = metrics.snapshot()
+    assert snapshot[('evaluate_states', 'water', '')]['items'] == 5
+    assert snapshot[('solve_states', 'water', 'Superheated Vapor')]['items'] == 2
+    assert snapshot[('solve_states', 'water', 'Compressed Liquid')]['items'] == 1
+    assert ('solve_states', 'water', 'Saturated Mixture') not in snapshot
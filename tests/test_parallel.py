@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+import thermo_calc_python as thermo
+from thermo_parallel import parallel_evaluate_states
+
+
+@pytest.fixture(scope='module')
+def states():
+    rng = np.random.default_rng(0)
+    return rng.uniform(5, 350, 5000), rng.uniform(0, 3200, 5000)
+
+
+@pytest.mark.parametrize('structured', [False, True])
+def test_matches_a_single_call(data_dict, states, structured):
+    temperature, enthalpy = states
+    expected = thermo.evaluate_states(data_dict, 'water', 'temperature', temperature, 'enthalpy', enthalpy)
+    out = thermo.allocate_states(temperature.shape, structured=structured)
+    result = parallel_evaluate_states(data_dict, 'water', 'temperature', temperature, 'enthalpy', enthalpy,
+                                      threads=4, chunk_size=1000, out=out)
+    assert result is out
+    for key in thermo.STATE_KEYS:
+        np.testing.assert_array_equal(result[key], expected[key])
+
+
+@pytest.mark.parametrize('out', [
+    np.empty(10, dtype=thermo.STATE_DTYPE),
+    {key: np.empty(5000) for key in thermo.STATE_KEYS},
+    {key: np.empty(5000, dtype=np.float32) for key in thermo.STATE_KEYS}
+])
+def test_rejects_mismatched_out(data_dict, states, out):
+    temperature, enthalpy = states
+    with pytest.raises(ValueError):
+        parallel_evaluate_states(data_dict, 'water', 'temperature', temperature, 'enthalpy', enthalpy,
+                                 threads=2, out=out)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+import thermo_calc_python as thermo
+from thermo_tables import (
+    PROPERTY_INDEX, SAT_PRESSURE, SAT_TEMPERATURE, interpolate_grid, interpolate_saturation,
+    solve_grid_temperature
+)
+
+GRIDS = ['water_shv_table', 'water_cl_table', 'r_134a_shv_table', 'r_134a_cl_table', 'ammonia_shv_table',
+         'ammonia_cl_table', 'propane_shv_table', 'propane_cl_table', 'co2_shv_table', 'co2_cl_table']
+
+
+@pytest.mark.parametrize('name', GRIDS)
+def test_cells_outside_blocks_are_nan(data_dict, name):
+    grid = data_dict[name]
+    inside = (grid.temperatures >= grid.t_min[:, None]) & (grid.temperatures <= grid.t_max[:, None])
+    assert np.isnan(grid.values[~inside]).all()
+    assert np.isfinite(grid.values[inside]).all()
+    assert (grid.values[inside][:, 0] > 0).all()
+
+
+@pytest.mark.parametrize('name', GRIDS)
+def test_dense_lookup_has_no_negative_volume(data_dict, name):
+    grid = data_dict[name]
+    temperature, pressure = np.meshgrid(np.linspace(grid.temperatures[0], grid.temperatures[-1], 400),
+                                        np.linspace(grid.pressures[0], grid.pressures[-1], 400))
+    volume = interpolate_grid(grid, temperature, pressure)[..., 0]
+    assert not (volume <= 0).any()
+
+
+def test_far_side_of_dome_is_nan(data_dict):
+    # Liquid at 100 °C, 320 bar is below the first row of a supercritical SHV block
+    assert np.isnan(interpolate_grid(data_dict['water_shv_table'], 100.0, 320.0)).all()
+    with pytest.raises(ValueError):
+        thermo.get_property_value(data_dict['water_shv_table'], 50.0, 1.0)
+    # 300 °C at 50 bar is superheated vapor, not compressed liquid
+    with pytest.raises(ValueError):
+        thermo.get_compressed_liquid_value(data_dict['water_cl_table'], data_dict['water_temp_table'], 300.0, 50.0)
+
+
+@pytest.mark.parametrize('substance', ['water', 'r_134a', 'ammonia', 'propane', 'co2'])
+def test_vapor_next_to_dome_between_blocks(data_dict, substance):
+    grid = data_dict[f'{substance}_shv_table']
+    saturation = data_dict[f'{substance}_pressure_table']
+    blocks = np.flatnonzero(~np.isnan(grid.t_sat))
+    pressure = 0.5 * (grid.pressures[blocks[:-1]] + grid.pressures[blocks[1:]])
+    pressure = pressure[(pressure > saturation.key[0]) & (pressure < saturation.key[-1])]
+    temperature = interpolate_saturation(saturation, pressure)[SAT_TEMPERATURE] + 0.5
+
+    values = interpolate_grid(grid, temperature, pressure)
+    assert np.isfinite(values).all()
+
+    # The inverse lookup lands back on the same state
+    k = PROPERTY_INDEX['enthalpy']
+    solved = solve_grid_temperature(grid, pressure, k, values[:, k])
+    np.testing.assert_allclose(solved, temperature, rtol=0, atol=1e-8)
+
+
+def test_liquid_next_to_dome_uses_saturated_liquid(data_dict):
+    grid = data_dict['water_cl_table']
+    table = data_dict['water_temp_table']
+    # Between the 25 and 50 bar blocks, just below the saturation temperature
+    temperature = 230.0
+    pressure = float(np.interp(temperature, table.key, table.data[SAT_PRESSURE])) + 0.5
+    values = thermo.compressed_liquid_values(grid, table, temperature, pressure)
+    assert np.isfinite(values).all()
+
+
+def test_legacy_single_phase_helpers_use_the_grids(data_dict):
+    df_shv = data_dict['water_shv_table']
+    assert thermo.handle_superheated_vapor(df_shv, 300.0, 10.0) == thermo.get_property_value(df_shv, 300.0, 10.0)
+    (p1, i1), (p2, i2) = thermo.find_pressure_bounds(df_shv, 10.0)
+    assert p1 <= 10.0 <= p2 and i2 == i1 + 1
+    assert thermo.find_pressure_bounds(df_shv, df_shv.pressures[-1] * 2) is None
+
+    df_cl, df_sat = data_dict['water_cl_table'], data_dict['water_temp_table']
+    liquid = thermo.handle_compressed_liquid(df_cl, df_sat, 100.0, 50.0)
+    assert liquid == thermo.get_compressed_liquid_value(df_cl, df_sat, 100.0, 50.0)
+
+    row = thermo.get_row_by_property(data_dict['water_temp_table'], 'temperature', 100.0)
+    mixture = thermo.calculate_slvm_properties(row, 0.5)
+    assert mixture['Enthalpy'] == pytest.approx(0.5 * (row['Enthalpy (hf, kJ/kg)'] + row['Enthalpy (hg, kJ/kg)']))
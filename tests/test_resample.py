@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+import thermo_cache
+import thermo_calc_python as thermo
+from thermo_resample import accuracy_report, resample_table, resample_tables, uniform_grid, uniform_saturation
+from thermo_tables import interpolate_grid
+
+# Largest difference from the exact (piecewise-linear) tables allowed for
+# linear resampling at 1024 nodes, relative to each property's range in the
+# table; the measured maximum is about 1.6e-3
+TOLERANCE = 5e-3
+SIZE = 1024
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    """A table store of its own with every table resampled onto SIZE nodes."""
+    cache_dir = str(tmp_path_factory.mktemp('cache'))
+    return thermo_cache.open_table_store(cache_dir, thermo.table_sources(), resample={'size': SIZE})
+
+
+def test_linear_resampling_matches_the_tables(data_dict):
+    report = accuracy_report(data_dict, resample_tables(data_dict, size=SIZE), samples=5000)
+    assert len(report) == 20
+    for name, entry in report.items():
+        assert max(entry['max_error'].values()) <= TOLERANCE, name
+        assert entry['lost'] == 0.0, name
+
+
+@pytest.mark.parametrize('name', ['water_shv_table', 'water_cl_table', 'co2_shv_table', 'co2_cl_table'])
+def test_grids_answer_up_to_the_dome_edge(data_dict, name):
+    grid = data_dict[name]
+    fast = resample_table(grid, SIZE)
+    rng = np.random.default_rng(0)
+    pressure = rng.uniform(grid.pressures[0], grid.pressures[-1], 20000)
+    edge = np.interp(pressure, grid.pressures, np.where(np.isnan(grid.t_sat), grid.t_min, grid.t_sat))
+    temperature = edge + rng.normal(0.0, 2.0, pressure.shape)
+    # The tabulated pressures themselves, across the whole temperature range
+    temperature = np.concatenate([temperature, np.tile(grid.temperatures, grid.pressures.shape[0])])
+    pressure = np.concatenate([pressure, np.repeat(grid.pressures, grid.temperatures.shape[0])])
+
+    exact = interpolate_grid(grid, temperature, pressure)
+    approx = uniform_grid(fast, temperature, pressure)
+    np.testing.assert_array_equal(np.isnan(approx[:, 0]), np.isnan(exact[:, 0]))
+    scale = np.nanmax(grid.values, axis=(0, 1)) - np.nanmin(grid.values, axis=(0, 1))
+    assert np.nanmax(np.abs(approx - exact) / scale) <= TOLERANCE
+
+
+def test_uniform_grid_scalar_lookup(data_dict):
+    grid = data_dict['water_shv_table']
+    fast = resample_table(grid, SIZE)
+    value = uniform_grid(fast, 250.0, 10.0)
+    assert value.shape == (4,)
+    np.testing.assert_allclose(value, interpolate_grid(grid, 250.0, 10.0), rtol=1e-3)
+    assert np.isnan(uniform_grid(fast, 100.0, 10.0)).all()
+
+
+def test_uniform_saturation_clamps_like_the_table(data_dict):
+    table = data_dict['water_temp_table']
+    fast = resample_table(table, SIZE)
+    key = np.array([table.key[0] - 5.0, table.key[-1] + 5.0])
+    assert np.isnan(uniform_saturation(fast, key)[thermo.SAT_PRESSURE]).all()
+    np.testing.assert_array_equal(uniform_saturation(fast, key)[table.key_index], key)
+
+    clamped = uniform_saturation(fast, key, clamp=True)
+    np.testing.assert_array_equal(clamped[table.key_index], table.key[[0, -1]])
+    np.testing.assert_allclose(clamped, table.data[:, [0, -1]], rtol=1e-9)
+
+
+def test_resampled_tables_round_trip_through_the_cache(store):
+    assert len(store.resampled_names()) == 20
+    for name in ('water_temp_table', 'water_shv_table'):
+        cached = store.resampled(name)
+        fresh = resample_table(store[name], SIZE)
+        assert type(cached) is type(fresh) and cached.method == 'linear'
+        arrays = ('data',) if name.endswith('temp_table') else ('values', 'p_index', 't_min', 't_max', 't_sat')
+        for array in arrays:
+            np.testing.assert_array_equal(getattr(cached, array), getattr(fresh, array))
+    with pytest.raises(KeyError):
+        store.resampled('air_ideal_table')
+
+
+def test_resampled_tables_are_rebuilt_only_when_needed(store, monkeypatch):
+    resampled = []
+
+    def counting(table, *args):
+        resampled.append(table.name)
+        return resample_table(table, *args)
+
+    monkeypatch.setattr(thermo_cache, 'resample_table', counting)
+    sources = thermo.table_sources()
+    # Same options, or none: the stored resamplings are kept
+    manifest = thermo_cache.build_cache(store.cache_dir, sources, resample={'size': SIZE})
+    manifest = thermo_cache.build_cache(store.cache_dir, sources)
+    assert resampled == []
+    assert len(manifest['resampled']) == 20
+
+    manifest = thermo_cache.build_cache(store.cache_dir, sources,
+                                        resample={'size': SIZE, 'overrides': {'co2': (256, 'cubic')}})
+    assert sorted(resampled) == ['co2_cl_table', 'co2_pressure_table', 'co2_shv_table', 'co2_temp_table']
+    assert manifest['resampled']['co2_shv_table']['options'] == [256, 'cubic']
+
+    # Restore the fixture's options for the tests that follow
+    thermo_cache.build_cache(store.cache_dir, sources, resample={'size': SIZE})
+
+
+@pytest.mark.parametrize('substance, first_property, first, second_property, second', [
+    ('water', 'temperature', (5.0, 370.0), 'enthalpy', (50.0, 3500.0)),
+    ('water', 'pressure', (0.01, 220.0), 'entropy', (0.5, 9.0)),
+    ('r_134a', 'pressure', (1.0, 40.0), 'enthalpy', (150.0, 450.0)),
+])
+def test_uniform_backend_matches_exact(store, substance, first_property, first, second_property, second):
+    rng = np.random.default_rng(1)
+    first_values = rng.uniform(*first, 20000)
+    second_values = rng.uniform(*second, 20000)
+    exact = thermo.evaluate_states(store, substance, first_property, first_values, second_property, second_values)
+    uniform = thermo.evaluate_states(store, substance, first_property, first_values, second_property,
+                                     second_values, backend='uniform')
+
+    # States within the tolerance of a saturation line may land on its other side
+    same = exact['phase'] == uniform['phase']
+    assert same.mean() > 0.999
+    for key in thermo.STATE_KEYS[1:]:
+        np.testing.assert_array_equal(np.isnan(uniform[key][same]), np.isnan(exact[key][same]))
+        scale = np.nanmax(np.abs(exact[key]))
+        assert np.nanmax(np.abs(uniform[key][same] - exact[key][same])) <= TOLERANCE * scale, key
+
+
+def test_uniform_backend_needs_resampled_tables(data_dict):
+    table = data_dict['water_temp_table']
+    with pytest.raises(ValueError):
+        thermo.evaluate_states({'water_temp_table': table}, 'water', 'temperature', 100.0, 'enthalpy', 500.0,
+                               backend='uniform')
+    with pytest.raises(ValueError):
+        thermo.evaluate_states(data_dict, 'water', 'temperature', 100.0, 'enthalpy', 500.0, backend='spline')
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import thermo_bulk
+import thermo_calc_python as thermo
+import thermo_cycles
+from thermo_tables import SAT_PRESSURE, SAT_TEMPERATURE, interpolate_saturation
+
+
+def test_values_outside_the_table_are_nan(data_dict):
+    table = data_dict['ammonia_temp_table']
+    values = interpolate_saturation(table, np.array([table.key[0] - 1.0, table.key[-1], 89.0, np.nan]))
+    assert np.isfinite(values[:, 1]).all()
+    assert np.isnan(values[SAT_PRESSURE, [0, 2, 3]]).all()
+    # The key column keeps the queried value
+    np.testing.assert_array_equal(values[SAT_TEMPERATURE, :3], [table.key[0] - 1.0, table.key[-1], 89.0])
+
+
+def test_clamp_is_explicit(data_dict):
+    table = data_dict['ammonia_temp_table']
+    np.testing.assert_array_equal(interpolate_saturation(table, 89.0, clamp=True),
+                                  interpolate_saturation(table, table.key[-1]))
+
+
+def test_states_past_the_table_are_unknown(data_dict):
+    # The ammonia temperature table ends at 50 °C
+    batch = thermo.evaluate_states(data_dict, 'ammonia', 'temperature', [89.0, 40.0], 'enthalpy', [1500.0, 1500.0])
+    assert batch['phase'].tolist() == [thermo.PHASE_UNKNOWN, thermo.PHASE_SUPERHEATED_VAPOR]
+    assert np.isnan(batch['pressure'][0]) and np.isnan(batch['enthalpy'][0])
+
+    assert thermo.get_row_by_property(data_dict['ammonia_temp_table'], 'temperature', 89.0) is None
+    assert thermo.cached_state_lookup(data_dict, 'ammonia', 'temperature', 89.0, 'enthalpy', 1500.0) is None
+
+
+def test_bulk_rows_past_the_table_are_unknown(data_dict):
+    chunk = thermo_bulk.normalize_chunk(pytest.importorskip('pandas').DataFrame({
+        'substance': ['ammonia'], 'first_property': ['temperature'], 'first_value': [89.0],
+        'second_property': ['enthalpy'], 'second_value': [1500.0]}), {})
+    result = thermo_bulk.evaluate_chunk(data_dict, chunk)
+    assert result['state'].tolist() == [thermo.PHASE_NAMES[thermo.PHASE_UNKNOWN]]
+
+
+def test_clamped_states_are_never_on_the_dome(data_dict):
+    table = data_dict['water_pressure_table']
+    pressure = np.full(4, 250.0)
+    entropy = np.array([1.0, 4.4, 4.5, 6.0])
+    batch = thermo.evaluate_states(data_dict, 'water', 'pressure', pressure, 'entropy', entropy, clamp=True)
+    assert pressure[0] > table.key[-1]
+    assert not np.isin(batch['phase'], [thermo.PHASE_SATURATED_LIQUID, thermo.PHASE_SATURATED_VAPOR,
+                                        thermo.PHASE_SATURATED_MIXTURE]).any()
+    assert batch['phase'][0] == thermo.PHASE_COMPRESSED_LIQUID
+    assert batch['phase'][3] == thermo.PHASE_SUPERHEATED_VAPOR
+    # Near the critical entropy the grids have gaps; those states stay NaN
+    solved = ~np.isnan(batch['temperature'])
+    assert solved[[0, 3]].all()
+    # Single-phase states are solved at the requested pressure, not the critical one
+    np.testing.assert_array_equal(batch['pressure'][solved], 250.0)
+    np.testing.assert_allclose(batch['entropy'][solved], entropy[solved])
+
+
+def test_supercritical_rankine_cycle(data_dict):
+    cycle = thermo_cycles.rankine_cycle(t_high=500.0)
+    result = cycle.evaluate(data_dict, p_low=0.1, p_high=np.array([100.0, 250.0]))
+    assert np.isfinite(result['efficiency']).all()
+    pump_outlet = result['states'][1]
+    np.testing.assert_array_equal(pump_outlet['pressure'], [100.0, 250.0])
@@ -0,0 +1,82 @@
+import pytest
+
+import thermo_calc_python as thermo
+from thermo_cache import manifest_version
+
+
+class VersionedTables(dict):
+    """Plain table set carrying a version token, like a TableStore."""
+
+    def __init__(self, tables, version):
+        super().__init__((name, tables[name]) for name in tables)
+        self.version = version
+
+
+def lookup(tables, cache, temperature=100.0, enthalpy=1500.0):
+    return thermo.cached_state_lookup(tables, 'water', 'temperature', temperature, 'enthalpy', enthalpy,
+                                      cache=cache)
+
+
+def test_values_within_the_quantum_share_an_entry(data_dict):
+    cache = thermo.StateCache(decimals=3)
+    first = lookup(data_dict, cache, 100.0, 1500.0)
+    assert lookup(data_dict, cache, 100.0001, 1500.0004) is first
+    assert lookup(data_dict, cache, 100.01, 1500.0) is not first
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 2, 2)
+    assert stats['hit_rate'] == pytest.approx(1 / 3)
+
+
+def test_quantized_values_are_the_ones_evaluated(data_dict):
+    cache = thermo.StateCache(decimals=1)
+    result = lookup(data_dict, cache, 100.04, 1500.04)
+    assert result.temperature == 100.0
+    assert result.enthalpy == pytest.approx(1500.0)
+
+
+def test_least_recently_used_entry_is_evicted(data_dict):
+    cache = thermo.StateCache(maxsize=2)
+    lookup(data_dict, cache, enthalpy=1000.0)
+    lookup(data_dict, cache, enthalpy=1100.0)
+    lookup(data_dict, cache, enthalpy=1000.0)
+    lookup(data_dict, cache, enthalpy=1200.0)
+    stats = cache.stats()
+    assert (stats['size'], stats['evictions']) == (2, 1)
+
+    lookup(data_dict, cache, enthalpy=1000.0)
+    assert cache.stats()['hits'] == 2
+    lookup(data_dict, cache, enthalpy=1100.0)
+    assert cache.stats()['misses'] == 4
+
+    cache.resize(1)
+    assert cache.stats()['size'] == 1
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0, 'maxsize': 1, 'hit_rate': 0.0}
+
+
+def test_entries_are_keyed_on_the_table_set_version(data_dict):
+    cache = thermo.StateCache()
+    tables = VersionedTables(data_dict, 'a')
+    first = lookup(tables, cache)
+    assert lookup(tables, cache) is first
+    tables.version = 'b'
+    assert lookup(tables, cache) is not first
+    assert cache.stats()['misses'] == 2
+
+
+def test_table_set_without_version_is_not_cached(data_dict):
+    cache = thermo.StateCache()
+    tables = dict(data_dict.items())
+    assert lookup(tables, cache).phase == thermo.PHASE_SATURATED_MIXTURE
+    assert cache.stats()['size'] == 0
+
+
+def test_table_store_version_follows_the_contents(data_dict):
+    assert data_dict.version == manifest_version(data_dict.manifest)
+    manifest = {'tables': {name: dict(entry) for name, entry in data_dict.manifest['tables'].items()}}
+    name = next(iter(manifest['tables']))
+    files = dict(manifest['tables'][name]['files'])
+    array_name = next(iter(files))
+    files[array_name] = dict(files[array_name], sha256='0' * 64)
+    manifest['tables'][name]['files'] = files
+    assert manifest_version(manifest) != data_dict.version
@@ -1,101 +1,145 @@
-from flask import Flask, request, jsonify
+import json
+import os
+import sys
+
+import numpy as np
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 
+# The lookup engine and data tables live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import thermo_calc_python as thermo
+import thermo_cycles
+import thermo_diagrams
+import thermo_metrics
+
 app = Flask(__name__)
 CORS(app)
 
-def determine_state(substance, first_property, first_value, second_property, second_value):
+# Tables are loaded once per process, not per request
+data_dict = thermo.load_all_data()
+
+# Diagram line data, computed once per substance, resolution and line levels
+diagrams = thermo_diagrams.DiagramCache(data_dict)
+MAX_DIAGRAM_RESOLUTION = 2000
+# Every isobar or isotherm level is one grid sweep
+MAX_DIAGRAM_LINES = 50
+
+# Labels of the property values returned to the front end
+RESULT_LABELS = {
+    'temperature': 'Temperature (°C)',
+    'pressure': 'Pressure (bar)',
+    'specific_volume': 'Specific Volume (m³/kg)',
+    'internal_energy': 'Internal Energy (kJ/kg)',
+    'enthalpy': 'Enthalpy (kJ/kg)',
+    'entropy': 'Entropy (kJ/kg·K)'
+}
+
+# A state is fixed by a saturation table key and any other result property;
+# temperature with pressure is resolved on the single-phase tables
+FIRST_PROPERTIES = ('temperature', 'pressure')
+SECOND_PROPERTIES = tuple(RESULT_LABELS)
+
+def normalize_substance(substance):
+    """Map front-end substance names (e.g. 'r134a', 'R-134a') to table prefixes."""
+    substance = str(substance).strip().lower().replace(' ', '_').replace('-', '_')
+    return 'r_134a' if substance == 'r134a' else substance
+
+def parse_state_request(data):
+    """Validate one state request and return its (substance, p1, v1, p2, v2) tuple."""
+    first_property = data['firstProperty']
+    second_property = data['secondProperty']
+    if not isinstance(first_property, str) or first_property not in FIRST_PROPERTIES:
+        raise ValueError(f"Unsupported first property {first_property!r}")
+    if not isinstance(second_property, str) or second_property not in SECOND_PROPERTIES:
+        raise ValueError(f"Unsupported second property {second_property!r}")
+    if second_property == first_property:
+        raise ValueError(f"Second property must differ from the first ({first_property!r})")
+    return (
+        normalize_substance(data['substance']),
+        first_property,
+        float(data['firstValue']),
+        second_property,
+        float(data['secondValue'])
+    )
+
+def format_result(batch, i, first_value, second_value):
+    """Build the JSON response for element i of an evaluate_states batch."""
+    phase = int(batch['phase'][i])
+    state = thermo.PHASE_NAMES[phase]
+    quality = float(batch['quality'][i])
+
+    if phase == thermo.PHASE_UNKNOWN:
+        details = "Unable to determine state for this property"
+    else:
+        details = (f"Calculation performed at {first_value} and {second_value} "
+                   f"(T = {batch['temperature'][i]:.3f}°C, P = {batch['pressure'][i]:.6f} bar)")
+        if phase == thermo.PHASE_SATURATED_MIXTURE:
+            details += f"\nQuality (x) = {quality:.4f}"
+
+    properties = {}
+    for key, label in RESULT_LABELS.items():
+        value = float(batch[key][i])
+        if np.isfinite(value):
+            properties[label] = value
+
+    result = {
+        'status': 'success',
+        'state': state,
+        'details': details,
+        'saturationProperties': properties
+    }
+    if np.isfinite(quality):
+        result['quality'] = quality
+    return result
+
+def evaluate_group(substance, first_property, first_values, second_property, second_values):
     """
-    Determine the thermodynamic state based on the given properties
+    evaluate_states for one group of requests; temperature-pressure pairs
+    go through thermo_cycles.pressure_temperature_states instead.
     """
-    # For water at 20°C:
-    if substance == 'water' and first_property == 'temperature' and float(first_value) == 20:
-        hf = 83.9  # Approximate saturated liquid enthalpy at 20°C
-        hg = 2538.1  # Approximate saturated vapor enthalpy at 20°C
-        
-        if second_property == 'enthalpy':
-            h = float(second_value)
-            if h < hf:
-                return 'Compressed Liquid'
-            elif h > hg:
-                return 'Superheated Vapor'
-            elif abs(h - hf) < 0.1:
-                return 'Saturated Liquid'
-            elif abs(h - hg) < 0.1:
-                return 'Saturated Vapor'
-            else:
-                quality = (h - hf) / (hg - hf)
-                return f'Saturated Liquid-Vapor Mixture (x = {quality:.4f})'
-
-    return 'Saturated'  # Default state if conditions don't match
-
-def get_mock_calculations(substance, first_property, first_value, second_property, second_value):
+    if second_property in FIRST_PROPERTIES:
+        values = {first_property: first_values, second_property: second_values}
+        return thermo_cycles.pressure_temperature_states(data_dict, substance, values['pressure'],
+                                                         values['temperature'])
+    return thermo.evaluate_states(data_dict, substance, first_property, first_values,
+                                  second_property, second_values)
+
+def calculate_states(requests):
     """
-    Get mock thermodynamic calculations with improved state determination
+    Evaluate a list of parsed state requests in as few vectorized passes as
+    possible: one evaluate_states call per (substance, first, second property).
+    A group that cannot be evaluated answers with an error for its requests
+    only.
     """
-    state = determine_state(substance, first_property, first_value, second_property, second_value)
-    
-    # Mock properties based on water at 20°C
-    if substance == 'water' and first_property == 'temperature' and float(first_value) == 20:
-        hf = 83.9  # Saturated liquid enthalpy
-        hg = 2538.1  # Saturated vapor enthalpy
-        h = float(second_value) if second_property == 'enthalpy' else 100
-        
-        if second_property == 'enthalpy':
-            quality = (h - hf) / (hg - hf) if hf < h < hg else 0
-            details = f"Calculation performed for {substance} at {first_value}°C and {second_value} kJ/kg"
-            if 0 < quality < 1:
-                details += f" (Quality = {quality:.4f})"
-        else:
-            details = f"Calculation performed for {substance} at {first_value}°C and {second_value} kJ/kg"
-
-        return {
-            'status': 'success',
-            'state': state,
-            'details': details,
-            'saturationProperties': {
-                'Temperature (°C)': float(first_value),
-                'Pressure (bar)': 0.0234,  # Actual saturation pressure at 20°C
-                'Specific Volume (m³/kg)': 1.673,
-                'Internal Energy (kJ/kg)': 2506.7,
-                'Enthalpy (kJ/kg)': h,
-                'Entropy (kJ/kg·K)': 7.3589
-            }
-        }
-    
-    # Default mock response for other conditions
-    return {
-        'status': 'success',
-        'state': state,
-        'details': f"Calculation performed for {substance} at {first_value} and {second_value}",
-        'saturationProperties': {
-            'Temperature (°C)': float(first_value) if first_property == 'temperature' else 100.0,
-            'Pressure (bar)': float(first_value) if first_property == 'pressure' else 1.013,
-            'Specific Volume (m³/kg)': 1.673,
-            'Internal Energy (kJ/kg)': 2506.7,
-            'Enthalpy (kJ/kg)': float(second_value) if second_property == 'enthalpy' else 2676.1,
-            'Entropy (kJ/kg·K)': 7.3589
-        }
-    }
+    results = [None] * len(requests)
+    groups = {}
+    for i, (substance, first_property, first_value, second_property, second_value) in enumerate(requests):
+        groups.setdefault((substance, first_property, second_property), []).append(i)
+
+    for (substance, first_property, second_property), indices in groups.items():
+        first_values = np.array([requests[i][2] for i in indices])
+        second_values = np.array([requests[i][4] for i in indices])
+        try:
+            batch = evaluate_group(substance, first_property, first_values, second_property, second_values)
+        except (KeyError, TypeError, ValueError) as e:
+            message = e.args[0] if isinstance(e, KeyError) and e.args else str(e)
+            for i in indices:
+                results[i] = {
+                    'status': 'error',
+                    'message': message
+                }
+            continue
+        for j, i in enumerate(indices):
+            results[i] = format_result(batch, j, first_values[j], second_values[j])
+
+    return results
 
 @app.route('/api/calculate', methods=['POST'])
 def calculate():
     try:
-        data = request.json
-        substance = data['substance']
-        first_property = data['firstProperty']
-        first_value = float(data['firstValue'])
-        second_property = data['secondProperty']
-        second_value = float(data['secondValue'])
-
-        result = get_mock_calculations(
-            substance, 
-            first_property, 
-            first_value,
-            second_property,
-            second_value
-        )
-        
+        state_request = parse_state_request(request.json)
+        result = calculate_states([state_request])[0]
         return jsonify(result)
 
     except Exception as e:
@@ -104,5 +148,106 @@ def calculate():
             'message': str(e)
         })
 
+@app.route('/api/calculate/batch', methods=['POST'])
+def calculate_batch():
+    """
+    Evaluate many states in one call. Accepts a JSON array of state requests
+    (same fields as /api/calculate) and answers with a JSON array, or an
+    NDJSON body (application/x-ndjson, one request per line) and answers
+    with NDJSON in the same order.
+    """
+    ndjson = request.mimetype == 'application/x-ndjson'
+    try:
+        if ndjson:
+            # Lines are read from the stream and decoded one at a time below
+            items = (line for line in request.stream if line.strip())
+        else:
+            items = request.get_json()
+            if not isinstance(items, list):
+                raise ValueError("Batch body must be a JSON array of state requests")
+
+        parsed = []
+        errors = {}
+        for i, item in enumerate(items):
+            try:
+                parsed.append(parse_state_request(json.loads(item) if ndjson else item))
+            except (KeyError, TypeError, ValueError) as e:
+                errors[i] = {'status': 'error', 'message': f"Invalid state request: {e}"}
+
+        computed = iter(calculate_states(parsed))
+        results = [errors[i] if i in errors else next(computed) for i in range(len(parsed) + len(errors))]
+
+        if ndjson:
+            body = ''.join(json.dumps(result) + '\n' for result in results)
+            return Response(body, mimetype='application/x-ndjson')
+        return jsonify(results)
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+def parse_levels(text):
+    """
+    Comma-separated line levels from a query parameter, or None for the
+    defaults. Raises ValueError for more than MAX_DIAGRAM_LINES levels.
+    """
+    if text is None:
+        return None
+    values = [value for value in text.split(',') if value.strip()]
+    if len(values) > MAX_DIAGRAM_LINES:
+        raise ValueError(f"At most {MAX_DIAGRAM_LINES} levels per line family, got {len(values)}")
+    return [float(value) for value in values]
+
+@app.route('/api/diagram/<substance>', methods=['GET'])
+def diagram(substance):
+    """
+    Saturation dome, constant-quality lines, isobars and isotherms of a
+    substance projected on a T-s, P-h or P-v chart (?kind=ts|ph|pv).
+    Optional ?resolution= (points per line segment), ?isobars=, ?isotherms=
+    and ?qualities= (comma-separated levels, at most MAX_DIAGRAM_LINES each;
+    more is rejected with a 400). Answers with JSON arrays, or
+    with the compact float32 layout of thermo_diagrams.to_binary when
+    ?format=binary.
+    """
+    try:
+        kind = request.args.get('kind', 'ts')
+        resolution = min(int(request.args.get('resolution', 100)), MAX_DIAGRAM_RESOLUTION)
+        qualities = parse_levels(request.args.get('qualities'))
+        isobars = parse_levels(request.args.get('isobars'))
+        isotherms = parse_levels(request.args.get('isotherms'))
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+
+    try:
+        result = diagrams.get(
+            normalize_substance(substance),
+            resolution=resolution,
+            isobars=isobars,
+            isotherms=isotherms,
+            qualities=thermo_diagrams.DEFAULT_QUALITIES if qualities is None else qualities
+        )
+        if request.args.get('format') == 'binary':
+            return Response(thermo_diagrams.to_binary(result, kind), mimetype='application/octet-stream')
+        return jsonify(thermo_diagrams.to_json(result, kind))
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Per-stage call counts and latency histograms in Prometheus text format.
+    Empty unless the server was started with THERMO_METRICS=1.
+    """
+    return Response(thermo_metrics.registry.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,183 @@
+"""
+ASGI server mode with request coalescing.
+
+Concurrent /api/calculate requests are collected into micro-batches: a
+batch is evaluated when it reaches THERMO_MAX_BATCH requests or
+THERMO_BATCH_WINDOW_MS after its first request arrived, whichever comes
+first. Each batch goes through one vectorized calculate_states call on a
+worker thread, and the results are handed back to the waiting requests.
+The request and response format is the same as the Flask app's.
+
+Run with any ASGI server, e.g.:
+    uvicorn asgi:app --port 5000
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from app import calculate_states, parse_state_request
+
+BATCH_WINDOW = float(os.environ.get('THERMO_BATCH_WINDOW_MS', '2')) / 1000.0
+MAX_BATCH = int(os.environ.get('THERMO_MAX_BATCH', '256'))
+
+
+def settle(future, result=None, exception=None):
+    """Resolve a future unless its request was cancelled meanwhile."""
+    if future.done():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent submit() calls into lists passed to `evaluate`,
+    which must return one result per item in order. Batches run one at a
+    time on a worker thread so the event loop keeps accepting requests
+    while numpy works.
+
+    With `validate`, each item is replaced by validate(item) before it is
+    queued, so a malformed request fails its own submit() and never joins a
+    batch. If `evaluate` still raises for a batch, its items are evaluated
+    one by one and only the failing ones get the exception.
+    """
+
+    def __init__(self, evaluate, max_batch=MAX_BATCH, window=BATCH_WINDOW, validate=None):
+        self.evaluate = evaluate
+        self.validate = validate
+        self.max_batch = max(1, int(max_batch))
+        self.window = window
+        self.batches = 0
+        self.items = 0
+        self._pending = []
+        self._timer = None
+        # Running batches, referenced until done so they are not collected
+        self._tasks = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='thermo-batch')
+
+    async def submit(self, item):
+        if self.validate is not None:
+            item = self.validate(item)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch or self.window <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _evaluate(self, items):
+        results = self.evaluate(items)
+        if len(results) != len(items):
+            raise ValueError(f"evaluate returned {len(results)} results for {len(items)} items")
+        return results
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await loop.run_in_executor(self._executor, self._evaluate, [item for item, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                settle(batch[0][1], exception=e)
+                return
+            # Isolate the failure: only the items that fail on their own get it
+            for item, future in batch:
+                try:
+                    result, = await loop.run_in_executor(self._executor, self._evaluate, [item])
+                except Exception as item_error:
+                    settle(future, exception=item_error)
+                else:
+                    settle(future, result)
+            return
+        for (_, future), result in zip(batch, results):
+            settle(future, result)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': self.items / self.batches if self.batches else 0.0
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def send_response(send, status, body, content_type=b'application/json'):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type),
+            (b'content-length', str(len(body)).encode()),
+            (b'access-control-allow-origin', b'*'),
+            (b'access-control-allow-headers', b'content-type')
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def make_app(max_batch=MAX_BATCH, window=BATCH_WINDOW):
+    """Build the ASGI application with its own MicroBatcher."""
+    batcher = MicroBatcher(calculate_states, max_batch=max_batch, window=window, validate=parse_state_request)
+
+    async def application(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    batcher.close()
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        method = scope['method']
+        path = scope['path']
+        if method == 'OPTIONS':
+            await send_response(send, 204, b'')
+            return
+        if path == '/api/calculate' and method == 'POST':
+            body = await read_body(receive)
+            try:
+                result = await batcher.submit(json.loads(body))
+            except Exception as e:
+                result = {'status': 'error', 'message': str(e)}
+            await send_response(send, 200, json.dumps(result).encode())
+        elif path == '/api/batcher' and method == 'GET':
+            await send_response(send, 200, json.dumps(batcher.stats()).encode())
+        else:
+            await send_response(send, 404, json.dumps({'status': 'error', 'message': 'Not found'}).encode())
+
+    application.batcher = batcher
+    return application
+
+
+app = make_app()
@@ -19,4 +19,64 @@ export const calculateProperties = async (data) => {
     console.error('API Error:', error);
     throw error;
   }
-};
\ No newline at end of file
+};
+
+export const calculateBatch = async (states) => {
+  try {
+    const response = await fetch(`${API_URL}/calculate/batch`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(states),
+    });
+    
+    if (!response.ok) {
+      throw new Error('Batch calculation failed');
+    }
+    
+    return await response.json();
+  } catch (error) {
+    console.error('API Error:', error);
+    throw error;
+  }
+};
+
+// Diagram line data: x/y arrays per family (dome, quality, isobar, isotherm)
+// as Float32Array lines, decoded from the binary layout of /api/diagram
+export const fetchDiagram = async (substance, kind = 'ts', resolution = 100) => {
+  try {
+    const params = new URLSearchParams({ kind, resolution, format: 'binary' });
+    const response = await fetch(`${API_URL}/diagram/${encodeURIComponent(substance)}?${params}`);
+
+    if (!response.ok) {
+      throw new Error('Diagram request failed');
+    }
+
+    const buffer = await response.arrayBuffer();
+    const view = new DataView(buffer);
+    const magic = new TextDecoder().decode(new Uint8Array(buffer, 0, 4));
+    if (magic !== 'THD1') {
+      throw new Error(JSON.parse(new TextDecoder().decode(buffer)).message || 'Invalid diagram data');
+    }
+    const headerLength = view.getUint32(4, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+    const start = 8 + headerLength;
+
+    const families = {};
+    for (const [name, family] of Object.entries(header.families)) {
+      const [lines, points] = family.shape;
+      const line = (offset, i) => new Float32Array(buffer, start + offset + i * points * 4, points);
+      families[name] = {
+        level: family.level,
+        levels: family.levels,
+        x: Array.from({ length: lines }, (_, i) => line(family.x_offset, i)),
+        y: Array.from({ length: lines }, (_, i) => line(family.y_offset, i)),
+      };
+    }
+    return { ...header, families };
+  } catch (error) {
+    console.error('API Error:', error);
+    throw error;
+  }
+};
@@ -0,0 +1,229 @@
+"""
+Non-interactive bulk evaluator.
+
+Streams a CSV or Parquet file of state specifications in chunks, evaluates
+each chunk with evaluate_states and appends the results to the output file
+as it goes, so memory use does not depend on the file size.
+
+Input columns:
+    substance, first_property, first_value, second_property, second_value
+substance / first_property / second_property may instead be given once on
+the command line for the whole file.
+
+Usage:
+    python thermo_bulk.py states.csv results.csv --chunksize 100000 --workers 4
+
+Parquet input/output (.parquet) needs pyarrow.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import thermo_calc_python as thermo
+
+INPUT_COLUMNS = ('substance', 'first_property', 'first_value', 'second_property', 'second_value')
+RESULT_COLUMNS = ('state', 'phase', 'quality', 'temperature', 'pressure',
+                  'specific_volume', 'internal_energy', 'enthalpy', 'entropy')
+
+# Tables of a worker process, opened once by the pool initializer
+_worker_data = None
+
+
+def is_parquet(path):
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Parquet files need pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def read_chunks(path, chunksize):
+    """Yield DataFrames of at most `chunksize` rows from a CSV or Parquet file."""
+    if is_parquet(path):
+        pa = _require_pyarrow()
+        parquet_file = pa.parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, skipinitialspace=True)
+
+
+def format_chunk(df, parquet):
+    """Serialize a result chunk for ChunkWriter: CSV text without header, or the DataFrame itself."""
+    return df if parquet else df.to_csv(index=False, header=False)
+
+
+class ChunkWriter:
+    """Appends result chunks (as produced by format_chunk) to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = is_parquet(path)
+        self._writer = None
+        if self.parquet:
+            _require_pyarrow()
+            self._file = None
+        else:
+            self._file = open(path, 'w', newline='')
+            self._file.write(','.join(INPUT_COLUMNS + RESULT_COLUMNS) + '\n')
+
+    def write(self, chunk):
+        if self.parquet:
+            pa = _require_pyarrow()
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._writer is None:
+                self._writer = pa.parquet.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            self._file.write(chunk)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def normalize_chunk(chunk, defaults):
+    """Fill constant columns from `defaults` and normalize substance names."""
+    for column, value in defaults.items():
+        if value is not None and column not in chunk:
+            chunk[column] = value
+    missing = [column for column in INPUT_COLUMNS if column not in chunk]
+    if missing:
+        raise ValueError(f"Input is missing columns {missing}")
+    chunk = chunk.loc[:, list(INPUT_COLUMNS)].copy()
+    chunk['substance'] = (chunk['substance'].astype(str).str.strip().str.lower()
+                          .str.replace(' ', '_').str.replace('-', '_').replace('r134a', 'r_134a'))
+    chunk['first_property'] = chunk['first_property'].astype(str).str.strip().str.lower()
+    chunk['second_property'] = chunk['second_property'].astype(str).str.strip().str.lower()
+    # float64 even for all-integer chunks, so every Parquet row group has the same schema
+    chunk['first_value'] = pd.to_numeric(chunk['first_value'], errors='coerce').astype(np.float64)
+    chunk['second_value'] = pd.to_numeric(chunk['second_value'], errors='coerce').astype(np.float64)
+    return chunk
+
+
+def evaluate_chunk(data_dict, chunk):
+    """
+    Evaluate one normalized chunk: one vectorized evaluate_states call per
+    (substance, first property, second property) group. Rows without a
+    matching table come back as 'Unknown' with NaN properties.
+    """
+    n = len(chunk)
+    result = {'phase': np.full(n, thermo.PHASE_UNKNOWN, dtype=np.int8)}
+    for column in RESULT_COLUMNS[2:]:
+        result[column] = np.full(n, np.nan)
+
+    keys = ['substance', 'first_property', 'second_property']
+    for (substance, first_property, second_property), index in chunk.groupby(keys, sort=False).indices.items():
+        try:
+            batch = thermo.evaluate_states(data_dict, substance, first_property,
+                                           chunk['first_value'].to_numpy()[index],
+                                           second_property, chunk['second_value'].to_numpy()[index])
+        except KeyError:
+            continue
+        for column, values in result.items():
+            values[index] = batch[column]
+
+    out = chunk.reset_index(drop=True)
+    out['state'] = pd.Series(result['phase']).map(thermo.PHASE_NAMES)
+    for column in RESULT_COLUMNS[1:]:
+        out[column] = result[column]
+    return out
+
+
+def _init_worker(mmap):
+    global _worker_data
+    _worker_data = thermo.load_all_data(mmap=mmap)
+
+
+def _evaluate_in_worker(chunk, parquet):
+    return len(chunk), format_chunk(evaluate_chunk(_worker_data, chunk), parquet)
+
+
+def run(input_path, output_path, chunksize=100000, workers=1, defaults=None, progress=False):
+    """
+    Stream `input_path` through the evaluator into `output_path`.
+    With workers > 1 chunks are evaluated and serialized in a process pool;
+    at most two chunks per worker are in flight and results are written in
+    input order. Returns (rows, seconds).
+    """
+    defaults = defaults or {}
+    writer = ChunkWriter(output_path)
+    rows = 0
+    start = time.perf_counter()
+
+    def written(count, formatted):
+        nonlocal rows
+        writer.write(formatted)
+        rows += count
+        if progress:
+            elapsed = time.perf_counter() - start
+            print(f"{rows} rows, {rows / elapsed:,.0f} rows/s", file=sys.stderr)
+
+    chunks = (normalize_chunk(chunk, defaults) for chunk in read_chunks(input_path, chunksize))
+    try:
+        if workers <= 1:
+            data_dict = thermo.load_all_data()
+            for chunk in chunks:
+                written(len(chunk), format_chunk(evaluate_chunk(data_dict, chunk), writer.parquet))
+        else:
+            # Compile the cache once here so workers only map it
+            thermo.load_all_data()
+            pending = deque()
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(True,)) as pool:
+                for chunk in chunks:
+                    pending.append(pool.submit(_evaluate_in_worker, chunk, writer.parquet))
+                    if len(pending) >= 2 * workers:
+                        written(*pending.popleft().result())
+                while pending:
+                    written(*pending.popleft().result())
+    finally:
+        writer.close()
+
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate a CSV/Parquet file of thermodynamic states.")
+    parser.add_argument('input', help="CSV or Parquet file of state specifications")
+    parser.add_argument('output', help="CSV or Parquet file to write the results to")
+    parser.add_argument('--chunksize', type=int, default=100000, help="rows per chunk (default 100000)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f"worker processes (default 1, this machine has {os.cpu_count()} cores)")
+    parser.add_argument('--substance', help="substance for every row, if the file has no substance column")
+    parser.add_argument('--first-property', choices=['pressure', 'temperature'],
+                        help="first property for every row, if the file has no first_property column")
+    parser.add_argument('--second-property', choices=sorted(thermo.PROPERTY_INDEX),
+                        help="second property for every row, if the file has no second_property column")
+    parser.add_argument('--progress', action='store_true', help="report progress after every chunk")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.progress else logging.WARNING, format="%(message)s")
+
+    defaults = {
+        'substance': args.substance,
+        'first_property': args.first_property,
+        'second_property': args.second_property
+    }
+    rows, seconds = run(args.input, args.output, chunksize=args.chunksize, workers=args.workers,
+                        defaults=defaults, progress=args.progress)
+    rate = rows / seconds if seconds else float('inf')
+    print(f"Evaluated {rows} rows in {seconds:.2f} s ({rate:,.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,489 @@
+"""
+Binary cache of the compiled thermodynamic tables.
+
+Each compiled table is stored as plain .npy arrays under
+<cache_dir>/<substance>/, next to a manifest.json that records the cache
+format version, a fingerprint of every sheet of every source workbook and
+a checksum of every array file. Opening the store only reads the manifest;
+a table's arrays are read the first time that table is requested.
+
+Builds are incremental: when a workbook changes, only the sheets whose
+fingerprint changed are recompiled, and every compiled table is validated
+before it is written.
+
+With mmap=True the arrays are memory-mapped read-only instead of read, so
+every worker process of a pool shares the same page-cache copy.
+
+Uniform resamplings of the saturation tables and SHV/CL grids (see
+thermo_resample) can be stored alongside, built with build_cache(...,
+resample=...). Each records the checksums of the table it was made from and
+is rebuilt when that table or the requested options change.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import zipfile
+from xml.etree import ElementTree
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from thermo_resample import UniformAxis, UniformGrid, UniformSaturationTable, resample_options, resample_table
+from thermo_tables import (
+    IdealGasTable, PropertyGrid, SaturationTable, compile_ideal_gas_table, compile_property_grid,
+    compile_saturation_table, grid_table_name, ideal_gas_table_name, standardize_sheet_name, table_substance
+)
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Bump whenever the on-disk layout or the compiled representation changes
+CACHE_VERSION = 6
+MANIFEST_NAME = "manifest.json"
+
+# Arrays saved for each kind of compiled table
+TABLE_ARRAYS = {
+    "saturation": ("data", "slopes"),
+    "grid": ("pressures", "temperatures", "values", "t_sat", "t_min", "t_max"),
+    "ideal": ("data", "slopes"),
+    "uniform_saturation": ("data",),
+    "uniform_grid": ("pressures", "p_index", "values", "t_min", "t_max", "t_sat")
+}
+
+_XLSX_NS = {
+    "main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships"
+}
+_XLSX_RID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_SHARED_STRING_CELL = re.compile(rb'(<c\b[^>]*\bt="s"[^>]*>\s*<v>)(\d+)(</v>)')
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(path):
+    """Fingerprint of a source workbook: mtime, size and a content hash per sheet."""
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sheets": sheet_fingerprints(path)}
+
+
+def _shared_strings(archive):
+    try:
+        root = ElementTree.fromstring(archive.read("xl/sharedStrings.xml"))
+    except KeyError:
+        return []
+    return ["".join(t.text or "" for t in si.iter(f"{{{_XLSX_NS['main']}}}t"))
+            for si in root.findall("main:si", _XLSX_NS)]
+
+
+def sheet_fingerprints(path):
+    """
+    {sheet name: sha256} of every worksheet of an .xlsx workbook, in workbook order.
+
+    Each hash covers the sheet's own XML member plus the shared strings it
+    references, so editing one sheet (even adding text to the workbook-wide
+    shared string table) leaves the other sheets' fingerprints unchanged.
+    """
+    with zipfile.ZipFile(path) as archive:
+        rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels.findall("rel:Relationship", _XLSX_NS)}
+        workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+        strings = _shared_strings(archive)
+
+        fingerprints = {}
+        for sheet in workbook.iterfind("main:sheets/main:sheet", _XLSX_NS):
+            target = targets[sheet.get(_XLSX_RID)]
+            member = target.lstrip("/") if target.startswith("/") else "xl/" + target
+            # Hash the referenced text rather than its index, which shifts
+            # whenever any sheet adds or removes a string
+            xml = _SHARED_STRING_CELL.sub(lambda m: m.group(1) + strings[int(m.group(2))].encode() + m.group(3),
+                                          archive.read(member))
+            fingerprints[sheet.get("name")] = hashlib.sha256(xml).hexdigest()
+    return fingerprints
+
+
+def compile_saturation_sheet(xls, sheet_name):
+    """Compile one sheet of the saturation workbook (thermo_data.xlsx) -> (table name, table)."""
+    name = standardize_sheet_name(sheet_name)
+    return name, compile_saturation_table(pd.read_excel(xls, sheet_name=sheet_name), name)
+
+
+def compile_grid_sheet(xls, sheet_name, suffix, saturation_side):
+    """
+    Compile one sheet of an SHV/CL workbook into a PropertyGrid named
+    '<substance>_<suffix>', e.g. 'Superheated R-134a Vapor' -> 'r_134a_shv_table'.
+    """
+    name = grid_table_name(sheet_name, suffix)
+    raw = pd.read_excel(xls, sheet_name=sheet_name, header=None)
+    return name, compile_property_grid(raw, name, saturation_side=saturation_side)
+
+
+def compile_ideal_gas_sheet(xls, sheet_name):
+    """Compile one sheet of the ideal-gas workbook (ideal_table.xlsx), e.g. 'Air' -> 'air_ideal_table'."""
+    name = ideal_gas_table_name(sheet_name)
+    return name, compile_ideal_gas_table(pd.read_excel(xls, sheet_name=sheet_name, header=None), name)
+
+
+def _table_kind(table):
+    if isinstance(table, SaturationTable):
+        return "saturation"
+    if isinstance(table, IdealGasTable):
+        return "ideal"
+    if isinstance(table, UniformSaturationTable):
+        return "uniform_saturation"
+    if isinstance(table, UniformGrid):
+        return "uniform_grid"
+    return "grid"
+
+
+def _axis_entry(axis):
+    return {"lo": axis.lo, "hi": axis.hi, "size": axis.size, "scale": axis.scale}
+
+
+def _write_array(path, array):
+    """Atomically write one .npy file and return its checksum."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return file_sha256(path)
+
+
+def save_table(cache_dir, name, table):
+    """Write a compiled table's arrays and return its manifest entry."""
+    substance = table_substance(name)
+    directory = os.path.join(cache_dir, substance)
+    os.makedirs(directory, exist_ok=True)
+
+    kind = _table_kind(table)
+    entry = {"kind": kind, "substance": substance, "files": {}}
+    stem = name
+    if kind == "saturation":
+        entry["key_index"] = table.key_index
+    elif kind == "ideal":
+        entry["basis"] = table.basis
+        entry["molar_mass"] = table.molar_mass
+    elif kind == "uniform_saturation":
+        stem = f"{name}.uniform"
+        entry.update(key_index=table.key_index, axis=_axis_entry(table.axis), method=table.method)
+    elif kind == "uniform_grid":
+        stem = f"{name}.uniform"
+        entry.update(p_axis=_axis_entry(table.p_axis), t_axis=_axis_entry(table.t_axis), method=table.method)
+    for array_name in TABLE_ARRAYS[kind]:
+        filename = f"{stem}.{array_name}.npy"
+        entry["files"][array_name] = {
+            "path": os.path.join(substance, filename),
+            "sha256": _write_array(os.path.join(directory, filename), getattr(table, array_name))
+        }
+    return entry
+
+
+def load_table(cache_dir, name, entry, verify=True, mmap=False):
+    """Read (or with mmap=True, map read-only) a compiled table from its manifest entry."""
+    arrays = {}
+    for array_name, info in entry["files"].items():
+        path = os.path.join(cache_dir, info["path"])
+        if verify and file_sha256(path) != info["sha256"]:
+            raise ValueError(f"Checksum mismatch for cached array {info['path']}")
+        arrays[array_name] = np.load(path, mmap_mode='r' if mmap else None, allow_pickle=False)
+
+    if entry["kind"] == "saturation":
+        return SaturationTable(name, entry["key_index"], arrays["data"], arrays["slopes"])
+    if entry["kind"] == "ideal":
+        return IdealGasTable(name, entry["basis"], entry["molar_mass"], arrays["data"], arrays["slopes"])
+    if entry["kind"] == "uniform_saturation":
+        return UniformSaturationTable(name, entry["key_index"], UniformAxis(**entry["axis"]), arrays["data"],
+                                      entry["method"])
+    if entry["kind"] == "uniform_grid":
+        return UniformGrid(name, arrays["pressures"], UniformAxis(**entry["p_axis"]), arrays["p_index"],
+                           UniformAxis(**entry["t_axis"]), arrays["values"], arrays["t_min"], arrays["t_max"],
+                           arrays["t_sat"], entry["method"])
+    return PropertyGrid(name, arrays["pressures"], arrays["temperatures"], arrays["values"],
+                        arrays["t_sat"], arrays["t_min"], arrays["t_max"])
+
+
+def read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest.get("version") != CACHE_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(cache_dir, manifest):
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(cache_dir, MANIFEST_NAME))
+
+
+def _stale_sheets(path, recorded, force=False):
+    """
+    Compare a source workbook with its recorded fingerprint.
+
+    Returns None when its mtime and size are unchanged. Otherwise returns
+    (fingerprint, stale, removed): the new fingerprint, the sheets that are
+    new or whose content changed (every sheet if `force`), and the recorded
+    sheets that no longer exist.
+    """
+    stat = os.stat(path)
+    if (not force and recorded is not None and stat.st_mtime_ns == recorded["mtime_ns"]
+            and stat.st_size == recorded["size"]):
+        return None
+    fingerprint = source_fingerprint(path)
+    known = {} if force or recorded is None else recorded["sheets"]
+    stale = [sheet for sheet, digest in fingerprint["sheets"].items() if known.get(sheet) != digest]
+    removed = [sheet for sheet in known if sheet not in fingerprint["sheets"]]
+    return fingerprint, stale, removed
+
+
+def _table_checksums(entry):
+    return {array_name: info["sha256"] for array_name, info in entry["files"].items()}
+
+
+def _update_resampled(cache_dir, manifest, resample=None, force=()):
+    """
+    Bring the resampled tables of the manifest up to date: drop those whose
+    table is gone and rebuild those whose table changed or comes from a
+    workbook listed in `force`. With `resample` (keyword arguments of
+    resample_options) every saturation table and SHV/CL grid is resampled
+    with those options unless it already is. Returns whether anything
+    changed.
+    """
+    resampled = manifest.setdefault("resampled", {})
+    changed = False
+    for name in list(resampled):
+        if name not in manifest["tables"]:
+            del resampled[name]
+            changed = True
+
+    names = list(manifest["tables"]) if resample is not None else list(resampled)
+    for name in names:
+        base = manifest["tables"][name]
+        if base["kind"] not in ("saturation", "grid"):
+            continue
+        entry = resampled.get(name)
+        options = list(resample_options(name, **resample)) if resample is not None else entry["options"]
+        checksums = _table_checksums(base)
+        if (entry is not None and entry["options"] == options and entry["base"] == checksums
+                and base.get("source") not in force):
+            continue
+        logger.info("Resampling %s onto %d nodes (%s)...", name, options[0], options[1])
+        entry = save_table(cache_dir, name, resample_table(load_table(cache_dir, name, base), *options))
+        entry["options"] = options
+        entry["base"] = checksums
+        resampled[name] = entry
+        changed = True
+    return changed
+
+
+def build_cache(cache_dir, sources, force=(), resample=None):
+    """
+    Bring the cache in `cache_dir` up to date and return its manifest.
+
+    `sources` maps a workbook path to a compile_sheet(xls, sheet_name)
+    function returning (table name, compiled table). Workbooks whose mtime
+    or size changed are fingerprinted sheet by sheet, and only the sheets
+    whose content changed are recompiled (every sheet of a workbook whose
+    basename is listed in `force`); tables of deleted sheets are dropped and
+    missing workbooks are skipped. All changed sheets are compiled and
+    validated before anything is written, so a sheet with bad data raises
+    ValueError and leaves the cache as it was.
+
+    `resample` (keyword arguments of thermo_resample.resample_options, e.g.
+    {'size': 1024, 'overrides': {'water': 4096}}) also stores a uniform
+    resampling of every saturation table and SHV/CL grid. Resamplings built
+    earlier are kept, and rebuilt when their table changes.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = read_manifest(cache_dir) or {"version": CACHE_VERSION, "sources": {}, "tables": {}}
+
+    updates = []
+    for path, compile_sheet in sources.items():
+        source = os.path.basename(path)
+        if not os.path.exists(path):
+            logger.warning("Source workbook not found: %s", path)
+            continue
+        status = _stale_sheets(path, manifest["sources"].get(source), force=source in force)
+        if status is None:
+            continue
+        fingerprint, stale, removed = status
+
+        compiled = {}
+        if stale:
+            logger.info("Compiling %d of %d sheets of %s into the table cache...",
+                        len(stale), len(fingerprint["sheets"]), source)
+            xls = pd.ExcelFile(path)
+            for sheet in stale:
+                try:
+                    compiled[sheet] = compile_sheet(xls, sheet)
+                except ValueError as e:
+                    raise ValueError(f"{source}, sheet '{sheet}': {e}") from e
+        updates.append((source, fingerprint, set(stale) | set(removed), compiled))
+
+    for source, fingerprint, replaced, compiled in updates:
+        for name, entry in list(manifest["tables"].items()):
+            if entry.get("source") == source and entry.get("sheet") in replaced:
+                del manifest["tables"][name]
+        for sheet, (name, table) in compiled.items():
+            entry = save_table(cache_dir, name, table)
+            entry["source"] = source
+            entry["sheet"] = sheet
+            manifest["tables"][name] = entry
+        manifest["sources"][source] = fingerprint
+
+    resampled = _update_resampled(cache_dir, manifest, resample, force)
+    if updates or resampled:
+        write_manifest(cache_dir, manifest)
+    return manifest
+
+
+def manifest_version(manifest):
+    """Token of the cached table contents: changes whenever any cached array does."""
+    checksums = {name: _table_checksums(entry) for name, entry in manifest["tables"].items()}
+    return hashlib.sha256(json.dumps(checksums, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class TableStore(Mapping):
+    """
+    Read-only mapping of table name -> compiled table backed by the cache.
+
+    Tables are loaded on first access and kept resident afterwards, so a
+    process only pays for the substances it actually uses. With mmap=True
+    the arrays are read-only views of the cache files. `version` identifies
+    the table contents, e.g. for keying caches of derived results.
+    Resampled tables, if the cache has them, are read by resampled().
+    """
+
+    def __init__(self, cache_dir, manifest, sources=None, verify=True, mmap=False):
+        self.cache_dir = cache_dir
+        self.manifest = manifest
+        self.version = manifest_version(manifest)
+        self.sources = sources or {}
+        self.verify = verify
+        self.mmap = mmap
+        self._tables = {}
+        self._resampled = {}
+
+    def __getitem__(self, name):
+        table = self._tables.get(name)
+        if table is None:
+            entry = self.manifest["tables"][name]
+            try:
+                table = load_table(self.cache_dir, name, entry, verify=self.verify, mmap=self.mmap)
+            except (OSError, ValueError) as e:
+                if entry.get("source") is None or not self.sources:
+                    raise
+                # Damaged cache file: recompile its workbook and retry once
+                logger.warning("%s; rebuilding %s", e, entry['source'])
+                self.manifest = build_cache(self.cache_dir, self.sources, force=(entry["source"],))
+                self.version = manifest_version(self.manifest)
+                table = load_table(self.cache_dir, name, self.manifest["tables"][name],
+                                   verify=self.verify, mmap=self.mmap)
+            self._tables[name] = table
+        return table
+
+    def resampled(self, name):
+        """
+        The uniform resampling of table `name` (a thermo_resample
+        UniformSaturationTable or UniformGrid), read on first request.
+        Raises KeyError if the cache has none.
+        """
+        table = self._resampled.get(name)
+        if table is None:
+            entry = self.manifest.get("resampled", {}).get(name)
+            if entry is None:
+                raise KeyError(f"No resampled table {name} in the cache; build one with "
+                               f"load_all_data(resample=...) or thermo_resample.py --save")
+            try:
+                table = load_table(self.cache_dir, name, entry, verify=self.verify, mmap=self.mmap)
+            except (OSError, ValueError) as e:
+                source = self.manifest["tables"][name].get("source")
+                if source is None or not self.sources:
+                    raise
+                logger.warning("%s; rebuilding %s", e, source)
+                self.manifest = build_cache(self.cache_dir, self.sources, force=(source,))
+                self.version = manifest_version(self.manifest)
+                table = load_table(self.cache_dir, name, self.manifest["resampled"][name],
+                                   verify=self.verify, mmap=self.mmap)
+            self._resampled[name] = table
+        return table
+
+    def resampled_names(self):
+        """Names of the tables the cache holds a resampling of."""
+        return sorted(self.manifest.get("resampled", {}))
+
+    def __contains__(self, name):
+        return name in self.manifest["tables"]
+
+    def __iter__(self):
+        return iter(self.manifest["tables"])
+
+    def __len__(self):
+        return len(self.manifest["tables"])
+
+    def preload(self, substance=None):
+        """
+        Load every table now (or only those of `substance`), e.g. in a pool
+        master before forking workers.
+        """
+        names = self if substance is None else self.substance_tables(substance)
+        for name in names:
+            self[name]
+        return self
+
+    def loaded(self):
+        """Names of the tables that have been read into memory so far."""
+        return list(self._tables)
+
+    def substances(self):
+        return sorted({entry["substance"] for entry in self.manifest["tables"].values()})
+
+    def substance_tables(self, substance):
+        """Names of the tables available for `substance`, loaded or not."""
+        return sorted(name for name, entry in self.manifest["tables"].items() if entry["substance"] == substance)
+
+
+def open_table_store(cache_dir, sources, verify=True, mmap=False, resample=None):
+    """
+    Refresh the cache if any source changed (resampling the tables with
+    `resample`, see build_cache) and return a lazy TableStore over it.
+    """
+    manifest = build_cache(cache_dir, sources, resample=resample)
+    return TableStore(cache_dir, manifest, sources=sources, verify=verify, mmap=mmap)
+
+
+def process_rss():
+    """
+    Resident set size of this process in bytes, split into anonymous
+    (private heap) and file-backed (shareable, e.g. mmapped cache) pages.
+    Read from /proc/self/status, so Linux only; returns None elsewhere.
+    """
+    fields = {"VmRSS": "total", "RssAnon": "anon", "RssFile": "file", "RssShmem": "shmem"}
+    rss = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in fields:
+                    rss[fields[key]] = int(value.split()[0]) * 1024
+    except OSError:
+        return None
+    return rss
@@ -1,59 +1,257 @@
+import logging
+import numpy as np
 import pandas as pd
-import pickle
 import os
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from thermo_cache import (
+    TableStore, build_cache, compile_grid_sheet, compile_ideal_gas_sheet, compile_saturation_sheet, open_table_store
+)
+from thermo_metrics import instrumented, is_enabled as metrics_enabled, registry as metrics_registry
+from thermo_resample import uniform_grid, uniform_saturation
+from thermo_tables import (
+    GRID_PROPERTIES, KEY_INDEX, PROPERTY_INDEX, SAT_LIQUID, SAT_PRESSURE, SAT_SF, SAT_SG, SAT_TEMPERATURE,
+    SAT_VAPOR, SAT_VF, SAT_VG, SaturationRow, compiled_property_grid, compiled_saturation_table,
+    interpolate_grid, interpolate_saturation, solve_grid_pressure, solve_grid_temperature,
+    standardize_sheet_name, table_substance
+)
+
+# Library mode is silent: nothing is emitted unless the application
+# configures logging (main() does so for the interactive CLI)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 # Global file paths
-excel_file = "thermo_data.xlsx"     # Main saturation data
-shv_file = "shv_table.xlsx"         # Superheated vapor data
-cl_file = "cl_table.xlsx"           # Compressed liquid data
-ideal_file = "ideal_table.xlsx"     # Ideal gas data (for later)
-processed_data_file = "processed_thermo_data.pkl"
-
-def process_excel_data(excel_file, processed_data_file):
-    """Process and save the main thermodynamic data."""
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+excel_file = os.path.join(DATA_DIR, "thermo_data.xlsx")     # Main saturation data
+shv_file = os.path.join(DATA_DIR, "shv_table.xlsx")         # Superheated vapor data
+cl_file = os.path.join(DATA_DIR, "cl_table.xlsx")           # Compressed liquid data
+ideal_file = os.path.join(DATA_DIR, "ideal_table.xlsx")     # Ideal gas data
+cache_dir = os.path.join(DATA_DIR, ".thermo_cache")         # Compiled table cache
+
+# Phase codes returned by the batch API
+PHASE_UNKNOWN = -1
+PHASE_COMPRESSED_LIQUID = 0
+PHASE_SATURATED_LIQUID = 1
+PHASE_SATURATED_MIXTURE = 2
+PHASE_SATURATED_VAPOR = 3
+PHASE_SUPERHEATED_VAPOR = 4
+
+PHASE_NAMES = {
+    PHASE_UNKNOWN: "Unknown",
+    PHASE_COMPRESSED_LIQUID: "Compressed Liquid",
+    PHASE_SATURATED_LIQUID: "Saturated Liquid",
+    PHASE_SATURATED_MIXTURE: "Saturated Mixture",
+    PHASE_SATURATED_VAPOR: "Saturated Vapor",
+    PHASE_SUPERHEATED_VAPOR: "Superheated Vapor"
+}
+
+# Result arrays of the batch API
+STATE_KEYS = ('phase', 'quality', 'temperature', 'pressure',
+              'specific_volume', 'internal_energy', 'enthalpy', 'entropy')
+
+# The same fields as one record per state, for batches kept as a single array
+STATE_DTYPE = np.dtype([(key, np.int8 if key == 'phase' else np.float64) for key in STATE_KEYS])
+
+# Table lookups of evaluate_states: the tables themselves, or their uniform resamplings
+BACKENDS = ('exact', 'uniform')
+
+def allocate_states(shape, structured=False):
+    """
+    Uninitialised evaluate_states result arrays of `shape`, for its out=
+    argument: a dict of arrays, or with `structured` one STATE_DTYPE array.
+    """
+    if structured:
+        return np.empty(shape, dtype=STATE_DTYPE)
+    return {key: np.empty(shape, dtype=np.int8 if key == 'phase' else np.float64) for key in STATE_KEYS}
+
+def flat_state_buffers(out, shape):
+    """
+    Check evaluate_states output buffers (as from allocate_states) against
+    `shape` and return them flattened to 1-D views of the same kind: one
+    STATE_DTYPE array or a dict of arrays. Raises ValueError when `out` is
+    not C-contiguous, has the wrong shape or the wrong dtype.
+    """
+    if isinstance(out, np.ndarray):
+        if out.dtype != STATE_DTYPE or out.shape != shape or not out.flags.c_contiguous:
+            raise ValueError(f"out must be a C-contiguous STATE_DTYPE array of shape {shape}")
+        return out.reshape(-1)
+    
+    flat = {}
+    for key in STATE_KEYS:
+        values = out[key]
+        if values.shape != shape or not values.flags.c_contiguous:
+            raise ValueError(f"out['{key}'] must be a C-contiguous array of shape {shape}")
+        if values.dtype != (np.int8 if key == 'phase' else np.float64):
+            raise ValueError(f"out['{key}'] has dtype {values.dtype}")
+        flat[key] = values.reshape(-1)
+    return flat
+
+class StateResult:
+    """
+    One state from determine_state: the PHASE_* code, quality (0/1 on the
+    saturation lines, NaN outside the dome), temperature, pressure and the
+    four properties (NaN where the tables give none), as plain floats.
+
+    The state name, the details text and the properties dict keyed by
+    GRID_PROPERTIES are only built when asked for; the record keeps just the
+    second property value and its saturated liquid/vapor values for them.
+    """
+
+    __slots__ = STATE_KEYS + ('second_value', 'f_value', 'g_value')
+
+    def __init__(self, phase, quality, temperature, pressure, specific_volume=np.nan, internal_energy=np.nan,
+                 enthalpy=np.nan, entropy=np.nan, second_value=None, f_value=np.nan, g_value=np.nan):
+        self.phase = phase
+        self.quality = quality
+        self.temperature = temperature
+        self.pressure = pressure
+        self.specific_volume = specific_volume
+        self.internal_energy = internal_energy
+        self.enthalpy = enthalpy
+        self.entropy = entropy
+        self.second_value = second_value
+        self.f_value = f_value
+        self.g_value = g_value
+
+    def __repr__(self):
+        return (f"StateResult({self.state!r}, quality={self.quality}, temperature={self.temperature}, "
+                f"pressure={self.pressure}, specific_volume={self.specific_volume}, "
+                f"internal_energy={self.internal_energy}, enthalpy={self.enthalpy}, entropy={self.entropy})")
+
+    @property
+    def state(self):
+        return PHASE_NAMES[self.phase]
+
+    @property
+    def details(self):
+        """How the second property value compares with the saturation values."""
+        phase = self.phase
+        if phase == PHASE_SUPERHEATED_VAPOR:
+            return f"Value ({self.second_value}) is greater than saturated vapor value ({self.g_value})"
+        if phase == PHASE_COMPRESSED_LIQUID:
+            return f"Value ({self.second_value}) is less than saturated liquid value ({self.f_value})"
+        if phase == PHASE_SATURATED_LIQUID:
+            return f"Value ({self.second_value}) equals saturated liquid value ({self.f_value})"
+        if phase == PHASE_SATURATED_VAPOR:
+            return f"Value ({self.second_value}) equals saturated vapor value ({self.g_value})"
+        if phase == PHASE_SATURATED_MIXTURE:
+            return (f"Value ({self.second_value}) is between saturated liquid ({self.f_value}) "
+                    f"and vapor ({self.g_value})\nQuality (x) = {self.quality:.4f}")
+        return "Unable to determine state for this property"
+
+    @property
+    def properties(self):
+        """The four properties keyed by GRID_PROPERTIES, or None where the tables give none."""
+        if self.specific_volume != self.specific_volume:
+            return None
+        return dict(zip(GRID_PROPERTIES, (self.specific_volume, self.internal_energy, self.enthalpy, self.entropy)))
+
+    def as_tuple(self):
+        """The (state, details, properties, temperature, pressure) of determine_state_and_properties."""
+        if self.phase == PHASE_UNKNOWN:
+            return self.state, self.details, None, None, None
+        return self.state, self.details, self.properties, self.temperature, self.pressure
+
+    def record(self):
+        """The fields as a tuple in STATE_DTYPE order, e.g. for `states[i] = result.record()`."""
+        return (self.phase, self.quality, self.temperature, self.pressure,
+                self.specific_volume, self.internal_energy, self.enthalpy, self.entropy)
+
+# Label extractors for the optional per-stage metrics (see thermo_metrics)
+def _name_substance(name):
+    return table_substance(name) if isinstance(name, str) else None
+
+def _row_labels(args, kwargs, row):
+    return (_name_substance(row.table.name) if row is not None else None), None
+
+def _state_labels(args, kwargs, result):
+    substance = args[4] if len(args) > 4 else kwargs.get('substance')
+    if substance is None and args and args[0] is not None:
+        substance = _name_substance(args[0].table.name)
+    return substance, (result.state if result is not None else None)
+
+def _grid_labels(args, kwargs, result):
+    return _name_substance(getattr(args[0], 'name', None)), PHASE_NAMES[PHASE_SUPERHEATED_VAPOR]
+
+def _batch_labels(args, kwargs, result):
+    return (args[1] if len(args) > 1 else kwargs.get('substance')), None
+
+def _batch_items(args, kwargs, result):
+    return result['phase'].size if result is not None else 0
+
+def _superheated_batch_labels(args, kwargs, result):
+    return _name_substance(args[0].name), PHASE_NAMES[PHASE_SUPERHEATED_VAPOR]
+
+def _compressed_batch_labels(args, kwargs, result):
+    return _name_substance(args[0].name), PHASE_NAMES[PHASE_COMPRESSED_LIQUID]
+
+def _mask_items(args, kwargs, result):
+    return int(np.count_nonzero(args[-3]))
+
+def _count_phases(substance, phase):
+    """Add the states of an evaluate_states batch to the per-phase item counts."""
+    counts = np.bincount(phase.astype(np.intp) - PHASE_UNKNOWN, minlength=len(PHASE_NAMES))
+    for code, name in PHASE_NAMES.items():
+        if counts[code - PHASE_UNKNOWN]:
+            metrics_registry.add_items('evaluate_states', substance, name, int(counts[code - PHASE_UNKNOWN]))
+
+def process_excel_data(excel_file=excel_file):
+    """
+    Recompile every sheet of the main saturation workbook into the table
+    cache and return its tables by name.
+    """
     try:
-        xls = pd.ExcelFile(excel_file)
-        data_dict = {}
-        for sheet_name in xls.sheet_names:
-            df = pd.read_excel(xls, sheet_name=sheet_name)
-            standardized_sheet_name = sheet_name.lower().replace(' ', '_').replace('-', '_').replace('sat_', '').replace('r134a', 'r_134a')
-            data_dict[standardized_sheet_name] = df
-        
-        with open(processed_data_file, 'wb') as f:
-            pickle.dump(data_dict, f)
-        print("Data successfully processed and saved.")
+        source = os.path.basename(excel_file)
+        sources = {excel_file: compile_saturation_sheet}
+        manifest = build_cache(cache_dir, sources, force=(source,))
+        store = TableStore(cache_dir, manifest, sources=sources)
+        data_dict = {name: store[name] for name, entry in manifest["tables"].items() if entry.get("source") == source}
+        logger.info("Data successfully processed and saved.")
         return data_dict
     except Exception as e:
-        print(f"Error processing data: {e}")
+        logger.error("Error processing data: %s", e)
         return None
 
-def load_all_data():
-    """Load all thermodynamic data tables."""
+def table_sources():
+    """Source workbooks of the table cache and how each of their sheets is compiled."""
+    return {
+        excel_file: compile_saturation_sheet,
+        shv_file: partial(compile_grid_sheet, suffix='shv_table', saturation_side='low'),
+        cl_file: partial(compile_grid_sheet, suffix='cl_table', saturation_side='high'),
+        ideal_file: compile_ideal_gas_sheet
+    }
+
+@instrumented('load_all_data')
+def load_all_data(mmap=False, resample=None):
+    """
+    Load all thermodynamic data tables.
+    Tables come from the compiled cache (rebuilt when a workbook changes) and
+    are only read into memory when first used. mmap=True maps the cache files
+    read-only instead, so worker processes share one physical copy.
+    `resample` (e.g. {'size': 1024, 'method': 'linear'}) also stores uniform
+    resamplings of the tables in the cache for evaluate_states(...,
+    backend='uniform'); see thermo_resample.
+    """
     try:
-        # Load main saturation data
-        with open(processed_data_file, 'rb') as f:
-            data_dict = pickle.load(f)
-            print("\nSuccessfully loaded saturation data.")
-        
-        # Load SHV data
-        try:
-            print("\nAttempting to load SHV table...")
-            shv_data = pd.read_excel(shv_file)
-            data_dict['water_shv_table'] = shv_data
-            print("Successfully loaded superheated vapor table.")
-            
-        except FileNotFoundError:
-            print(f"\nError: Could not find SHV table file: {shv_file}")
-            print(f"Please ensure '{shv_file}' is in the same directory as your Python script.")
-        except Exception as e:
-            print(f"\nError loading SHV table: {e}")
-        
+        data_dict = open_table_store(cache_dir, table_sources(), mmap=mmap, resample=resample)
+        logger.info("Successfully loaded thermodynamic tables.")
         return data_dict
             
     except Exception as e:
-        print(f"\nError loading data: {e}")
+        logger.error("Error loading data: %s", e)
         return None
 
+def substance_table(data_dict, substance, kind):
+    """
+    Table of one substance by kind: 'temp', 'pressure', 'shv', 'cl' or 'ideal'.
+    Returns None if the substance has no such table. Tables of a TableStore
+    are read on first request and stay resident afterwards.
+    """
+    return data_dict.get(f"{substance}_{kind}_table")
+
 def get_user_inputs():
     """Get substance and property inputs from user."""
     valid_substances = ["water", "r134a", "ammonia", "co2", "propane"]
@@ -118,51 +316,35 @@ def determine_table_to_access(substance, property_type):
     """Determine which table to use based on inputs."""
     if property_type == "pressure":
         table_name = f"{substance}_pressure_table"
-        print(f"table to access: {table_name}")
     elif property_type == "temperature":
         table_name = f"{substance}_temp_table"
-        print(f"table to access: {table_name}")
     else:
         table_name = None
     return table_name
 
+@instrumented('get_row_by_property', labels=_row_labels)
 def get_row_by_property(df, property_type, property_value):
-    """Find the row containing properties for given temperature or pressure."""
+    """
+    Find the row containing properties for given temperature or pressure,
+    or None when the value is outside the table.
+    """
     try:
-        # Fix DataFrame structure
-        headers = df.iloc[0]
-        df = df.iloc[1:].reset_index(drop=True)
-        df.columns = headers
+        table = compiled_saturation_table(df)
         
-        column_mapping = {
-            "pressure": "Press. (bar)",
-            "temperature": "Temp. (C)"
-        }
-        
-        column_name = column_mapping.get(property_type)
-        if not column_name or column_name not in df.columns:
-            print(f"Property type '{property_type}' not found in the data.")
-            print("Available columns:", df.columns.tolist())
+        if KEY_INDEX.get(property_type) != table.key_index:
+            logger.warning("Property type '%s' is not the key of table %s (key: %s)",
+                           property_type, table.name, table.key_column)
             return None
         
-        # Convert columns to numeric
-        for col in df.columns:
-            df[col] = df[col].astype(str).str.strip()
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
         property_value = float(property_value)
-        closest_idx = (df[column_name] - property_value).abs().idxmin()
-        matching_row = df.iloc[[closest_idx]]
-        
-        if matching_row.empty:
-            print(f"No data found for {property_type} = {property_value}")
+        if not table.key[0] <= property_value <= table.key[-1]:
+            logger.warning("%s %s is outside the range of table %s", property_type, property_value, table.name)
             return None
-            
-        return matching_row
+        
+        return SaturationRow(table, interpolate_saturation(table, property_value))
         
     except Exception as e:
-        print(f"Error while processing data: {e}")
-        print("DataFrame structure:", df.head())
+        logger.error("Error while processing data: %s", e)
         return None
 
 def format_value(value, col_name):
@@ -188,241 +370,600 @@ def format_value(value, col_name):
 
 def calculate_slvm_properties(row, quality):
     """Calculate properties for saturated liquid-vapor mixture."""
-    properties = {}
-    
-    property_pairs = {
-        'Volume': ('Volume      (vf, m3/kg)', 'Volume   (vg, m3/kg)'),
-        'Internal Energy': ('Internal Energy (uf, kJ/kg)', 'Internal Energy (ug, kJ/kg)'),
-        'Enthalpy': ('Enthalpy    (hf, kJ/kg)', 'Enthalpy (hg, kJ/kg)'),
-        'Entropy': ('Entropy     (sf, kJ/kg/K)', 'Entropy     (sg, kJ/kg/K)')
-    }
-    
-    for prop_name, (f_col, g_col) in property_pairs.items():
-        z_f = float(row[f_col].iloc[0])
-        z_g = float(row[g_col].iloc[0])
-        z = quality * z_g + (1 - quality) * z_f
-        properties[prop_name] = z
-    
-    return properties
+    z_f = row.values[SAT_VF:SAT_SF + 1]
+    z_g = row.values[SAT_VG:SAT_SG + 1]
+    z = quality * z_g + (1 - quality) * z_f
+    return dict(zip(GRID_PROPERTIES, z.tolist()))
 
-def determine_state_and_properties(row, second_property, second_value, data_dict):
+@instrumented('determine_state', labels=_state_labels)
+def determine_state(row, second_property, second_value, data_dict, substance=None):
     """
-    Determine the state and calculate properties.
-    Now handles both pressure and temperature table column formats.
+    Determine the state and calculate properties as a StateResult, or None
+    if the lookup fails. Rows of pressure and temperature tables share the
+    canonical SAT_* layout. The superheated and compressed liquid tables are
+    those of `substance`, by default the substance of the table the row was
+    read from.
     """
-    # Debug print to see actual values
-    print("\nDebug - Row values:")
-    for col in row.columns:
-        print(f"{col}: {row[col].iloc[0]}")
-        
-    # Dynamically determine which format we're using based on the columns present
-    if 'Internal Energy    (uf, kJ/kg)' in row.columns:
-        # Pressure table format
-        property_columns = {
-            "specific_volume": ("Volume   (vf, m3/kg)", "Volume   (vg, m3/kg)"),
-            "internal_energy": ("Internal Energy    (uf, kJ/kg)", "Internal Energy   (ug, kJ/kg)"),
-            "enthalpy": ("Enthalpy    (hf, kJ/kg)", "Enthalpy   (hg, kJ/kg)"),
-            "entropy": ("Entropy   (sf, kJ/kg/K)", "Entropy   (sg, kJ/kg/K)")
-        }
-    else:
-        # Temperature table format
-        property_columns = {
-            "specific_volume": ("Volume      (vf, m3/kg)", "Volume   (vg, m3/kg)"),
-            "internal_energy": ("Internal Energy (uf, kJ/kg)", "Internal Energy (ug, kJ/kg)"),
-            "enthalpy": ("Enthalpy    (hf, kJ/kg)", "Enthalpy (hg, kJ/kg)"),
-            "entropy": ("Entropy     (sf, kJ/kg/K)", "Entropy     (sg, kJ/kg/K)")
-        }
-    
     try:
-        if second_property in property_columns:
-            f_col, g_col = property_columns[second_property]
-            f_value = float(row[f_col].iloc[0])
-            g_value = float(row[g_col].iloc[0])
-            
-            temperature = float(row['Temp. (C)'].iloc[0])
-            pressure = float(row['Press.   (bar)'].iloc[0]) if 'Press.   (bar)' in row.columns else float(row['Press. (bar)'].iloc[0])
-            
-            print(f"\nDebug - Comparing {second_property} values:")
-            print(f"Input value: {second_value}")
-            print(f"Saturated liquid value (f): {f_value}")
-            print(f"Saturated vapor value (g): {g_value}")
-            
-            if second_value > g_value:
-                state = "Superheated Vapor"
-                details = f"Value ({second_value}) is greater than saturated vapor value ({g_value})"
-                
-                df_shv = data_dict.get('water_shv_table')
-                if df_shv is not None:
-                    properties = handle_superheated_vapor(df_shv, temperature, pressure)
-                else:
-                    print("Error: Could not find superheated vapor table.")
-                    properties = None
-                    
-            elif second_value < f_value:
-                state = "Compressed Liquid"
-                details = f"Value ({second_value}) is less than saturated liquid value ({f_value})"
-                properties = None
-                print("\nWarning: Compressed liquid state detected. CL table lookup not yet implemented.")
-                
-            elif abs(second_value - f_value) < 1e-6:
-                state = "Saturated Liquid"
-                details = f"Value ({second_value}) equals saturated liquid value ({f_value})"
-                properties = {
-                    'Volume': float(row[property_columns['specific_volume'][0]].iloc[0]),
-                    'Internal Energy': float(row[property_columns['internal_energy'][0]].iloc[0]),
-                    'Enthalpy': float(row[property_columns['enthalpy'][0]].iloc[0]),
-                    'Entropy': float(row[property_columns['entropy'][0]].iloc[0])
-                }
-                
-            elif abs(second_value - g_value) < 1e-6:
-                state = "Saturated Vapor"
-                details = f"Value ({second_value}) equals saturated vapor value ({g_value})"
-                properties = {
-                    'Volume': float(row[property_columns['specific_volume'][1]].iloc[0]),
-                    'Internal Energy': float(row[property_columns['internal_energy'][1]].iloc[0]),
-                    'Enthalpy': float(row[property_columns['enthalpy'][1]].iloc[0]),
-                    'Entropy': float(row[property_columns['entropy'][1]].iloc[0])
-                }
+        k = PROPERTY_INDEX.get(second_property)
+        if k is None:
+            return StateResult(PHASE_UNKNOWN, np.nan, np.nan, np.nan, second_value=second_value)
+        
+        values = row.values
+        f_value = float(values[SAT_LIQUID[k]])
+        g_value = float(values[SAT_VAPOR[k]])
+        
+        temperature = float(values[SAT_TEMPERATURE])
+        pressure = float(values[SAT_PRESSURE])
+        first_property = 'pressure' if row.table.key_index == SAT_PRESSURE else 'temperature'
+        if substance is None:
+            substance = table_substance(row.table.name) if row.table.name else 'water'
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Row values: %s", dict(row.items()))
+            logger.debug("Comparing %s: input %s, saturated liquid (f) %s, saturated vapor (g) %s",
+                         second_property, second_value, f_value, g_value)
+        
+        quality = np.nan
+        z = None
+        if second_value > g_value:
+            phase = PHASE_SUPERHEATED_VAPOR
+            df_shv = substance_table(data_dict, substance, 'shv')
+            if df_shv is not None:
+                temperature, pressure = solve_superheated_state(
+                    df_shv, first_property, temperature, pressure, second_property, second_value)
+                temperature, pressure = float(temperature), float(pressure)
+                # No solution in the table: properties stay NaN
+                if not (np.isnan(temperature) or np.isnan(pressure)):
+                    z = _single_phase_values("superheated vapor", superheated_vapor_values,
+                                             df_shv, temperature, pressure)
+            else:
+                logger.error("Could not find superheated vapor table for %s", substance)
                 
+        elif second_value < f_value:
+            phase = PHASE_COMPRESSED_LIQUID
+            df_cl = substance_table(data_dict, substance, 'cl')
+            df_sat = substance_table(data_dict, substance, 'temp')
+            if df_cl is not None and df_sat is not None:
+                temperature, pressure = solve_compressed_state(
+                    df_cl, df_sat, first_property, temperature, pressure, second_property, second_value)
+                temperature, pressure = float(temperature), float(pressure)
+                # No solution in the table: properties stay NaN
+                if not (np.isnan(temperature) or np.isnan(pressure)):
+                    z = _single_phase_values("compressed liquid", compressed_liquid_values,
+                                             df_cl, df_sat, temperature, pressure)
             else:
-                quality = (second_value - f_value) / (g_value - f_value)
-                state = "Saturated Mixture"
-                details = f"Value ({second_value}) is between saturated liquid ({f_value}) and vapor ({g_value})\nQuality (x) = {quality:.4f}"
-                properties = calculate_slvm_properties(row, quality)
+                logger.error("Could not find compressed liquid table for %s", substance)
             
-            return state, details, properties, temperature, pressure
+        elif abs(second_value - f_value) < 1e-6:
+            phase = PHASE_SATURATED_LIQUID
+            quality = 0.0
+            z = values[SAT_VF:SAT_SF + 1]
             
-        return "Unknown", "Unable to determine state for this property", None, None, None
+        elif abs(second_value - g_value) < 1e-6:
+            phase = PHASE_SATURATED_VAPOR
+            quality = 1.0
+            z = values[SAT_VG:SAT_SG + 1]
             
+        else:
+            phase = PHASE_SATURATED_MIXTURE
+            quality = (second_value - f_value) / (g_value - f_value)
+            z = quality * values[SAT_VG:SAT_SG + 1] + (1 - quality) * values[SAT_VF:SAT_SF + 1]
+        
+        if z is None:
+            return StateResult(phase, quality, temperature, pressure,
+                               second_value=second_value, f_value=f_value, g_value=g_value)
+        v, u, h, s = z.tolist()
+        return StateResult(phase, quality, temperature, pressure, v, u, h, s, second_value, f_value, g_value)
+        
     except Exception as e:
-        print(f"\nError in state determination: {e}")
-        print("Available columns:", row.columns.tolist())
-        return None, None, None, None, None
+        logger.error("Error in state determination: %s", e)
+        return None
 
-def find_pressure_bounds(df_shv, target_pressure):
+def determine_state_and_properties(row, second_property, second_value, data_dict, substance=None):
     """
-    Find the pressure sections in the SHV table that bound the target pressure.
+    Determine the state and calculate properties as a (state, details,
+    properties, temperature, pressure) tuple; (None, ...) if the lookup
+    fails. determine_state returns the same as a StateResult record without
+    building the details string and properties dict.
     """
-    current_pressure = None
-    current_columns = []
-    pressure_sections = []
-    
-    for col in df_shv.columns:
-        if 'p =' in str(col):
-            # If we have a previous pressure section, save it
-            if current_pressure is not None:
-                pressure_sections.append((current_pressure, current_columns))
-            
-            # Start new pressure section
-            pressure_str = str(col)
-            pressure_val = float(pressure_str.split('=')[1].split('bar')[0].strip())
-            current_pressure = pressure_val
-            current_columns = []
-        current_columns.append(col)
+    result = determine_state(row, second_property, second_value, data_dict, substance)
+    return result.as_tuple() if result is not None else (None, None, None, None, None)
+
+def classify_states(x, f_value, g_value, phase=None, quality=None):
+    """
+    State-classification kernel of evaluate_states: compare each second
+    property value with its saturated liquid/vapor values, write the PHASE_*
+    code into `phase` (int8) and the quality into `quality` (0/1 on the
+    saturation lines, NaN outside the dome), both allocated when None, and
+    return the (superheated, compressed, sat_liquid, sat_vapor, mixture) masks.
+    States with NaN saturated values (outside the saturation table) or a NaN
+    input match no mask and stay PHASE_UNKNOWN. Only numpy ufuncs and
+    copyto, so it runs without holding the GIL.
+    """
+    if phase is None:
+        phase = np.empty(x.shape, dtype=np.int8)
+    if quality is None:
+        quality = np.empty(x.shape)
     
-    # Add the last section
-    if current_pressure is not None:
-        pressure_sections.append((current_pressure, current_columns))
+    # Same precedence as the scalar if-chain
+    superheated = np.greater(x, g_value)
+    compressed = np.less(x, f_value)
+    compressed &= ~superheated
+    remaining = ~(superheated | compressed)
+    sat_liquid = np.abs(x - f_value) < 1e-6
+    sat_liquid &= remaining
+    remaining &= ~sat_liquid
+    sat_vapor = np.abs(x - g_value) < 1e-6
+    sat_vapor &= remaining
+    mixture = remaining & ~sat_vapor
+    mixture &= np.less_equal(f_value, x)
     
-    # Find bounding pressures
-    for i in range(len(pressure_sections)-1):
-        if pressure_sections[i][0] <= target_pressure <= pressure_sections[i+1][0]:
-            return pressure_sections[i], pressure_sections[i+1]
+    phase.fill(PHASE_UNKNOWN)
+    np.copyto(phase, PHASE_SUPERHEATED_VAPOR, where=superheated)
+    np.copyto(phase, PHASE_COMPRESSED_LIQUID, where=compressed)
+    np.copyto(phase, PHASE_SATURATED_LIQUID, where=sat_liquid)
+    np.copyto(phase, PHASE_SATURATED_VAPOR, where=sat_vapor)
+    np.copyto(phase, PHASE_SATURATED_MIXTURE, where=mixture)
     
-    return None
+    # f == g at the critical point; those rows are never mixtures
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.subtract(x, f_value, out=quality)
+        quality /= g_value - f_value
+    np.copyto(quality, np.nan, where=~mixture)
+    np.copyto(quality, 0.0, where=sat_liquid)
+    np.copyto(quality, 1.0, where=sat_vapor)
+    return superheated, compressed, sat_liquid, sat_vapor, mixture
 
-def interpolate_value(x, x1, x2, y1, y2):
-    """Perform linear interpolation."""
-    if x2 - x1 == 0:
-        return y1
-    return y1 + (x - x1) * (y2 - y1) / (x2 - x1)
-
-def get_property_value(df_shv, temperature, pressure):
+def _state_buffers(out, shape):
     """
-    Get interpolated property values from the SHV table.
+    Flat views of the caller's evaluate_states output arrays (or of the
+    fields of a STATE_DTYPE array), checked against `shape`.
+    """
+    flat = flat_state_buffers(out, shape)
+    if isinstance(flat, np.ndarray):
+        return {key: flat[key] for key in STATE_KEYS}
+    return flat
+
+@instrumented('evaluate_states', labels=_batch_labels, items=_batch_items)
+def evaluate_states(data_dict, substance, first_property, first_values, second_property, second_values,
+                    out=None, clamp=False, backend='exact'):
     """
-    # Find pressure bounds
-    pressure_bounds = find_pressure_bounds(df_shv, pressure)
-    if not pressure_bounds:
-        raise ValueError(f"Pressure {pressure} bar is outside table range")
+    Batch version of get_row_by_property + determine_state.
+
+    Evaluates every (first_values[i], second_values[i]) pair for one substance
+    and returns a dict of arrays: 'phase' (PHASE_* codes), 'quality',
+    'temperature', 'pressure', 'specific_volume', 'internal_energy',
+    'enthalpy' and 'entropy'. Quality is 0/1 on the saturation lines and NaN
+    outside the dome. First values outside the saturation table give
+    PHASE_UNKNOWN with NaN properties. With `clamp` they are classified
+    against the nearest row of the table instead (above the critical
+    pressure or temperature that is the critical point) and resolved on the
+    single-phase grids at their own value; they are never put on the dome.
+    
+    With `out` (a dict of C-contiguous arrays of the broadcast input shape,
+    int8 for 'phase' and float64 otherwise, or one C-contiguous STATE_DTYPE
+    array of that shape, e.g. from allocate_states) the results are written
+    into it and `out` is returned, so threads can fill slices of one
+    preallocated result.
     
-    p1_section, p2_section = pressure_bounds
-    p1, p1_cols = p1_section
-    p2, p2_cols = p2_section
+    backend='uniform' reads the saturation properties and the single-phase
+    (v, u, h, s) from the uniform resamplings of the tables stored in the
+    cache (load_all_data(resample=...)), trading a small interpolation error
+    for constant-time lookups; the unknown coordinate of single-phase states
+    is still solved on the tables themselves.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    table_name = determine_table_to_access(substance, first_property)
+    if table_name not in data_dict:
+        raise KeyError(f"No data table for {substance} with {first_property}")
+    table = compiled_saturation_table(data_dict[table_name])
+    uniform = backend == 'uniform'
+    if uniform:
+        resampled = getattr(data_dict, 'resampled', None)
+        if resampled is None:
+            raise ValueError("backend='uniform' needs a table store with resampled tables, "
+                             "e.g. load_all_data(resample={'size': 1024})")
     
-    # Find temperature rows
-    temp_column = df_shv['Temp. (C)']
-    temp_rows = []
-    for i, temp in enumerate(temp_column):
-        if isinstance(temp, (int, float)) and not pd.isna(temp):
-            if temp >= temperature:
-                if i > 0:
-                    temp_rows = [i-1, i]
-                else:
-                    temp_rows = [i, i+1]
-                break
+    first_values = np.asarray(first_values, dtype=np.float64)
+    second_values = np.asarray(second_values, dtype=np.float64)
+    first_values, second_values = np.broadcast_arrays(first_values, second_values)
+    shape = first_values.shape
     
-    if not temp_rows:
-        raise ValueError(f"Temperature {temperature}°C is outside table range")
+    key = first_values.reshape(-1)
+    if uniform:
+        saturation = uniform_saturation(resampled(table_name), key, clamp=clamp)
+    else:
+        saturation = interpolate_saturation(table, key, clamp=clamp)
+    x = second_values.reshape(-1)
+    outside = None
+    if clamp:
+        outside = saturation[table.key_index] != key
+        saturation[table.key_index] = key
     
-    # Get property values at both pressures and temperatures
-    properties = {}
-    property_names = ['Volume', 'Internal Energy', 'Enthalpy', 'Entropy']
+    if out is None:
+        out = allocate_states(shape)
+    result = _state_buffers(out, shape)
+    result['phase'].fill(PHASE_UNKNOWN)
+    np.copyto(result['temperature'], saturation[SAT_TEMPERATURE])
+    np.copyto(result['pressure'], saturation[SAT_PRESSURE])
+    for prop in ('quality',) + tuple(PROPERTY_INDEX):
+        result[prop].fill(np.nan)
     
-    for prop in property_names:
-        # Get column names for this property in both pressure sections
-        p1_col = [col for col in p1_cols if prop in str(col)][0]
-        p2_col = [col for col in p2_cols if prop in str(col)][0]
-        
-        # Get values at both temperatures for first pressure
-        t1_p1 = float(df_shv.iloc[temp_rows[0]][p1_col])
-        t2_p1 = float(df_shv.iloc[temp_rows[1]][p1_col])
+    k = PROPERTY_INDEX.get(second_property)
+    if k is not None:
+        quality = result['quality']
+        superheated, compressed, sat_liquid, sat_vapor, mixture = classify_states(
+            x, saturation[SAT_LIQUID[k]], saturation[SAT_VAPOR[k]], result['phase'], quality)
+        if outside is not None and outside.any():
+            dome = outside & ~(superheated | compressed)
+            np.copyto(result['phase'], PHASE_UNKNOWN, where=dome)
+            np.copyto(quality, np.nan, where=dome)
+            np.copyto(result['temperature'], np.nan, where=dome)
+            np.copyto(result['pressure'], np.nan, where=dome)
+            np.copyto(result[first_property], key, where=dome)
+            for mask in (sat_liquid, sat_vapor, mixture):
+                mask &= ~outside
         
-        # Get values at both temperatures for second pressure
-        t1_p2 = float(df_shv.iloc[temp_rows[0]][p2_col])
-        t2_p2 = float(df_shv.iloc[temp_rows[1]][p2_col])
+        for prop, j in PROPERTY_INDEX.items():
+            z_f = saturation[SAT_LIQUID[j]]
+            z_g = saturation[SAT_VAPOR[j]]
+            values = result[prop]
+            # z = x * z_g + (1 - x) * z_f, in place
+            with np.errstate(invalid='ignore'):
+                np.subtract(1, quality, out=values)
+                values *= z_f
+                values += quality * z_g
+            np.copyto(values, np.nan, where=~mixture)
+            np.copyto(values, z_f, where=sat_liquid)
+            np.copyto(values, z_g, where=sat_vapor)
         
-        # Interpolate temperature at each pressure
-        temp1 = float(df_shv.iloc[temp_rows[0]]['Temp. (C)'])
-        temp2 = float(df_shv.iloc[temp_rows[1]]['Temp. (C)'])
+        if metrics_enabled():
+            _count_phases(substance, result['phase'])
         
-        value_p1 = interpolate_value(temperature, temp1, temp2, t1_p1, t2_p1)
-        value_p2 = interpolate_value(temperature, temp1, temp2, t1_p2, t2_p2)
+        df_shv = substance_table(data_dict, substance, 'shv')
+        if df_shv is not None and superheated.any():
+            _superheated_batch(df_shv, first_property, result, superheated, second_property, x,
+                               fast=resampled(df_shv.name) if uniform else None)
         
-        # Interpolate between pressures
-        final_value = interpolate_value(pressure, p1, p2, value_p1, value_p2)
-        properties[prop] = final_value
+        df_cl = substance_table(data_dict, substance, 'cl')
+        df_sat = substance_table(data_dict, substance, 'temp')
+        if df_cl is not None and df_sat is not None and compressed.any():
+            _compressed_batch(df_cl, df_sat, first_property, result, compressed, second_property, x,
+                              fast=resampled(df_cl.name) if uniform else None)
+    
+    return out
+
+@instrumented('solve_states', labels=_superheated_batch_labels, items=_mask_items)
+def _superheated_batch(df_shv, first_property, result, mask, second_property, x, fast=None):
+    """
+    Resolve the superheated states (`mask`) of an evaluate_states batch in
+    place, reading the properties from the UniformGrid `fast` if given.
+    """
+    temperature, pressure = solve_superheated_state(
+        df_shv, first_property, result['temperature'][mask], result['pressure'][mask],
+        second_property, x[mask])
+    result['temperature'][mask] = temperature
+    result['pressure'][mask] = pressure
+    if fast is None:
+        shv = interpolate_grid(compiled_property_grid(df_shv), temperature, pressure)
+    else:
+        shv = uniform_grid(fast, temperature, pressure)
+    for prop, j in PROPERTY_INDEX.items():
+        result[prop][mask] = shv[:, j]
+
+@instrumented('solve_states', labels=_compressed_batch_labels, items=_mask_items)
+def _compressed_batch(df_cl, df_sat, first_property, result, mask, second_property, x, fast=None):
+    """
+    Resolve the compressed liquid states (`mask`) of an evaluate_states batch
+    in place, reading the properties from the UniformGrid `fast` if given
+    (the saturated liquid approximation stays on the temperature table).
+    """
+    temperature, pressure = solve_compressed_state(
+        df_cl, df_sat, first_property, result['temperature'][mask], result['pressure'][mask],
+        second_property, x[mask])
+    result['temperature'][mask] = temperature
+    result['pressure'][mask] = pressure
+    if fast is None:
+        cl = compressed_liquid_values(df_cl, df_sat, temperature, pressure)
+    else:
+        cl = uniform_grid(fast, temperature, pressure)
+        missing = np.isnan(cl[:, 0])
+        if missing.any():
+            cl[missing] = compressed_liquid_values(df_cl, df_sat, temperature[missing], pressure[missing])
+    for prop, j in PROPERTY_INDEX.items():
+        result[prop][mask] = cl[:, j]
+
+class StateCache:
+    """
+    Bounded LRU cache in front of get_row_by_property + determine_state.
+
+    Entries are keyed by (table set version, substance, first property,
+    first value, second property, second value). With `decimals` set, both values are rounded
+    before lookup *and* before evaluation, so nearby queries share one entry
+    and a cached result never depends on which query came first.
+    """
+
+    def __init__(self, maxsize=4096, decimals=None):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.decimals = decimals
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize(self, value):
+        value = float(value)
+        return value if self.decimals is None else round(value, self.decimals)
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def resize(self, maxsize):
+        """Change the capacity, evicting least recently used entries if needed."""
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Counters for sizing the cache: hits, misses, evictions, size and hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+# Default cache used by cached_state_lookup
+state_cache = StateCache()
+
+def cached_state_lookup(data_dict, substance, first_property, first_value, second_property, second_value,
+                        cache=None):
+    """
+    Memoized state determination for one (substance, property1, value1,
+    property2, value2) query. Returns the StateResult of determine_state, or
+    None if the lookup fails; cached records are shared, so treat them as
+    read-only. Entries are keyed on the `version` token of the table set
+    (see TableStore), so changed tables never hit stale entries; a table set
+    without one is evaluated uncached.
+    """
+    cache = state_cache if cache is None else cache
+    first_value = cache.quantize(first_value)
+    second_value = cache.quantize(second_value)
+    version = getattr(data_dict, 'version', None)
+    key = (version, substance, first_property, first_value, second_property, second_value)
     
-    return properties
+    result = None if version is None else cache.get(key)
+    if result is None:
+        table_name = determine_table_to_access(substance, first_property)
+        if table_name not in data_dict:
+            return None
+        row = get_row_by_property(data_dict[table_name], first_property, first_value)
+        if row is None:
+            return None
+        result = determine_state(row, second_property, second_value, data_dict, substance)
+        if result is not None and version is not None:
+            cache.put(key, result)
+    return result
+
+def find_pressure_bounds(df_shv, target_pressure):
+    """
+    Find the pressure blocks in the SHV table that bound the target pressure.
+    Returns ((p1, index1), (p2, index2)) on the grid's pressure axis, or None.
+    """
+    pressures = compiled_property_grid(df_shv).pressures
+    if not pressures[0] <= target_pressure <= pressures[-1]:
+        return None
+    i = min(int(np.searchsorted(pressures, target_pressure, side='right')) - 1, pressures.shape[0] - 2)
+    return (float(pressures[i]), i), (float(pressures[i + 1]), i + 1)
+
+def interpolate_value(x, x1, x2, y1, y2):
+    """Perform linear interpolation."""
+    if x2 - x1 == 0:
+        return y1
+    return y1 + (x - x1) * (y2 - y1) / (x2 - x1)
+
+@instrumented('get_property_value', labels=_grid_labels)
+def superheated_vapor_values(df_shv, temperature, pressure):
+    """
+    Interpolated (v, u, h, s) from the SHV table, as an array with the
+    properties on the last axis (NaN outside the table for array inputs).
+    A single state outside the table raises ValueError.
+    """
+    grid = compiled_property_grid(df_shv)
+    values = interpolate_grid(grid, temperature, pressure)
+    
+    if values.ndim == 1:
+        if not grid.pressures[0] <= pressure <= grid.pressures[-1]:
+            raise ValueError(f"Pressure {pressure} bar is outside table range")
+        if np.isnan(values[0]):
+            raise ValueError(f"Temperature {temperature}°C is outside table range")
+    return values
+
+def get_property_value(df_shv, temperature, pressure):
+    """
+    Get interpolated property values from the SHV table.
+    Scalars give a dict of floats, arrays a dict of arrays (NaN outside the table).
+    """
+    values = superheated_vapor_values(df_shv, temperature, pressure)
+    if values.ndim == 1:
+        return dict(zip(GRID_PROPERTIES, values.tolist()))
+    return {prop: values[..., k] for k, prop in enumerate(GRID_PROPERTIES)}
+
+def _single_phase_values(label, lookup, *args):
+    """lookup(*args), or None (logged) when the state is outside the tables."""
+    try:
+        return lookup(*args)
+    except Exception as e:
+        logger.error("Error in %s calculations: %s", label, e)
+        return None
 
 def handle_superheated_vapor(df_shv, temperature, pressure):
     """
     Process superheated vapor state and return all properties.
+    Also accepts arrays of temperatures and pressures for batch evaluation.
     """
     try:
-        properties = get_property_value(df_shv, temperature, pressure)
-        
-        print("\nSuperheated Vapor Properties:")
-        print(f"{'-'*50}")
-        print(f"Temperature: {temperature:.3f}°C")
-        print(f"Pressure: {pressure:.6f} bar")
+        return get_property_value(df_shv, temperature, pressure)
         
-        for prop, value in properties.items():
-            if prop == 'Volume':
-                print(f"{prop}: {value:.7f} m³/kg")
-            elif prop == 'Entropy':
-                print(f"{prop}: {value:.4f} kJ/kg/K")
-            else:
-                print(f"{prop}: {value:.3f} kJ/kg")
-        
-        return properties
+    except Exception as e:
+        logger.error("Error in superheated vapor calculations: %s", e)
+        return None
+
+def solve_superheated_state(df_shv, first_property, temperature, pressure, second_property, second_value):
+    """
+    Resolve the unknown coordinate of superheated states.
+    With `first_property` 'pressure' the temperature is solved from T(P, z),
+    otherwise the pressure from P(T, z), where z is the second property.
+    Returns (temperature, pressure); NaN where the table has no solution.
+    """
+    grid = compiled_property_grid(df_shv)
+    prop = PROPERTY_INDEX[second_property]
+    if first_property == 'pressure':
+        return solve_grid_temperature(grid, pressure, prop, second_value), pressure
+    return temperature, solve_grid_pressure(grid, temperature, prop, second_value)
+
+def _saturated_liquid_region(grid, table, temperature, pressure, values):
+    """
+    Points the CL grid left NaN in `values` that are still liquid: below its
+    lowest pressure block, or between its dome edge (straight between the
+    blocks' Sat rows) and the saturation line of the temperature table.
+    """
+    t_sat = np.interp(pressure, table.data[SAT_PRESSURE], table.key, left=np.nan, right=np.nan)
+    return np.isnan(values[..., 0]) & ((pressure < grid.pressures[0]) |
+                                       (pressure <= grid.pressures[-1]) & (temperature <= t_sat))
+
+def solve_compressed_state(df_cl, df_sat, first_property, temperature, pressure, second_property, second_value):
+    """
+    Resolve the unknown coordinate of compressed liquid states.
+    Where the CL grid has no liquid cells (below its lowest pressure, or
+    next to the dome) T(P, z) falls back to the saturated liquid
+    approximation z = zf(T) used by compressed_liquid_values. P(T, z) keeps
+    the given (saturation) pressure where the CL table has no solution only
+    if compressed_liquid_values there reproduces z (rtol 1e-6); any other
+    unsolved state gets NaN rather than a pressure whose properties
+    contradict the input.
+    """
+    grid = compiled_property_grid(df_cl, saturation_side='high')
+    prop = PROPERTY_INDEX[second_property]
+    temperature = np.asarray(temperature, dtype=np.float64)
+    pressure = np.asarray(pressure, dtype=np.float64)
+    second_value = np.asarray(second_value, dtype=np.float64)
+    
+    if first_property == 'pressure':
+        temperature, pressure, second_value = np.broadcast_arrays(
+            solve_grid_temperature(grid, pressure, prop, second_value), pressure, second_value)
+        unsolved = np.isnan(temperature)
+        if unsolved.any():
+            table = compiled_saturation_table(df_sat)
+            approximate = np.interp(second_value[unsolved], table.data[SAT_LIQUID[prop]], table.key,
+                                    left=np.nan, right=np.nan)
+            p = pressure[unsolved]
+            liquid = _saturated_liquid_region(grid, table, approximate, p, interpolate_grid(grid, approximate, p))
+            temperature = temperature.copy()
+            temperature[unsolved] = np.where(liquid, approximate, np.nan)
+        return temperature, pressure
+    
+    temperature, pressure, second_value = np.broadcast_arrays(temperature, pressure, second_value)
+    solved = solve_grid_pressure(grid, temperature, prop, second_value)
+    unsolved = np.isnan(solved)
+    if unsolved.any():
+        t, p, z = temperature[unsolved], pressure[unsolved], second_value[unsolved]
+        # Only z = zf(T) can come from the saturated liquid approximation; the
+        # forward lookup confirms it holds at the fallback pressure
+        table = compiled_saturation_table(df_sat)
+        z_f = np.interp(t, table.key, table.data[SAT_LIQUID[prop]], left=np.nan, right=np.nan)
+        consistent = np.isclose(z_f, z, rtol=1e-6, atol=1e-9)
+        if consistent.any():
+            fallback = compressed_liquid_values(df_cl, df_sat, t[consistent], p[consistent])[..., prop]
+            consistent[consistent] = np.isclose(fallback, z[consistent], rtol=1e-6, atol=1e-9)
+        solved = solved.copy()
+        solved[unsolved] = np.where(consistent, p, np.nan)
+    return temperature, solved
+
+def compressed_liquid_values(df_cl, df_sat, temperature, pressure):
+    """
+    Interpolated (v, u, h, s) from the CL table, as an array with the
+    properties on the last axis (NaN outside the table for array inputs).
+    Where the grid has no liquid cells (below the lowest tabulated pressure,
+    or between its dome edge and the saturation line) the liquid is
+    approximated as saturated liquid at the same temperature, read from the
+    temperature table `df_sat`. A single state outside the table raises
+    ValueError.
+    """
+    grid = compiled_property_grid(df_cl, saturation_side='high')
+    temperature, pressure = np.broadcast_arrays(np.asarray(temperature, dtype=np.float64),
+                                                np.asarray(pressure, dtype=np.float64))
+    values = interpolate_grid(grid, temperature, pressure)
+    
+    missing = np.isnan(values[..., 0])
+    if missing.any():
+        table = compiled_saturation_table(df_sat)
+        liquid = missing & _saturated_liquid_region(grid, table, temperature, pressure, values)
+        values[liquid] = interpolate_saturation(table, temperature[liquid])[SAT_VF:SAT_SF + 1].T
+    
+    if values.ndim == 1 and np.isnan(values[0]):
+        raise ValueError(f"State {temperature}°C, {pressure} bar is outside table range")
+    return values
+
+def get_compressed_liquid_value(df_cl, df_sat, temperature, pressure):
+    """
+    Get interpolated property values from the CL table.
+    Scalars give a dict of floats, arrays a dict of arrays (NaN outside the table).
+    """
+    values = compressed_liquid_values(df_cl, df_sat, temperature, pressure)
+    if values.ndim == 1:
+        return dict(zip(GRID_PROPERTIES, values.tolist()))
+    return {prop: values[..., k] for k, prop in enumerate(GRID_PROPERTIES)}
+
+def handle_compressed_liquid(df_cl, df_sat, temperature, pressure):
+    """
+    Process compressed liquid state and return all properties.
+    Also accepts arrays of temperatures and pressures for batch evaluation.
+    """
+    try:
+        return get_compressed_liquid_value(df_cl, df_sat, temperature, pressure)
         
     except Exception as e:
-        print(f"\nError in superheated vapor calculations: {e}")
+        logger.error("Error in compressed liquid calculations: %s", e)
         return None
 
 def main():
     """Main program execution."""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     # Load all data including SHV table
     data_dict = load_all_data()
     
@@ -447,11 +988,10 @@ def main():
                     print("\nThermodynamic Properties at Saturation:")
                     print(f"{'-'*50}")
                     
-                    # Drop any unnamed columns and format data
-                    row = row.loc[:, ~row.columns.str.contains('^Unnamed')]
+                    # Format data
                     formatted_data = {}
-                    for col in row.columns:
-                        formatted_data[col] = format_value(row[col].iloc[0], col)
+                    for col, value in row.items():
+                        formatted_data[col] = format_value(value, col)
                     
                     # Display formatted saturation data
                     for col, value in formatted_data.items():
@@ -460,19 +1000,21 @@ def main():
                     
                     # Get second property and determine state
                     second_property, second_value = get_second_property_input(first_property)
-                    state, details, properties, temperature, pressure = determine_state_and_properties(
-                        row, second_property, second_value, data_dict)
+                    result = determine_state(row, second_property, second_value, data_dict, substance)
                     
                     # Display state and property information
-                    if state and details:
+                    if result is not None:
                         print(f"\nState Determination:")
                         print(f"{'-'*50}")
-                        print(f"State: {state}")
-                        print(f"Details: {details}")
+                        print(f"State: {result.state}")
+                        print(f"Details: {result.details}")
                         
+                        properties = result.properties
                         if properties:
                             print(f"\nCalculated Properties at this State:")
                             print(f"{'-'*50}")
+                            print(f"Temperature: {format_value(result.temperature, 'Temp. (C)')}°C")
+                            print(f"Pressure: {format_value(result.pressure, 'Press. (bar)')} bar")
                             for prop, value in properties.items():
                                 if 'Volume' in prop:
                                     print(f"{prop}: {value:.7f}")
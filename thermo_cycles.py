@@ -0,0 +1,274 @@
+"""
+Thermodynamic cycles built from the table lookups in thermo_calc_python.
+
+A cycle is a start state followed by a sequence of processes (Isentropic,
+Isobaric, Throttle). Any numeric field of a state or process may be a
+scalar, an array or the name of a sweep parameter passed to
+Cycle.evaluate; all parameters are broadcast together and every state point
+of every sweep case is resolved in one vectorized evaluate_states call per
+process, so a 1000-case sweep costs about as much as a single case.
+
+    cycle = rankine_cycle('water', t_high='t_high')
+    result = cycle.evaluate(data_dict, p_low=0.08, p_high=80.0, t_high=np.linspace(300, 500, 50))
+    result['efficiency']
+"""
+import numpy as np
+
+import thermo_calc_python as thermo
+from thermo_tables import (
+    PROPERTY_INDEX, SAT_LIQUID, SAT_PRESSURE, SAT_TEMPERATURE, SAT_VAPOR, compiled_saturation_table,
+    interpolate_saturation
+)
+
+STATE_KEYS = thermo.STATE_KEYS
+
+
+def _resolve(value, params):
+    """A process field: a parameter name looked up in `params`, or a literal value."""
+    if isinstance(value, str):
+        return params[value]
+    return np.asarray(value, dtype=np.float64)
+
+
+def saturated_states(data_dict, substance, quality, pressure=None, temperature=None, clamp=False):
+    """
+    States on the saturation dome at a given pressure or temperature and
+    quality (0 saturated liquid, 1 saturated vapor), in the evaluate_states
+    result format. Pressures or temperatures outside the saturation table
+    give NaN, or with `clamp` the state at its nearest end.
+    """
+    if (pressure is None) == (temperature is None):
+        raise ValueError("Give exactly one of pressure or temperature")
+    first_property = 'pressure' if temperature is None else 'temperature'
+    table_name = thermo.determine_table_to_access(substance, first_property)
+    if table_name not in data_dict:
+        raise KeyError(f"No data table for {substance} with {first_property}")
+    table = compiled_saturation_table(data_dict[table_name])
+
+    key, quality = np.broadcast_arrays(np.asarray(pressure if temperature is None else temperature,
+                                                  dtype=np.float64),
+                                       np.asarray(quality, dtype=np.float64))
+    saturation = interpolate_saturation(table, key.ravel(), clamp=clamp)
+    x = quality.ravel()
+
+    result = {
+        'phase': np.where(x == 0, thermo.PHASE_SATURATED_LIQUID,
+                          np.where(x == 1, thermo.PHASE_SATURATED_VAPOR, thermo.PHASE_SATURATED_MIXTURE)),
+        'quality': x.copy(),
+        'temperature': saturation[SAT_TEMPERATURE],
+        'pressure': saturation[SAT_PRESSURE]
+    }
+    for prop, k in PROPERTY_INDEX.items():
+        z_f = saturation[SAT_LIQUID[k]]
+        z_g = saturation[SAT_VAPOR[k]]
+        result[prop] = z_f + x * (z_g - z_f)
+    result['phase'] = result['phase'].astype(np.int8)
+    return {key_: values.reshape(key.shape) for key_, values in result.items()}
+
+
+def pressure_temperature_states(data_dict, substance, pressure, temperature):
+    """
+    Single-phase states from pressure and temperature: superheated vapor
+    above the saturation temperature, compressed liquid below it. A state
+    exactly at the saturation temperature is taken as saturated vapor.
+    Above the critical pressure the critical temperature separates the two.
+    """
+    pressure, temperature = np.broadcast_arrays(np.asarray(pressure, dtype=np.float64),
+                                                np.asarray(temperature, dtype=np.float64))
+    shape = pressure.shape
+    pressure = pressure.ravel()
+    temperature = temperature.ravel()
+
+    saturated = saturated_states(data_dict, substance, 1.0, pressure=pressure, clamp=True)
+    superheated = temperature > saturated['temperature']
+    compressed = temperature < saturated['temperature']
+
+    result = {key: values.copy() for key, values in saturated.items()}
+    result['quality'][superheated | compressed] = np.nan
+    result['phase'][superheated] = thermo.PHASE_SUPERHEATED_VAPOR
+    result['phase'][compressed] = thermo.PHASE_COMPRESSED_LIQUID
+    result['temperature'] = np.where(superheated | compressed, temperature, result['temperature'])
+    result['pressure'] = pressure.copy()
+
+    df_shv = thermo.substance_table(data_dict, substance, 'shv')
+    if superheated.any():
+        if df_shv is None:
+            raise KeyError(f"No superheated vapor table for {substance}")
+        shv = thermo.get_property_value(df_shv, temperature[superheated], pressure[superheated])
+        for prop, grid_prop in zip(PROPERTY_INDEX, thermo.GRID_PROPERTIES):
+            result[prop][superheated] = shv[grid_prop]
+
+    df_cl = thermo.substance_table(data_dict, substance, 'cl')
+    df_sat = thermo.substance_table(data_dict, substance, 'temp')
+    if compressed.any():
+        if df_cl is None or df_sat is None:
+            raise KeyError(f"No compressed liquid table for {substance}")
+        cl = thermo.get_compressed_liquid_value(df_cl, df_sat, temperature[compressed], pressure[compressed])
+        for prop, grid_prop in zip(PROPERTY_INDEX, thermo.GRID_PROPERTIES):
+            result[prop][compressed] = cl[grid_prop]
+
+    return {key: values.reshape(shape) for key, values in result.items()}
+
+
+class SaturatedState:
+    """Start state on the saturation dome, given pressure or temperature and quality."""
+    __slots__ = ('pressure', 'temperature', 'quality')
+
+    def __init__(self, pressure=None, temperature=None, quality=0.0):
+        self.pressure = pressure
+        self.temperature = temperature
+        self.quality = quality
+
+    def evaluate(self, data_dict, substance, params):
+        return saturated_states(
+            data_dict, substance, _resolve(self.quality, params),
+            pressure=None if self.pressure is None else _resolve(self.pressure, params),
+            temperature=None if self.temperature is None else _resolve(self.temperature, params))
+
+
+class Isentropic:
+    """
+    Compression or expansion to `pressure` at constant entropy, degraded by
+    an isentropic `efficiency`: h2 = h1 + (h2s - h1) / eta when compressing,
+    h2 = h1 + (h2s - h1) * eta when expanding. Exchanges work only.
+    """
+    __slots__ = ('pressure', 'efficiency')
+    kind = 'work'
+
+    def __init__(self, pressure, efficiency=1.0):
+        self.pressure = pressure
+        self.efficiency = efficiency
+
+    def evaluate(self, data_dict, substance, inlet, params):
+        pressure = _resolve(self.pressure, params)
+        efficiency = _resolve(self.efficiency, params)
+        # Pumps and compressors may work above the critical pressure
+        ideal = thermo.evaluate_states(data_dict, substance, 'pressure', pressure, 'entropy', inlet['entropy'],
+                                       clamp=True)
+        if np.all(efficiency == 1):
+            return ideal
+        h_in = inlet['enthalpy']
+        dh = ideal['enthalpy'] - h_in
+        compressing = pressure > inlet['pressure']
+        h_out = h_in + np.where(compressing, dh / efficiency, dh * efficiency)
+        return thermo.evaluate_states(data_dict, substance, 'pressure', pressure, 'enthalpy', h_out, clamp=True)
+
+
+class Isobaric:
+    """
+    Heat addition or rejection at the inlet pressure up to a target
+    `temperature` (single-phase) or `quality` (on the dome). Exchanges heat only.
+    """
+    __slots__ = ('temperature', 'quality')
+    kind = 'heat'
+
+    def __init__(self, temperature=None, quality=None):
+        if (temperature is None) == (quality is None):
+            raise ValueError("Give exactly one of temperature or quality")
+        self.temperature = temperature
+        self.quality = quality
+
+    def evaluate(self, data_dict, substance, inlet, params):
+        if self.quality is not None:
+            return saturated_states(data_dict, substance, _resolve(self.quality, params),
+                                    pressure=inlet['pressure'])
+        return pressure_temperature_states(data_dict, substance, inlet['pressure'],
+                                           _resolve(self.temperature, params))
+
+
+class Throttle:
+    """Adiabatic expansion through a valve to `pressure` at constant enthalpy."""
+    __slots__ = ('pressure',)
+    kind = 'none'
+
+    def __init__(self, pressure):
+        self.pressure = pressure
+
+    def evaluate(self, data_dict, substance, inlet, params):
+        return thermo.evaluate_states(data_dict, substance, 'pressure', _resolve(self.pressure, params),
+                                      'enthalpy', inlet['enthalpy'])
+
+
+class Cycle:
+    """A start state and the processes that carry it around the cycle, per unit mass."""
+
+    def __init__(self, substance, start, processes):
+        self.substance = substance
+        self.start = start
+        self.processes = list(processes)
+
+    def evaluate(self, data_dict, **params):
+        """
+        Resolve every state of the cycle for all sweep cases at once.
+
+        Keyword arguments are the sweep parameters named by the states and
+        processes; they are broadcast against each other. Returns a dict with
+        'states' (one evaluate_states-style dict per state point, the start
+        state first), per-process 'work' (out of the fluid) and 'heat' (into
+        the fluid) in kJ/kg, 'net_work', 'heat_in', 'heat_out', 'efficiency',
+        'cop_refrigeration' and 'cop_heat_pump'. States the tables cannot
+        resolve come out NaN and so do the figures that depend on them.
+        """
+        arrays = np.broadcast_arrays(*[np.asarray(value, dtype=np.float64) for value in params.values()])
+        params = dict(zip(params, arrays))
+
+        states = [self.start.evaluate(data_dict, self.substance, params)]
+        work = []
+        heat = []
+        for process in self.processes:
+            inlet = states[-1]
+            outlet = process.evaluate(data_dict, self.substance, inlet, params)
+            dh = outlet['enthalpy'] - inlet['enthalpy']
+            zero = np.zeros_like(dh)
+            work.append(-dh if process.kind == 'work' else zero)
+            heat.append(dh if process.kind == 'heat' else zero)
+            states.append(outlet)
+
+        net_work = sum(work)
+        heat_in = sum(np.where(q > 0, q, 0.0) for q in heat)
+        heat_out = sum(np.where(q < 0, -q, 0.0) for q in heat)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            efficiency = net_work / heat_in
+            cop_refrigeration = heat_in / -net_work
+            cop_heat_pump = heat_out / -net_work
+
+        return {
+            'states': states,
+            'work': work,
+            'heat': heat,
+            'net_work': net_work,
+            'heat_in': heat_in,
+            'heat_out': heat_out,
+            'efficiency': efficiency,
+            'cop_refrigeration': cop_refrigeration,
+            'cop_heat_pump': cop_heat_pump
+        }
+
+
+def rankine_cycle(substance='water', t_high=None, eta_pump=1.0, eta_turbine=1.0):
+    """
+    Rankine cycle between sweep parameters 'p_low' and 'p_high' (bar):
+    pump from saturated liquid, boiler to saturated vapor (or to `t_high`
+    when given, superheated), turbine, condenser back to saturated liquid.
+    """
+    boiler = Isobaric(quality=1.0) if t_high is None else Isobaric(temperature=t_high)
+    return Cycle(substance, SaturatedState(pressure='p_low', quality=0.0), [
+        Isentropic('p_high', efficiency=eta_pump),
+        boiler,
+        Isentropic('p_low', efficiency=eta_turbine),
+        Isobaric(quality=0.0)
+    ])
+
+
+def vapor_compression_cycle(substance='r_134a', eta_compressor=1.0):
+    """
+    Vapor-compression refrigeration cycle between sweep parameters 'p_low'
+    (evaporator) and 'p_high' (condenser), in bar: compressor from saturated
+    vapor, condenser to saturated liquid, expansion valve, evaporator.
+    """
+    return Cycle(substance, SaturatedState(pressure='p_low', quality=1.0), [
+        Isentropic('p_high', efficiency=eta_compressor),
+        Isobaric(quality=0.0),
+        Throttle('p_low'),
+        Isobaric(quality=1.0)
+    ])
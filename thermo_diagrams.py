@@ -0,0 +1,322 @@
+"""
+Property-diagram data (T-s, P-h and P-v charts) from the compiled tables.
+
+A diagram is a set of line families, each holding one 2-D array per
+property with shape (lines, points):
+
+    'dome'      saturated liquid (x = 0) and saturated vapor (x = 1) lines
+    'quality'   constant-quality lines inside the dome
+    'isobar'    constant pressure: compressed liquid, across the dome, superheated vapor
+    'isotherm'  constant temperature, the same way in decreasing pressure
+
+Every family is resolved with one vectorized saturated_states call for the
+dome and one pressure_temperature_states call for the single-phase parts, so
+a full diagram costs a handful of array passes rather than a lookup per
+point. Points the tables do not cover are NaN (gaps in a plotted line).
+
+DiagramCache keeps computed diagrams per substance, resolution and line
+levels; to_json and to_binary project one onto the axes of a chart kind:
+
+    diagrams = DiagramCache(data_dict)
+    body = to_binary(diagrams.get('water', resolution=200), 'ph')
+"""
+import json
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import thermo_calc_python as thermo
+from thermo_cycles import pressure_temperature_states, saturated_states
+from thermo_tables import SAT_TEMPERATURE
+
+# Chart kind -> (x axis, y axis)
+DIAGRAM_AXES = {
+    'ts': ('entropy', 'temperature'),
+    'ph': ('enthalpy', 'pressure'),
+    'pv': ('specific_volume', 'pressure')
+}
+
+UNITS = {
+    'temperature': '°C',
+    'pressure': 'bar',
+    'specific_volume': 'm³/kg',
+    'internal_energy': 'kJ/kg',
+    'enthalpy': 'kJ/kg',
+    'entropy': 'kJ/kg·K',
+    'quality': ''
+}
+
+LINE_PROPERTIES = thermo.STATE_KEYS[2:]
+DEFAULT_QUALITIES = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+DEFAULT_LINES = 8
+
+# Binary layout: magic, header length, JSON header, float32 arrays (4-byte aligned)
+BINARY_MAGIC = b'THD1'
+
+
+def _nice_levels(lo, hi, count, log=False):
+    """About `count` levels between lo and hi, rounded to two significant digits."""
+    levels = np.geomspace(lo, hi, count) if log else np.linspace(lo, hi, count)
+    return np.unique([float(f"{level:.2g}") for level in levels])
+
+
+def _table(data_dict, substance, kind):
+    table = thermo.substance_table(data_dict, substance, kind)
+    if table is None:
+        raise KeyError(f"No {kind} table for {substance}")
+    return table
+
+
+def diagram_ranges(data_dict, substance):
+    """
+    Extent of the tables of `substance`: the saturation pressure range
+    (its top taken as the critical point), the lowest saturation temperature
+    and the temperature and pressure limits of the single-phase grids.
+    """
+    saturation = _table(data_dict, substance, 'pressure')
+    temperature_table = _table(data_dict, substance, 'temp')
+    shv = _table(data_dict, substance, 'shv')
+    cl = _table(data_dict, substance, 'cl')
+    return {
+        'p_sat_min': float(saturation.key[0]),
+        'p_critical': float(saturation.key[-1]),
+        't_critical': float(saturation.data[SAT_TEMPERATURE][-1]),
+        't_min': float(temperature_table.key[0]),
+        't_max': float(shv.temperatures[-1]),
+        'p_min': float(shv.pressures[0]),
+        'p_max': float(max(shv.pressures[-1], cl.pressures[-1]))
+    }
+
+
+def _segment(n, endpoint=True):
+    return np.linspace(0.0, 1.0, n, endpoint=endpoint)
+
+
+def _join(*parts):
+    """Concatenate state dicts of shape (lines, points) along the points axis."""
+    return {key: np.concatenate([part[key] for part in parts], axis=1) for key in LINE_PROPERTIES}
+
+
+def _drop_missing(lines):
+    """
+    Blank every property of the points where any property is NaN, so a line
+    breaks there on every chart instead of running through a state the
+    tables do not cover.
+    """
+    missing = np.zeros(lines[LINE_PROPERTIES[0]].shape, dtype=bool)
+    for key in LINE_PROPERTIES:
+        missing |= np.isnan(lines[key])
+    for key in LINE_PROPERTIES:
+        lines[key][missing] = np.nan
+    return lines
+
+
+def quality_lines(data_dict, substance, qualities, resolution, ranges):
+    """Constant-quality lines from the lowest tabulated saturation pressure to the critical point."""
+    pressure = np.geomspace(ranges['p_sat_min'], ranges['p_critical'], resolution)
+    states = saturated_states(data_dict, substance, np.asarray(qualities, dtype=np.float64)[:, None],
+                              pressure=pressure[None, :])
+    return {key: states[key] for key in LINE_PROPERTIES}
+
+
+def isobar_lines(data_dict, substance, pressures, resolution, ranges):
+    """
+    Isobars from the lowest tabulated temperature through compressed liquid,
+    across the dome and through superheated vapor up to the hottest grid
+    temperature. Above the critical pressure there is no dome: the isobar
+    is one sweep over the whole temperature range.
+    """
+    pressure = np.asarray(pressures, dtype=np.float64)[:, None]
+    t_sat = saturated_states(data_dict, substance, 0.0, pressure=pressure)['temperature']
+    t_liquid = ranges['t_min'] + (t_sat - ranges['t_min']) * _segment(resolution, endpoint=False)
+    t_vapor = t_sat + (ranges['t_max'] - t_sat) * _segment(resolution + 1)[1:]
+
+    single = pressure_temperature_states(data_dict, substance, pressure,
+                                         np.concatenate([t_liquid, t_vapor], axis=1))
+    liquid = {key: values[:, :resolution] for key, values in single.items()}
+    vapor = {key: values[:, resolution:] for key, values in single.items()}
+    dome = saturated_states(data_dict, substance, _segment(resolution)[None, :], pressure=pressure)
+    lines = _join(liquid, dome, vapor)
+
+    supercritical = pressure[:, 0] > ranges['p_critical']
+    if supercritical.any():
+        t_sweep = ranges['t_min'] + (ranges['t_max'] - ranges['t_min']) * _segment(3 * resolution)
+        sweep = pressure_temperature_states(data_dict, substance, pressure[supercritical], t_sweep[None, :])
+        for key in LINE_PROPERTIES:
+            lines[key][supercritical] = sweep[key]
+    return _drop_missing(lines)
+
+
+def isotherm_lines(data_dict, substance, temperatures, resolution, ranges):
+    """
+    Isotherms from the highest grid pressure down through compressed liquid,
+    across the dome and through superheated vapor down to the lowest grid
+    pressure. Above the critical temperature there is no dome: the isotherm
+    is one sweep over the whole pressure range. Pressure steps are spaced
+    logarithmically.
+    """
+    temperature = np.asarray(temperatures, dtype=np.float64)[:, None]
+    p_sat = saturated_states(data_dict, substance, 0.0, temperature=temperature)['pressure']
+    p_liquid = p_sat * (ranges['p_max'] / p_sat) ** (1.0 - _segment(resolution, endpoint=False))
+    p_vapor = p_sat * (ranges['p_min'] / p_sat) ** _segment(resolution + 1)[1:]
+
+    single = pressure_temperature_states(data_dict, substance, np.concatenate([p_liquid, p_vapor], axis=1),
+                                         temperature)
+    liquid = {key: values[:, :resolution] for key, values in single.items()}
+    vapor = {key: values[:, resolution:] for key, values in single.items()}
+    dome = saturated_states(data_dict, substance, _segment(resolution)[None, :], temperature=temperature)
+    # Saturation below the grids' lowest pressure leaves no vapor segment
+    no_vapor = p_sat[:, 0] <= ranges['p_min']
+    for key in LINE_PROPERTIES:
+        vapor[key][no_vapor] = np.nan
+    lines = _join(liquid, dome, vapor)
+
+    supercritical = temperature[:, 0] > ranges['t_critical']
+    if supercritical.any():
+        p_sweep = ranges['p_max'] * (ranges['p_min'] / ranges['p_max']) ** _segment(3 * resolution)
+        sweep = pressure_temperature_states(data_dict, substance, p_sweep[None, :], temperature[supercritical])
+        for key in LINE_PROPERTIES:
+            lines[key][supercritical] = sweep[key]
+    return _drop_missing(lines)
+
+
+def compute_diagram(data_dict, substance, resolution=100, isobars=None, isotherms=None,
+                    qualities=DEFAULT_QUALITIES):
+    """
+    All line families of one substance with `resolution` points per line
+    segment (dome lines have `resolution` points, isobars and isotherms
+    3 * resolution). Isobar levels (bar) and isotherm levels (°C) default
+    to DEFAULT_LINES rounded values spanning the tables.
+    """
+    if resolution < 2:
+        raise ValueError("resolution must be at least 2")
+    ranges = diagram_ranges(data_dict, substance)
+    if isobars is None:
+        isobars = _nice_levels(ranges['p_min'], ranges['p_max'], DEFAULT_LINES, log=True)
+    if isotherms is None:
+        isotherms = _nice_levels(ranges['t_min'], ranges['t_max'], DEFAULT_LINES)
+
+    families = {
+        'dome': (np.array([0.0, 1.0]), quality_lines(data_dict, substance, [0.0, 1.0], resolution, ranges)),
+        'quality': (np.asarray(qualities, dtype=np.float64),
+                    quality_lines(data_dict, substance, qualities, resolution, ranges)),
+        'isobar': (np.asarray(isobars, dtype=np.float64),
+                   isobar_lines(data_dict, substance, isobars, resolution, ranges)),
+        'isotherm': (np.asarray(isotherms, dtype=np.float64),
+                     isotherm_lines(data_dict, substance, isotherms, resolution, ranges))
+    }
+    return {
+        'substance': substance,
+        'resolution': resolution,
+        'critical': {'temperature': ranges['t_critical'], 'pressure': ranges['p_critical']},
+        'families': {name: dict(lines, levels=levels) for name, (levels, lines) in families.items()
+                     if levels.size}
+    }
+
+
+# What each family's levels are values of
+_LEVEL_PROPERTY = {'dome': 'quality', 'quality': 'quality', 'isobar': 'pressure', 'isotherm': 'temperature'}
+
+
+def _projection(diagram, kind):
+    if kind not in DIAGRAM_AXES:
+        raise ValueError(f"Unknown diagram kind '{kind}', expected one of {sorted(DIAGRAM_AXES)}")
+    x, y = DIAGRAM_AXES[kind]
+    header = {
+        'substance': diagram['substance'],
+        'kind': kind,
+        'x': x,
+        'y': y,
+        'units': {'x': UNITS[x], 'y': UNITS[y]},
+        'critical': diagram['critical']
+    }
+    return header, x, y
+
+
+def _json_lines(values):
+    return [[float(f"{v:.6g}") if np.isfinite(v) else None for v in line] for line in values.tolist()]
+
+
+def to_json(diagram, kind):
+    """
+    A chart kind of `diagram` as a JSON-ready dict: per family the line
+    levels and the x and y coordinates, (lines, points) nested lists with
+    None for points outside the tables.
+    """
+    payload, x, y = _projection(diagram, kind)
+    payload['families'] = {
+        name: {
+            'level': _LEVEL_PROPERTY[name],
+            'levels': family['levels'].tolist(),
+            'x': _json_lines(family[x]),
+            'y': _json_lines(family[y])
+        } for name, family in diagram['families'].items()
+    }
+    return payload
+
+
+def to_binary(diagram, kind):
+    """
+    A chart kind of `diagram` as bytes: BINARY_MAGIC, the little-endian
+    uint32 length of a JSON header, the header padded to a multiple of four
+    bytes, then little-endian float32 arrays (NaN outside the tables). The
+    header describes each family's levels, shape and the byte offsets of its
+    x and y arrays from the start of the array section, so a front end can
+    wrap them in Float32Array views without copying.
+    """
+    header, x, y = _projection(diagram, kind)
+    arrays = []
+    offset = 0
+    header['families'] = {}
+    for name, family in diagram['families'].items():
+        entry = {'level': _LEVEL_PROPERTY[name], 'levels': family['levels'].tolist(),
+                 'shape': list(family[x].shape)}
+        for axis, prop in (('x', x), ('y', y)):
+            array = np.ascontiguousarray(family[prop], dtype='<f4')
+            entry[f'{axis}_offset'] = offset
+            offset += array.nbytes
+            arrays.append(array)
+        header['families'][name] = entry
+
+    text = json.dumps(header).encode()
+    text += b' ' * (-len(text) % 4)
+    return b''.join([BINARY_MAGIC, struct.pack('<I', len(text)), text] + [array.tobytes() for array in arrays])
+
+
+class DiagramCache:
+    """
+    Bounded LRU cache of compute_diagram results for one set of tables,
+    keyed by substance, resolution and line levels.
+    """
+
+    def __init__(self, data_dict, maxsize=32):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.data_dict = data_dict
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, substance, resolution=100, isobars=None, isotherms=None, qualities=DEFAULT_QUALITIES):
+        key = (substance, int(resolution),
+               None if isobars is None else tuple(map(float, isobars)),
+               None if isotherms is None else tuple(map(float, isotherms)),
+               tuple(map(float, qualities)))
+        with self._lock:
+            diagram = self._entries.get(key)
+            if diagram is not None:
+                self._entries.move_to_end(key)
+                return diagram
+
+        diagram = compute_diagram(self.data_dict, substance, int(resolution), key[2], key[3], key[4])
+        with self._lock:
+            self._entries[key] = diagram
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return diagram
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
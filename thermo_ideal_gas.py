@@ -0,0 +1,106 @@
+"""
+Ideal-gas properties from the tables of ideal_table.xlsx.
+
+Every function takes scalars or arrays of any shape and evaluates them in
+one vectorized pass over the compiled IdealGasTable of the gas ('air',
+'co2', 'water', 'o2', 'n2' or 'ammonia'), which the TableStore reads on
+first use like any other table. Values outside the tabulated temperature
+range come out NaN.
+
+Air is tabulated per kg and the other gases per kmol; pass basis='mass'
+or basis='molar' to get h, u and s° on a specific basis regardless.
+
+    data_dict = thermo.load_all_data()
+    h = enthalpy(data_dict, 'air', np.linspace(300, 1500, 1_000_000))
+    t2s = isentropic_temperature(data_dict, 'air', 300.0, 10.0)
+"""
+import numpy as np
+
+import thermo_calc_python as thermo
+from thermo_tables import (
+    IDEAL_H, IDEAL_PROPERTIES, IDEAL_S0, IDEAL_U, interpolate_ideal_gas,
+    solve_ideal_gas_temperature
+)
+
+# Atmospheric reference pressure of s° (bar)
+REFERENCE_PRESSURE = 1.01325
+
+_PER_AMOUNT = (IDEAL_H, IDEAL_U, IDEAL_S0)
+
+
+def ideal_gas_table(data_dict, gas):
+    table = thermo.substance_table(data_dict, gas, 'ideal')
+    if table is None:
+        raise KeyError(f"No ideal-gas table for {gas}")
+    return table
+
+
+def _basis_factor(table, column, basis):
+    """Multiplier taking a value of `column` from the table's basis to `basis`."""
+    if basis is None or basis == table.basis or column not in _PER_AMOUNT:
+        return 1.0
+    if basis not in ('mass', 'molar'):
+        raise ValueError(f"Unknown basis '{basis}'")
+    return table.molar_mass if basis == 'molar' else 1.0 / table.molar_mass
+
+
+def property_value(data_dict, gas, prop, temperature, basis=None):
+    """Property `prop` (a key of IDEAL_PROPERTIES) of `gas` at `temperature` (K)."""
+    table = ideal_gas_table(data_dict, gas)
+    column = IDEAL_PROPERTIES[prop]
+    return interpolate_ideal_gas(table, temperature, column) * _basis_factor(table, column, basis)
+
+
+def enthalpy(data_dict, gas, temperature, basis=None):
+    return property_value(data_dict, gas, 'enthalpy', temperature, basis)
+
+
+def internal_energy(data_dict, gas, temperature, basis=None):
+    return property_value(data_dict, gas, 'internal_energy', temperature, basis)
+
+
+def standard_entropy(data_dict, gas, temperature, basis=None):
+    return property_value(data_dict, gas, 'standard_entropy', temperature, basis)
+
+
+def relative_pressure(data_dict, gas, temperature):
+    return property_value(data_dict, gas, 'relative_pressure', temperature)
+
+
+def relative_volume(data_dict, gas, temperature):
+    return property_value(data_dict, gas, 'relative_volume', temperature)
+
+
+def temperature_from(data_dict, gas, prop, value, basis=None):
+    """
+    Inverse lookup: the temperature (K) at which `prop` (any key of
+    IDEAL_PROPERTIES) equals `value`, given on `basis` (the table's own by
+    default). With vr this gives the isentropic relation in volume:
+    temperature_from(..., 'relative_volume', relative_volume(..., t1) * v2 / v1).
+    """
+    table = ideal_gas_table(data_dict, gas)
+    column = IDEAL_PROPERTIES[prop]
+    return solve_ideal_gas_temperature(table, column, np.asarray(value, dtype=np.float64) /
+                                       _basis_factor(table, column, basis))
+
+
+def entropy(data_dict, gas, temperature, pressure, basis=None):
+    """Absolute entropy s(T, P) = s°(T) - R ln(P / P0), pressure in bar."""
+    table = ideal_gas_table(data_dict, gas)
+    factor = _basis_factor(table, IDEAL_S0, basis)
+    s0 = interpolate_ideal_gas(table, temperature, IDEAL_S0)
+    return (s0 - table.gas_constant * np.log(np.asarray(pressure, dtype=np.float64) / REFERENCE_PRESSURE)) * factor
+
+
+def isentropic_temperature(data_dict, gas, temperature, pressure_ratio):
+    """
+    Temperature (K) after an isentropic change of pressure by `pressure_ratio`
+    (P2 / P1) from `temperature`, from s°(T2) = s°(T1) + R ln(P2 / P1).
+    Uses s° rather than pr so it holds for every gas, including those whose
+    pr is derived from s°.
+    """
+    table = ideal_gas_table(data_dict, gas)
+    s0 = interpolate_ideal_gas(table, temperature, IDEAL_S0)
+    s0 = s0 + table.gas_constant * np.log(np.asarray(pressure_ratio, dtype=np.float64))
+    return solve_ideal_gas_temperature(table, IDEAL_S0, s0)
+
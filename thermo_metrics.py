@@ -0,0 +1,189 @@
+"""
+Opt-in instrumentation of the lookup engine.
+
+Functions decorated with @instrumented record a call count and a latency
+histogram per (stage, substance, phase). Batch stages also count the states
+they put in each phase with registry.add_items. Recording is off by default
+and the disabled path is a single global flag check; turn it on with
+enable() or by setting THERMO_METRICS=1 in the environment before import.
+
+registry.snapshot() returns counts and p50/p99 estimates as a dict,
+registry.phase_items() the per-phase state counts and
+registry.render_prometheus() both in the Prometheus text exposition format.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets: 1-2-5 steps from 1 us to 10 s
+LATENCY_BUCKETS = tuple(float(f"{m}e{e}") for e in range(-6, 1) for m in (1, 2, 5)) + (10.0,)
+
+_enabled = os.environ.get("THERMO_METRICS", "").lower() in ("1", "true", "yes", "on")
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+class Histogram:
+    """Cumulative-style latency histogram over fixed bucket bounds."""
+    __slots__ = ('counts', 'count', 'total', 'items')
+
+    def __init__(self, nbuckets):
+        self.counts = [0] * (nbuckets + 1)     # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.items = 0
+
+    def quantile(self, q, bounds):
+        """Estimate quantile `q` by linear interpolation inside its bucket."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = bounds[i - 1] if i > 0 else 0.0
+                if i == len(bounds):
+                    return lower
+                return lower + (bounds[i] - lower) * (rank - seen) / n
+            seen += n
+        return bounds[-1]
+
+
+class MetricsRegistry:
+    """Thread-safe store of the histograms keyed by (stage, substance, phase)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._phase_items = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, substance, phase, seconds, items=1):
+        key = (stage, substance or "", phase or "")
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(len(self.buckets))
+            histogram.counts[i] += 1
+            histogram.count += 1
+            histogram.total += seconds
+            histogram.items += items
+
+    def add_items(self, stage, substance, phase, items):
+        """Count `items` states of `phase` processed by `stage`, without a latency observation."""
+        key = (stage, substance or "", phase or "")
+        with self._lock:
+            self._phase_items[key] = self._phase_items.get(key, 0) + items
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._phase_items.clear()
+
+    def phase_items(self):
+        """{(stage, substance, phase): states counted with add_items}"""
+        with self._lock:
+            return dict(self._phase_items)
+
+    def snapshot(self):
+        """{(stage, substance, phase): {'count', 'items', 'sum_s', 'p50_s', 'p99_s'}}"""
+        with self._lock:
+            items = [(key, h.quantile(0.5, self.buckets), h.quantile(0.99, self.buckets), h.count, h.items, h.total)
+                     for key, h in self._histograms.items()]
+        return {key: {"count": count, "items": n, "sum_s": total, "p50_s": p50, "p99_s": p99}
+                for key, p50, p99, count, n, total in items}
+
+    def render_prometheus(self):
+        """Prometheus text exposition (format 0.0.4) of every histogram."""
+        with self._lock:
+            histograms = [(key, list(h.counts), h.count, h.items, h.total, h.quantile(0.5, self.buckets),
+                           h.quantile(0.99, self.buckets)) for key, h in sorted(self._histograms.items())]
+            phase_items = sorted(self._phase_items.items())
+
+        lines = [
+            "# HELP thermo_stage_seconds Latency of instrumented lookup stages.",
+            "# TYPE thermo_stage_seconds histogram"
+        ]
+        for key, counts, count, _, total, _, _ in histograms:
+            labels = _labels(key)
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f'thermo_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"thermo_stage_seconds_sum{{{labels}}} {total!r}")
+            lines.append(f"thermo_stage_seconds_count{{{labels}}} {count}")
+
+        lines.append("# HELP thermo_stage_items_total States processed by instrumented stages.")
+        lines.append("# TYPE thermo_stage_items_total counter")
+        for key, _, _, items, _, _, _ in histograms:
+            lines.append(f"thermo_stage_items_total{{{_labels(key)}}} {items}")
+
+        lines.append("# HELP thermo_phase_items_total States per phase resolved by batch stages.")
+        lines.append("# TYPE thermo_phase_items_total counter")
+        for key, items in phase_items:
+            lines.append(f"thermo_phase_items_total{{{_labels(key)}}} {items}")
+
+        for name, index in (("p50", 5), ("p99", 6)):
+            lines.append(f"# HELP thermo_stage_{name}_seconds Estimated {name} latency from the histogram.")
+            lines.append(f"# TYPE thermo_stage_{name}_seconds gauge")
+            for entry in histograms:
+                if entry[index] is not None:
+                    lines.append(f"thermo_stage_{name}_seconds{{{_labels(entry[0])}}} {entry[index]!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key):
+    stage, substance, phase = key
+    return f'stage="{_escape(stage)}",substance="{_escape(substance)}",phase="{_escape(phase)}"'
+
+
+# Process-wide registry used by @instrumented
+registry = MetricsRegistry()
+
+
+def instrumented(stage, labels=None, items=None):
+    """
+    Decorator recording the latency of every call under `stage` while
+    instrumentation is enabled.
+
+    `labels(args, kwargs, result)` returns the (substance, phase) of a call
+    and `items(args, kwargs, result)` the number of states it processed;
+    both are only evaluated when enabled. `result` is None if the call raised.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            result = None
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                elapsed = time.perf_counter() - start
+                substance, phase = labels(args, kwargs, result) if labels else (None, None)
+                registry.observe(stage, substance, phase, elapsed,
+                                 items(args, kwargs, result) if items else 1)
+        return wrapper
+    return decorate
@@ -0,0 +1,83 @@
+"""
+Thread-pool batch driver for evaluate_states.
+
+The lookup kernels (interpolate_saturation, classify_states, the in-place
+mixing in evaluate_states, interpolate_grid) are numpy ufunc, take,
+searchsorted and copyto calls on float64 arrays, all of which release the
+GIL while they run. evaluate_states also writes into caller-provided arrays
+(out=), so a large batch can be split into chunks that threads of one
+process evaluate concurrently against the same resident tables, each
+writing its own slice of one preallocated result: no pickling, no copies
+and no concatenation at the end.
+
+    out = allocate_states(n)
+    parallel_evaluate_states(data_dict, 'water', 'temperature', t, 'enthalpy', h, threads=8, out=out)
+
+Chunks should be large enough (tens of thousands of states) that the
+Python-level bookkeeping between kernels, which does hold the GIL, stays a
+small fraction of each chunk's time.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import thermo_calc_python as thermo
+from thermo_calc_python import allocate_states, flat_state_buffers
+
+CHUNK_SIZE = 65536
+
+
+def _evaluate_chunk(data_dict, substance, first_property, first_values, second_property, second_values,
+                    out, start, stop):
+    thermo.evaluate_states(data_dict, substance, first_property, first_values[start:stop],
+                           second_property, second_values[start:stop],
+                           out=out[start:stop] if isinstance(out, np.ndarray) else
+                           {key: values[start:stop] for key, values in out.items()})
+
+
+def parallel_evaluate_states(data_dict, substance, first_property, first_values, second_property, second_values,
+                             threads=None, chunk_size=CHUNK_SIZE, out=None, executor=None):
+    """
+    evaluate_states over `threads` threads (default: os.cpu_count()), in
+    chunks of `chunk_size` states. Results are identical to a single
+    evaluate_states call and are written into `out` (a dict of arrays or a
+    STATE_DTYPE array, see allocate_states) when given. Pass a long-lived
+    ThreadPoolExecutor as `executor` to avoid starting threads on every
+    call; `threads` is then ignored.
+    """
+    first_values = np.asarray(first_values, dtype=np.float64)
+    second_values = np.asarray(second_values, dtype=np.float64)
+    first_values, second_values = np.broadcast_arrays(first_values, second_values)
+    shape = first_values.shape
+    first_flat = np.ascontiguousarray(first_values).reshape(-1)
+    second_flat = np.ascontiguousarray(second_values).reshape(-1)
+    n = first_flat.shape[0]
+
+    if out is None:
+        out = allocate_states(shape)
+    flat = flat_state_buffers(out, shape)
+
+    # Load the substance's tables once up front rather than racing on first use
+    for kind in ('temp', 'pressure', 'shv', 'cl'):
+        thermo.substance_table(data_dict, substance, kind)
+
+    bounds = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+    if executor is None and (threads == 1 or len(bounds) <= 1):
+        for start, stop in bounds:
+            _evaluate_chunk(data_dict, substance, first_property, first_flat, second_property, second_flat,
+                            flat, start, stop)
+        return out
+
+    def run(pool):
+        futures = [pool.submit(_evaluate_chunk, data_dict, substance, first_property, first_flat,
+                               second_property, second_flat, flat, start, stop) for start, stop in bounds]
+        for future in futures:
+            future.result()
+
+    if executor is not None:
+        run(executor)
+    else:
+        with ThreadPoolExecutor(max_workers=threads or os.cpu_count(), thread_name_prefix='thermo') as pool:
+            run(pool)
+    return out
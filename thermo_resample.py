@@ -0,0 +1,447 @@
+"""
+Optional resampling of the compiled tables onto uniform grids.
+
+A resampled table stores its values at evenly spaced nodes of the key axis
+(saturation tables) or, for the SHV/CL grids, of the temperature axis of
+every tabulated isobar, so a lookup is a direct index computation plus
+linear interpolation instead of a binary search. Saturation keys are spaced
+uniformly in a logit coordinate that crowds the nodes towards both ends of
+the table, where the rows approach the critical point. The grids keep their
+pressure blocks, between which they are linear anyway; a uniform bucket
+index over the pressures finds the block in constant time.
+
+Node values come either from the original piecewise-linear tables
+(method='linear') or from natural cubic splines through the tabulated rows
+(method='cubic', which departs from the piecewise-linear tables between
+their rows by design). accuracy_report compares every resampled table with
+the original interpolation (the compiled form of interpolate_value) so
+resolution can be traded against memory per substance:
+
+    python thermo_resample.py --resolution 1024 --override water=4096 --override co2=512:cubic
+
+With --save the resampled tables are also written to the table cache, where
+evaluate_states(..., backend='uniform') picks them up.
+"""
+import argparse
+import math
+
+import numpy as np
+
+from thermo_tables import (
+    GRID_PROPERTIES, SATURATION_COLUMNS, PropertyGrid, SaturationTable, interpolate_grid,
+    interpolate_saturation, table_substance
+)
+
+METHODS = ('linear', 'cubic')
+
+
+SCALES = ('linear', 'log', 'logit')
+
+# Offset of the logit scale, relative to the span of the axis: the node
+# spacing is finest (about this fraction of the span) at either end
+LOGIT_OFFSET = 1e-5
+
+
+class UniformAxis:
+    """
+    Evenly spaced nodes over [lo, hi] in one of the coordinates of SCALES:
+    the value itself, its log10, or ln((x - lo + a) / (hi - x + a)) with
+    a = LOGIT_OFFSET * (hi - lo).
+    """
+    __slots__ = ('lo', 'hi', 'size', 'scale', 'offset', 'start', 'step')
+
+    def __init__(self, lo, hi, size, scale='linear'):
+        if size < 2:
+            raise ValueError("A uniform axis needs at least two nodes")
+        if scale not in SCALES:
+            raise ValueError(f"Unknown axis scale '{scale}'")
+        self.lo = float(lo)
+        self.hi = float(hi)
+        self.size = int(size)
+        self.scale = scale
+        self.offset = LOGIT_OFFSET * (self.hi - self.lo)
+        self.start = self._coordinate(self.lo)
+        self.step = (self._coordinate(self.hi) - self.start) / (self.size - 1)
+
+    def _coordinate(self, x):
+        if self.scale == 'log':
+            return math.log10(x)
+        if self.scale == 'logit':
+            return math.log(x - self.lo + self.offset) - math.log(self.hi - x + self.offset)
+        return x
+
+    def coordinate(self, x):
+        if self.scale == 'log':
+            return np.log10(x)
+        if self.scale == 'logit':
+            return np.log(x - self.lo + self.offset) - np.log(self.hi - x + self.offset)
+        return x
+
+    def nodes(self):
+        u = self.start + self.step * np.arange(self.size)
+        if self.scale == 'log':
+            nodes = 10.0 ** u
+        elif self.scale == 'logit':
+            e = np.exp(u)
+            nodes = (e * (self.hi + self.offset) + self.lo - self.offset) / (1 + e)
+        else:
+            nodes = u
+        nodes[0], nodes[-1] = self.lo, self.hi
+        return nodes
+
+    def locate(self, x):
+        """Cell index and weight of each x (clamped to the axis)."""
+        if np.ndim(x) == 0:
+            # Plain float arithmetic is several times cheaper than numpy for one point
+            x = min(max(float(x), self.lo), self.hi)
+            f = (self._coordinate(x) - self.start) / self.step
+            i = min(int(f), self.size - 2)
+            return i, f - i
+        x = np.clip(x, self.lo, self.hi)
+        with np.errstate(invalid='ignore'):
+            # NaN points get an arbitrary cell and a NaN weight
+            f = (self.coordinate(x) - self.start) / self.step
+            i = np.clip(f.astype(np.intp), 0, self.size - 2)
+        return i, f - i
+
+
+def _axis_for(values, size):
+    """Uniform axis over `values`, log-spaced when they are positive and span more than two decades."""
+    lo, hi = float(values[0]), float(values[-1])
+    return UniformAxis(lo, hi, size, scale='log' if lo > 0 and hi / lo > 100 else 'linear')
+
+
+def natural_spline(x, y, xq):
+    """
+    Evaluate natural cubic splines through (x, y[k]) for every row k of `y`
+    at the points `xq`. `x` must be strictly increasing.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.atleast_2d(np.asarray(y, dtype=np.float64))
+    n = x.shape[0]
+    h = np.diff(x)
+    if n < 3:
+        return np.vstack([np.interp(xq, x, row) for row in y])
+
+    # Tridiagonal system for the second derivatives, natural end conditions
+    A = np.zeros((n, n))
+    A[0, 0] = A[-1, -1] = 1.0
+    i = np.arange(1, n - 1)
+    A[i, i - 1] = h[:-1]
+    A[i, i] = 2.0 * (h[:-1] + h[1:])
+    A[i, i + 1] = h[1:]
+    slopes = np.diff(y, axis=1) / h
+    rhs = np.zeros((n, y.shape[0]))
+    rhs[1:-1] = 6.0 * (slopes[:, 1:] - slopes[:, :-1]).T
+    M = np.linalg.solve(A, rhs).T
+
+    xq = np.asarray(xq, dtype=np.float64)
+    j = np.clip(np.searchsorted(x, xq, side='right') - 1, 0, n - 2)
+    a = (x[j + 1] - xq) / h[j]
+    b = (xq - x[j]) / h[j]
+    return (a * y[:, j] + b * y[:, j + 1]
+            + ((a ** 3 - a) * M[:, j] + (b ** 3 - b) * M[:, j + 1]) * h[j] ** 2 / 6.0)
+
+
+class UniformSaturationTable:
+    """A saturation table resampled onto a uniform key axis; `data` is (columns, nodes)."""
+    __slots__ = ('name', 'key_index', 'axis', 'data', 'method')
+
+    def __init__(self, name, key_index, axis, data, method):
+        self.name = name
+        self.key_index = key_index
+        self.axis = axis
+        self.data = np.ascontiguousarray(data, dtype=np.float64)
+        self.method = method
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def __repr__(self):
+        return f"UniformSaturationTable({self.name!r}, nodes={self.axis.size}, method={self.method!r})"
+
+
+class UniformGrid:
+    """
+    An SHV/CL grid with each tabulated isobar resampled onto a uniform
+    temperature axis; `values` is (pressure block, T node, 4). Nodes outside
+    a block's tabulated range [t_min, t_max] hold the values at the nearer
+    end, which on the dome side is the block's Sat row. The pressure block
+    is found through `p_index`, the block below each node of the uniform
+    `p_axis`; its cells are narrower than the closest two blocks, so at most
+    one tabulated pressure lies inside a cell.
+    """
+    __slots__ = ('name', 'pressures', 'p_axis', 'p_index', 't_axis', 'values', 't_min', 't_max', 't_sat',
+                 'method')
+
+    def __init__(self, name, pressures, p_axis, p_index, t_axis, values, t_min, t_max, t_sat, method):
+        self.name = name
+        self.pressures = np.ascontiguousarray(pressures, dtype=np.float64)
+        self.p_axis = p_axis
+        self.p_index = np.ascontiguousarray(p_index, dtype=np.intp)
+        self.t_axis = t_axis
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.t_min = np.ascontiguousarray(t_min, dtype=np.float64)
+        self.t_max = np.ascontiguousarray(t_max, dtype=np.float64)
+        self.t_sat = np.ascontiguousarray(t_sat, dtype=np.float64)
+        self.method = method
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ('pressures', 'p_index', 'values', 't_min', 't_max',
+                                                           't_sat'))
+
+    def __repr__(self):
+        return (f"UniformGrid({self.name!r}, pressures={self.pressures.shape[0]}, "
+                f"temperatures={self.t_axis.size}, method={self.method!r})")
+
+
+def resample_saturation_table(table, size=1024, method='linear'):
+    key = table.key
+    axis = UniformAxis(key[0], key[-1], size, scale='logit')
+    nodes = axis.nodes()
+    if method == 'linear':
+        data = interpolate_saturation(table, nodes)
+    elif method == 'cubic':
+        data = natural_spline(key, table.data, nodes)
+        data[table.key_index] = nodes
+    else:
+        raise ValueError(f"Unknown resampling method '{method}'")
+    return UniformSaturationTable(table.name, table.key_index, axis, data, method)
+
+
+def _pressure_index(pressures):
+    """Uniform bucket axis over `pressures` and the block below each of its nodes."""
+    axis = _axis_for(pressures, 2)
+    u = axis.coordinate(pressures)
+    axis = UniformAxis(pressures[0], pressures[-1], 2 * int(np.ceil((u[-1] - u[0]) / np.diff(u).min())) + 2,
+                       scale=axis.scale)
+    index = np.clip(np.searchsorted(pressures, axis.nodes(), side='right') - 1, 0, pressures.shape[0] - 2)
+    return axis, index
+
+
+def resample_property_grid(grid, size=1024, method='linear'):
+    """
+    Resample every isobar of a PropertyGrid onto `size` evenly spaced
+    temperatures. Pressures keep the tabulated blocks, between which the
+    grid is linear anyway.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown resampling method '{method}'")
+    t_axis = UniformAxis(grid.temperatures[0], grid.temperatures[-1], size)
+    temperatures = t_axis.nodes()
+    values = np.empty((grid.pressures.shape[0], size, len(GRID_PROPERTIES)))
+    for i in range(grid.pressures.shape[0]):
+        valid = ~np.isnan(grid.values[i, :, 0])
+        t = grid.temperatures[valid]
+        # Clip to the block's range, so the nodes past its Sat row hold the Sat values
+        nodes = np.clip(temperatures, t[0], t[-1])
+        if method == 'cubic':
+            values[i] = natural_spline(t, grid.values[i, valid].T, nodes).T
+        else:
+            values[i] = np.column_stack([np.interp(nodes, t, grid.values[i, valid, k])
+                                         for k in range(len(GRID_PROPERTIES))])
+    p_axis, p_index = _pressure_index(grid.pressures)
+    return UniformGrid(grid.name, grid.pressures, p_axis, p_index, t_axis, values,
+                       grid.t_min, grid.t_max, grid.t_sat, method)
+
+
+def resample_table(table, size=1024, method='linear'):
+    """Resample a SaturationTable or PropertyGrid; other tables give None."""
+    if isinstance(table, SaturationTable):
+        return resample_saturation_table(table, size, method)
+    if isinstance(table, PropertyGrid):
+        return resample_property_grid(table, size, method)
+    return None
+
+
+def uniform_saturation(table, value, clamp=False):
+    """
+    Constant-time counterpart of interpolate_saturation: shape (columns, ...),
+    NaN outside the table, or with `clamp` the first/last node (and the
+    clamped key).
+    """
+    i, w = table.axis.locate(value)
+    result = table.data[:, i] * (1 - w) + table.data[:, i + 1] * w
+    if clamp:
+        result[table.key_index] = np.clip(value, table.axis.lo, table.axis.hi)
+    else:
+        result = np.where((value >= table.axis.lo) & (value <= table.axis.hi), result, np.nan)
+        result[table.key_index] = value
+    return result
+
+
+def _blend(a, b, w):
+    """a + (b - a) * w that returns an end exactly at w = 0 or 1, so a NaN on the other side never leaks in."""
+    with np.errstate(invalid='ignore'):
+        return np.where(w == 0, a, np.where(w == 1, b, a * (1 - w) + b * w))
+
+
+def uniform_grid(grid, temperature, pressure):
+    """
+    Constant-time counterpart of interpolate_grid: shape (..., 4), NaN
+    outside the table. Like interpolate_grid, points between two blocks
+    where one of them has no values (past its Sat row) are interpolated
+    along their isotherm towards the dome edge, the straight line joining
+    the blocks' Sat rows.
+    """
+    temperature, pressure = np.broadcast_arrays(np.asarray(temperature, dtype=np.float64),
+                                                np.asarray(pressure, dtype=np.float64))
+    shape = temperature.shape
+    t = temperature.reshape(-1)
+    p = pressure.reshape(-1)
+
+    pressures = grid.pressures
+    cell, _ = grid.p_axis.locate(p)
+    ip = grid.p_index[cell]
+    ip = np.clip(ip + (p >= pressures[ip + 1]) - (p < pressures[ip]), 0, pressures.shape[0] - 2)
+    w = (p - pressures[ip]) / (pressures[ip + 1] - pressures[ip])
+    it, wt = grid.t_axis.locate(t)
+    wt = wt[:, None]
+    v = grid.values
+    low = v[ip, it] * (1 - wt) + v[ip, it + 1] * wt
+    high = v[ip + 1, it] * (1 - wt) + v[ip + 1, it + 1] * wt
+    low[(t < grid.t_min[ip]) | (t > grid.t_max[ip])] = np.nan
+    high[(t < grid.t_min[ip + 1]) | (t > grid.t_max[ip + 1])] = np.nan
+    result = _blend(low, high, w[:, None])
+
+    ts0 = grid.t_sat[ip]
+    ts1 = grid.t_sat[ip + 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        wd = (t - ts0) / (ts1 - ts0)
+    vapor = bool(np.any(grid.t_sat == grid.t_min))
+    dome = ((wd >= w) & (wd < 1)) if vapor else ((wd <= w) & (wd > 0))
+    dome &= np.isnan(result[:, 0])
+    if dome.any():
+        i = ip[dome]
+        wd = wd[dome]
+        w = w[dome]
+        # The Sat row of each block is its node value at t_sat
+        edge = _blend(uniform_row(grid, i, ts0[dome]), uniform_row(grid, i + 1, ts1[dome]), wd[:, None])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if vapor:
+                result[dome] = _blend(low[dome], edge, (w / wd)[:, None])
+            else:
+                result[dome] = _blend(edge, high[dome], ((w - wd) / (1 - wd))[:, None])
+
+    inside = (p >= pressures[0]) & (p <= pressures[-1]) & (t >= grid.t_axis.lo) & (t <= grid.t_axis.hi)
+    result[~inside] = np.nan
+    return result.reshape(shape + (len(GRID_PROPERTIES),))
+
+
+def uniform_row(grid, blocks, temperature):
+    """Values of pressure blocks `blocks` of a UniformGrid at `temperature`, shape (..., 4)."""
+    it, wt = grid.t_axis.locate(temperature)
+    wt = np.asarray(wt)[..., None]
+    return grid.values[blocks, it] * (1 - wt) + grid.values[blocks, it + 1] * wt
+
+
+def resample_options(name, size=1024, method='linear', overrides=None):
+    """
+    (size, method) for table `name`. `overrides` maps a substance to a size
+    or a (size, method) pair, e.g. {'water': 4096, 'co2': (512, 'cubic')}.
+    """
+    option = (overrides or {}).get(table_substance(name), (size, method))
+    table_size, table_method = tuple(option) if isinstance(option, (tuple, list)) else (option, method)
+    if table_method not in METHODS:
+        raise ValueError(f"Unknown resampling method '{table_method}'")
+    return int(table_size), table_method
+
+
+def resample_tables(data_dict, size=1024, method='linear', overrides=None):
+    """
+    Resample every saturation table and SHV/CL grid of `data_dict` in
+    memory, with the sizes and methods of resample_options. Returns
+    {table name: resampled table}.
+    """
+    resampled = {}
+    for name in data_dict:
+        fast = resample_table(data_dict[name], *resample_options(name, size, method, overrides))
+        if fast is not None:
+            resampled[name] = fast
+    return resampled
+
+
+def _relative_error(approx, exact, scale):
+    with np.errstate(invalid='ignore'):
+        error = np.abs(approx - exact) / scale
+    return float(np.nanmax(error)) if np.any(~np.isnan(error)) else 0.0
+
+
+def accuracy_report(data_dict, resampled, samples=20000, seed=0):
+    """
+    Maximum error of every resampled table against the original table at the
+    tabulated rows, midway between them and at `samples` random points.
+    Errors are relative to each property's range in the table. 'lost' is the
+    fraction of points the original table answers but the resampled one
+    leaves NaN.
+    """
+    rng = np.random.default_rng(seed)
+    report = {}
+    for name, fast in resampled.items():
+        table = data_dict[name]
+        entry = {"method": fast.method, "bytes": fast.nbytes}
+        if isinstance(table, SaturationTable):
+            key = table.key
+            x = np.concatenate([key, 0.5 * (key[1:] + key[:-1]), rng.uniform(key[0], key[-1], samples)])
+            exact = interpolate_saturation(table, x)
+            approx = uniform_saturation(fast, x)
+            scale = np.ptp(table.data, axis=1)[:, None]
+            entry["nodes"] = fast.axis.size
+            entry["max_error"] = {SATURATION_COLUMNS[k]: _relative_error(approx[k], exact[k], scale[k])
+                                  for k in range(len(SATURATION_COLUMNS)) if k != fast.key_index}
+            entry["lost"] = 0.0
+        else:
+            p = rng.uniform(table.pressures[0], table.pressures[-1], samples)
+            t = rng.uniform(table.temperatures[0], table.temperatures[-1], samples)
+            exact = interpolate_grid(table, t, p)
+            approx = uniform_grid(fast, t, p)
+            scale = np.nanmax(table.values, axis=(0, 1)) - np.nanmin(table.values, axis=(0, 1))
+            entry["nodes"] = fast.pressures.shape[0] * fast.t_axis.size
+            entry["max_error"] = {prop: _relative_error(approx[:, k], exact[:, k], scale[k])
+                                  for k, prop in enumerate(GRID_PROPERTIES)}
+            valid = ~np.isnan(exact[:, 0])
+            entry["lost"] = float(np.mean(np.isnan(approx[valid, 0]))) if valid.any() else 0.0
+        report[name] = entry
+    return report
+
+
+def _parse_override(text):
+    substance, _, option = text.partition('=')
+    size, _, method = option.partition(':')
+    return substance, (int(size), method or 'linear')
+
+
+def main(argv=None):
+    import thermo_calc_python as thermo
+
+    parser = argparse.ArgumentParser(description="Resample the tables onto uniform grids and report the error.")
+    parser.add_argument('--resolution', type=int, default=1024, help="nodes per saturation table and per grid isobar (default 1024)")
+    parser.add_argument('--method', choices=METHODS, default='linear')
+    parser.add_argument('--override', action='append', default=[], type=_parse_override,
+                        metavar='SUBSTANCE=SIZE[:METHOD]', help="per-substance resolution and method")
+    parser.add_argument('--save', action='store_true',
+                        help="store the resampled tables in the table cache for evaluate_states(backend='uniform')")
+    args = parser.parse_args(argv)
+
+    options = {"size": args.resolution, "method": args.method, "overrides": dict(args.override)}
+    if args.save:
+        data_dict = thermo.load_all_data(resample=options)
+        resampled = {name: data_dict.resampled(name) for name in data_dict.resampled_names()}
+    else:
+        data_dict = thermo.load_all_data()
+        resampled = resample_tables(data_dict, **options)
+    report = accuracy_report(data_dict, resampled)
+
+    print(f"{'table':<26} {'method':<7} {'nodes':>8} {'KiB':>8} {'max rel. error':>15} {'lost':>7}")
+    total = 0
+    for name, entry in sorted(report.items()):
+        total += entry["bytes"]
+        print(f"{name:<26} {entry['method']:<7} {entry['nodes']:>8} {entry['bytes'] / 1024:>8.0f} "
+              f"{max(entry['max_error'].values()):>15.2e} {entry['lost']:>7.2%}")
+    print(f"total {total / 1024:.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,907 @@
+import re
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Canonical saturation schema. Every compiled saturation table stores its
+# columns in this order, whatever their order and spelling in the sheet, so
+# lookups index rows by these constants instead of matching header strings.
+SAT_TEMPERATURE, SAT_PRESSURE = 0, 1
+SAT_VF, SAT_UF, SAT_HF, SAT_SF = 2, 3, 4, 5
+SAT_VG, SAT_UG, SAT_HG, SAT_SG = 6, 7, 8, 9
+
+SATURATION_COLUMNS = (
+    "Temp. (C)",
+    "Press. (bar)",
+    "Volume (vf, m3/kg)",
+    "Internal Energy (uf, kJ/kg)",
+    "Enthalpy (hf, kJ/kg)",
+    "Entropy (sf, kJ/kg/K)",
+    "Volume (vg, m3/kg)",
+    "Internal Energy (ug, kJ/kg)",
+    "Enthalpy (hg, kJ/kg)",
+    "Entropy (sg, kJ/kg/K)"
+)
+
+# Key column of each saturation table variant
+KEY_INDEX = {
+    "pressure": SAT_PRESSURE,
+    "temperature": SAT_TEMPERATURE
+}
+
+# Property order of the last axis of a compiled PropertyGrid
+GRID_PROPERTIES = ('Volume', 'Internal Energy', 'Enthalpy', 'Entropy')
+
+# Intensive property -> its index in GRID_PROPERTIES, SAT_LIQUID and SAT_VAPOR
+PROPERTY_INDEX = {
+    "specific_volume": 0,
+    "internal_energy": 1,
+    "enthalpy": 2,
+    "entropy": 3
+}
+SAT_LIQUID = (SAT_VF, SAT_UF, SAT_HF, SAT_SF)
+SAT_VAPOR = (SAT_VG, SAT_UG, SAT_HG, SAT_SG)
+
+# Ideal-gas schema: temperature in K, then h, u and s° per kg or per kmol,
+# and the relative pressure and volume of the isentropic relations
+IDEAL_TEMPERATURE, IDEAL_H, IDEAL_U, IDEAL_S0, IDEAL_PR, IDEAL_VR = range(6)
+IDEAL_COLUMNS = ("Temp. [K]", "h", "u", "s°", "pr", "vr")
+IDEAL_PROPERTIES = {
+    "temperature": IDEAL_TEMPERATURE,
+    "enthalpy": IDEAL_H,
+    "internal_energy": IDEAL_U,
+    "standard_entropy": IDEAL_S0,
+    "relative_pressure": IDEAL_PR,
+    "relative_volume": IDEAL_VR
+}
+
+# Universal gas constant (kJ/kmol/K) and molar masses (kg/kmol) of the ideal-gas sheets
+GAS_CONSTANT = 8.31447
+MOLAR_MASS = {
+    "air": 28.97,
+    "co2": 44.01,
+    "water": 18.015,
+    "o2": 31.999,
+    "n2": 28.013,
+    "ammonia": 17.031
+}
+
+_SATURATION_SYMBOLS = {
+    "vf": SAT_VF, "uf": SAT_UF, "hf": SAT_HF, "sf": SAT_SF,
+    "vg": SAT_VG, "ug": SAT_UG, "hg": SAT_HG, "sg": SAT_SG
+}
+_SATURATION_SYMBOL = re.compile(r'\(\s*([vuhs][fg])\b')
+_GRID_HEADERS = (('volume', 0), ('internal energy', 1), ('enthalpy', 2), ('entropy', 3))
+
+_IDEAL_HEADERS = (('temp', IDEAL_TEMPERATURE), ('h ', IDEAL_H), ('u ', IDEAL_U), ('s°', IDEAL_S0),
+                  ('pr', IDEAL_PR), ('vr', IDEAL_VR))
+_IDEAL_GAS_SUBSTANCES = {"h2o": "water", "nh3": "ammonia"}
+
+_PRESSURE_HEADER = re.compile(r'p\s*=\s*(-?[\d.]+)\s*bar')
+_TSAT_HEADER = re.compile(r'Tsat\s*=\s*(-?[\d.]+)')
+
+def canonical_column_name(header):
+    """Collapse the irregular whitespace used in the spreadsheet headers."""
+    return ' '.join(str(header).split())
+
+def saturation_column_index(header):
+    """
+    Canonical SAT_* index of a saturation sheet header, or None if the
+    header is not a property column. Matches on the property symbol
+    ('vf', 'hg', ...) or the 'Temp.'/'Press.' prefix, so spacing and unit
+    spelling do not matter.
+    """
+    text = canonical_column_name(header).lower()
+    match = _SATURATION_SYMBOL.search(text)
+    if match:
+        return _SATURATION_SYMBOLS[match.group(1)]
+    if text.startswith('temp'):
+        return SAT_TEMPERATURE
+    if text.startswith('press'):
+        return SAT_PRESSURE
+    return None
+
+def grid_property_index(header):
+    """Index in GRID_PROPERTIES of an SHV/CL column header, or None."""
+    text = canonical_column_name(header).lower()
+    for prefix, index in _GRID_HEADERS:
+        if text.startswith(prefix):
+            return index
+    return None
+
+class SaturationTable:
+    """
+    Saturation table compiled once into contiguous float64 arrays.
+
+    `data` is laid out column-major (one contiguous row per property) in
+    SATURATION_COLUMNS order, and `key` is the sorted axis the table is
+    indexed by (row `key_index` of `data`). `slopes` holds the per-segment
+    derivative of every column with respect to the key, so interpolation is
+    one searchsorted plus a multiply-add.
+    """
+    __slots__ = ('name', 'key_index', 'key_column', 'columns', 'column_index', 'data', 'slopes', 'key',
+                 '__weakref__')
+
+    def __init__(self, name, key_index, data, slopes=None):
+        self.name = name
+        self.key_index = int(key_index)
+        self.key_column = SATURATION_COLUMNS[self.key_index]
+        self.columns = SATURATION_COLUMNS
+        self.column_index = {col: i for i, col in enumerate(self.columns)}
+        self.data = np.ascontiguousarray(data, dtype=np.float64)
+        if self.data.shape[0] != len(SATURATION_COLUMNS):
+            raise ValueError(f"Table {name} has {self.data.shape[0]} columns, "
+                             f"expected {len(SATURATION_COLUMNS)}")
+        self.key = self.data[self.key_index]
+        if slopes is None:
+            slopes = np.diff(self.data, axis=1) / np.diff(self.key)
+        self.slopes = np.ascontiguousarray(slopes, dtype=np.float64)
+
+    def __len__(self):
+        return self.key.shape[0]
+
+    def __repr__(self):
+        return f"SaturationTable({self.name!r}, key={self.key_column!r}, rows={len(self)})"
+
+class SaturationRow:
+    """
+    Saturation properties at one point, interpolated from a compiled table.
+    `values` is in SATURATION_COLUMNS order; index it with the SAT_* constants.
+    """
+    __slots__ = ('table', 'values')
+
+    def __init__(self, table, values):
+        self.table = table
+        self.values = values
+
+    @property
+    def columns(self):
+        return self.table.columns
+
+    def __getitem__(self, col):
+        if not isinstance(col, int):
+            col = self.table.column_index[col]
+        return float(self.values[col])
+
+    def __contains__(self, col):
+        return col in self.table.column_index
+
+    def items(self):
+        return zip(self.table.columns, self.values.tolist())
+
+def compile_saturation_table(df, name=None):
+    """
+    Compile a raw saturation sheet (headers still in row 0) into a SaturationTable.
+    Columns are mapped onto the canonical schema by saturation_column_index;
+    the key axis is the sheet's first column, which must be strictly increasing.
+    """
+    body = df.iloc[1:]
+    data = np.full((len(SATURATION_COLUMNS), body.shape[0]), np.nan)
+    found = []
+    for col, header in enumerate(df.iloc[0]):
+        index = saturation_column_index(header)
+        if index is None:
+            continue
+        if index in found:
+            raise ValueError(f"Duplicate column '{canonical_column_name(header)}' in table {name}")
+        values = pd.to_numeric(body.iloc[:, col].astype(str).str.strip(), errors='coerce')
+        data[index] = values.to_numpy(dtype=np.float64)
+        found.append(index)
+
+    missing = [SATURATION_COLUMNS[i] for i in range(len(SATURATION_COLUMNS)) if i not in found]
+    if missing:
+        raise ValueError(f"Table {name} is missing columns {missing}")
+    key_index = found[0]
+    if key_index not in KEY_INDEX.values():
+        raise ValueError(f"Unrecognised key column '{SATURATION_COLUMNS[key_index]}' in table {name}")
+
+    # Drop rows without a key and make sure the axis is searchable
+    data = data[:, ~np.isnan(data[key_index])]
+    order = np.argsort(data[key_index], kind='stable')
+    data = data[:, order]
+    if np.any(np.diff(data[key_index]) <= 0):
+        raise ValueError(f"Key column '{SATURATION_COLUMNS[key_index]}' of table {name} has duplicate values")
+
+    table = SaturationTable(name, key_index, data)
+    validate_saturation_table(table)
+    return table
+
+def validate_saturation_table(table):
+    """
+    Reject a compiled saturation table whose content would break the lookups:
+    fewer than two rows, non-numeric or missing cells, a temperature or
+    pressure axis that decreases, non-positive pressures or volumes, or a
+    saturated vapor property below its liquid counterpart.
+    """
+    data = table.data
+    key = SATURATION_COLUMNS[table.key_index]
+    if data.shape[1] < 2:
+        raise ValueError(f"Table {table.name} needs at least two rows")
+    bad = ~np.isfinite(data)
+    if bad.any():
+        column, row = np.argwhere(bad)[0]
+        raise ValueError(f"Table {table.name} has a missing or non-numeric '{SATURATION_COLUMNS[column]}' "
+                         f"at {key} = {data[table.key_index, row]:g}")
+    for index in (SAT_TEMPERATURE, SAT_PRESSURE):
+        step = np.diff(data[index])
+        if np.any(step < 0):
+            row = np.argmax(step < 0) + 1
+            raise ValueError(f"Column '{SATURATION_COLUMNS[index]}' of table {table.name} decreases "
+                             f"at {key} = {data[table.key_index, row]:g}")
+    for index in (SAT_PRESSURE, SAT_VF, SAT_VG):
+        if np.any(data[index] <= 0):
+            row = np.argmax(data[index] <= 0)
+            raise ValueError(f"Column '{SATURATION_COLUMNS[index]}' of table {table.name} is not positive "
+                             f"at {key} = {data[table.key_index, row]:g}")
+    for f, g in zip(SAT_LIQUID, SAT_VAPOR):
+        if np.any(data[g] < data[f]):
+            row = np.argmax(data[g] < data[f])
+            raise ValueError(f"Column '{SATURATION_COLUMNS[g]}' of table {table.name} is below "
+                             f"'{SATURATION_COLUMNS[f]}' at {key} = {data[table.key_index, row]:g}")
+
+def interpolate_saturation(table, value, out=None, clamp=False):
+    """
+    Linearly interpolate every column of a saturation table at `value` on
+    its key axis. Accepts a scalar (returns shape (columns,)) or an array
+    (returns shape (columns, ...)). Values outside the table give NaN in
+    every column but the key, or with `clamp` the first/last row. With `out`
+    (a float64 array of the result shape) the result is written there
+    instead of a new array.
+    """
+    key = table.key
+    value = np.asarray(value, dtype=np.float64)
+    clamped = np.clip(value, key[0], key[-1])
+    i = _bracket(key, clamped)
+    if out is None:
+        out = np.empty(table.data.shape[:1] + value.shape)
+    np.take(table.slopes, i, axis=1, out=out)
+    out *= clamped - key[i]
+    out += table.data[:, i]
+    if clamp:
+        out[table.key_index] = clamped
+    else:
+        # NaN keys are outside too
+        np.copyto(out, np.nan, where=clamped != value)
+        out[table.key_index] = value
+    return out
+
+# Compiled tables for raw DataFrames handed to the lookup functions directly
+_compiled_frames = {}
+
+def compiled_saturation_table(df):
+    """Return the compiled form of `df`, compiling it on first use."""
+    if isinstance(df, SaturationTable):
+        return df
+    table = _compiled_frames.get(id(df))
+    if table is None:
+        table = compile_saturation_table(df)
+        _compiled_frames[id(df)] = table
+        weakref.finalize(df, _compiled_frames.pop, id(df), None)
+    return table
+
+class PropertyGrid:
+    """
+    Superheated / compressed-liquid sheet compiled into a dense grid.
+
+    `values` has shape (pressure, temperature, property) with properties in
+    GRID_PROPERTIES order. Cells between tabulated temperatures of a pressure
+    block (including its Sat row at `t_sat`) are filled by linear
+    interpolation; every other cell is NaN, so a block never holds values on
+    the far side of its saturation temperature. interpolate_grid bridges the
+    dome edge between two blocks with their Sat nodes instead.
+    """
+    __slots__ = ('name', 'pressures', 'temperatures', 'values', 't_sat', 't_min', 't_max', '__weakref__')
+
+    def __init__(self, name, pressures, temperatures, values, t_sat, t_min, t_max):
+        self.name = name
+        self.pressures = np.ascontiguousarray(pressures, dtype=np.float64)
+        self.temperatures = np.ascontiguousarray(temperatures, dtype=np.float64)
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.t_sat = np.ascontiguousarray(t_sat, dtype=np.float64)
+        self.t_min = np.ascontiguousarray(t_min, dtype=np.float64)
+        self.t_max = np.ascontiguousarray(t_max, dtype=np.float64)
+
+    def __repr__(self):
+        return (f"PropertyGrid({self.name!r}, pressures={self.pressures.shape[0]}, "
+                f"temperatures={self.temperatures.shape[0]})")
+
+def _to_float(value):
+    try:
+        value = float(str(value).strip())
+    except ValueError:
+        return None
+    return None if np.isnan(value) else value
+
+def parse_pressure_blocks(raw):
+    """
+    Split a raw SHV/CL sheet into pressure blocks.
+
+    The sheets stack sections vertically, each a 'Temp. (C)' header row, a row
+    of 'p = ... bar, Tsat = ...' titles (one per group of four v/u/h/s
+    columns) and then 'Sat.' or numeric temperature rows. Returns a list of
+    (pressure, tsat, temperatures, values, sat_values) tuples with the value
+    columns in GRID_PROPERTIES order, as read from the header row.
+    """
+    cells = raw.to_numpy(dtype=object)
+    # Accept frames read with the first row promoted to the header
+    if str(raw.columns[0]).strip() == 'Temp. (C)':
+        cells = np.vstack([np.array(raw.columns, dtype=object), cells])
+
+    blocks = []
+    current = []
+    header = [None] * cells.shape[1]
+    for r in range(cells.shape[0]):
+        first = str(cells[r, 0]).strip()
+        if first == 'Temp. (C)':
+            blocks.extend(current)
+            current = []
+            header = [grid_property_index(h) for h in cells[r]]
+            continue
+        titles = [(c, str(cells[r, c])) for c in range(cells.shape[1]) if 'p =' in str(cells[r, c])]
+        if titles:
+            for c, title in titles:
+                pressure = float(_PRESSURE_HEADER.search(title).group(1))
+                tsat = _TSAT_HEADER.search(title)
+                order = header[c:c + 4]
+                if order == [None] * 4:
+                    order = list(range(4))
+                elif set(order) != set(range(4)):
+                    raise ValueError(f"Unrecognised property columns under '{title.strip()}'")
+                current.append([pressure, float(tsat.group(1)) if tsat else None, c, [], [], None, order,
+                                title.strip()])
+            continue
+        for block in current:
+            c = block[2]
+            values = [_to_float(v) for v in cells[r, c:c + 4]]
+            if len(values) < 4 or values.count(None) == 4:
+                continue
+            if None in values:
+                raise ValueError(f"Non-numeric value in row '{first}' under '{block[7]}': "
+                                 f"{list(cells[r, c:c + 4])}")
+            if first.startswith('Sat'):
+                block[5] = values
+            else:
+                temperature = _to_float(cells[r, 0])
+                if temperature is not None:
+                    block[3].append(temperature)
+                    block[4].append(values)
+    blocks.extend(current)
+
+    parsed = []
+    for pressure, tsat, _, temps, values, sat, order, _ in blocks:
+        columns = np.argsort(order)
+        values = np.array(values).reshape(-1, 4)[:, columns]
+        parsed.append((pressure, tsat, np.array(temps), values,
+                       None if sat is None else np.array(sat)[columns]))
+    return parsed
+
+def compile_property_grid(raw, name=None, saturation_side='low'):
+    """
+    Compile a raw SHV ('low' saturation side) or CL ('high') sheet into a PropertyGrid.
+    A block's Sat row must be its coldest row on the low side and its
+    hottest on the high side.
+    """
+    blocks = sorted(parse_pressure_blocks(raw), key=lambda block: block[0])
+    pressures = np.array([block[0] for block in blocks])
+    if pressures.shape[0] < 2 or np.any(np.diff(pressures) <= 0):
+        raise ValueError(f"Table {name} needs at least two distinct pressure blocks")
+
+    # Saturation temperatures join the axis so the dome edge is a grid node
+    saturation_temps = [block[1] for block in blocks if block[1] is not None and block[4] is not None]
+    temperatures = np.unique(np.concatenate([block[2] for block in blocks] + [saturation_temps]))
+    values = np.full((pressures.shape[0], temperatures.shape[0], len(GRID_PROPERTIES)), np.nan)
+    t_sat = np.full(pressures.shape[0], np.nan)
+    t_min = np.empty(pressures.shape[0])
+    t_max = np.empty(pressures.shape[0])
+
+    for i, (pressure, tsat, temps, block_values, sat_values) in enumerate(blocks):
+        if tsat is not None and sat_values is not None:
+            t_sat[i] = tsat
+            temps = np.append(temps, tsat)
+            block_values = np.vstack([block_values, sat_values])
+        temps, unique = np.unique(temps, return_index=True)
+        block_values = block_values[unique]
+        t_min[i], t_max[i] = temps[0], temps[-1]
+        if not np.isnan(t_sat[i]) and t_sat[i] != (t_min[i] if saturation_side == 'low' else t_max[i]):
+            raise ValueError(f"Sat row of block p = {pressure:g} bar in table {name} is not on its "
+                             f"{saturation_side} temperature side")
+
+        inside = (temperatures >= temps[0]) & (temperatures <= temps[-1])
+        for k in range(len(GRID_PROPERTIES)):
+            values[i, inside, k] = np.interp(temperatures[inside], temps, block_values[:, k])
+
+    grid = PropertyGrid(name, pressures, temperatures, values, t_sat, t_min, t_max)
+    validate_property_grid(grid)
+    return grid
+
+def validate_property_grid(grid):
+    """
+    Reject a compiled SHV/CL grid whose axes are not strictly increasing, or
+    that has missing or non-numeric values, or non-positive pressures or
+    volumes, anywhere inside a block's tabulated temperature range, or any
+    value outside it.
+    """
+    for axis_name, axis in (("pressure", grid.pressures), ("temperature", grid.temperatures)):
+        if axis.shape[0] < 2 or not np.all(np.isfinite(axis)) or np.any(np.diff(axis) <= 0):
+            raise ValueError(f"The {axis_name} axis of table {grid.name} is not strictly increasing")
+    if grid.pressures[0] <= 0:
+        raise ValueError(f"Table {grid.name} has a non-positive pressure block p = {grid.pressures[0]:g} bar")
+    inside = (grid.temperatures >= grid.t_min[:, None]) & (grid.temperatures <= grid.t_max[:, None])
+    for k, prop in enumerate(GRID_PROPERTIES):
+        bad = inside & ~np.isfinite(grid.values[..., k])
+        if k == 0:
+            bad |= inside & (grid.values[..., k] <= 0)
+        if bad.any():
+            i, j = np.argwhere(bad)[0]
+            raise ValueError(f"Table {grid.name} has an invalid {prop} at p = {grid.pressures[i]:g} bar, "
+                             f"T = {grid.temperatures[j]:g} C")
+    stray = ~inside & ~np.isnan(grid.values).all(axis=-1)
+    if stray.any():
+        i, j = np.argwhere(stray)[0]
+        raise ValueError(f"Table {grid.name} has values outside the tabulated range at "
+                         f"p = {grid.pressures[i]:g} bar, T = {grid.temperatures[j]:g} C")
+
+def _bracket(axis, x):
+    """Index of the lower end of the interval of `axis` containing `x`."""
+    return np.clip(np.searchsorted(axis, x, side='right') - 1, 0, axis.shape[0] - 2)
+
+def _lerp(a, b, w, out=None):
+    """
+    Linear interpolation that returns an end value exactly when the weight
+    is 0 or 1, so a query on a grid node never picks up a NaN neighbour.
+    """
+    if out is None:
+        out = np.empty(np.broadcast_shapes(np.shape(a), np.shape(b), np.shape(w)))
+    np.multiply(a, 1 - w, out=out)
+    out += b * w
+    np.copyto(out, a, where=(w == 0))
+    np.copyto(out, b, where=(w == 1))
+    return out
+
+# Halvings of a dome-cell temperature bracket in solve_grid_temperature (a few degrees to ~1e-12)
+_BISECTION_STEPS = 48
+
+def _saturation_nodes(grid, blocks):
+    """Column of the temperature axis holding the Sat row of each of `blocks` (which must have one)."""
+    return np.searchsorted(grid.temperatures, grid.t_sat[blocks])
+
+def _vapor_side(grid):
+    """Whether the blocks' Sat rows are their coldest rows (SHV) rather than their hottest (CL)."""
+    return bool(np.any(grid.t_sat == grid.t_min))
+
+def _interpolate_cells(grid, temperature, ip, wp, props=slice(None), out=None, it=None):
+    """
+    interpolate_grid between pressure blocks `ip` and `ip + 1` at weight `wp`
+    (shaped (..., 1)) for the GRID_PROPERTIES selected by `props`, without
+    the range check, written into `out` when given. `it`, if known, is the
+    temperature bracket of `temperature`.
+
+    Between two blocks next to the dome one of them has no cell at the
+    query temperature, because it lies past that block's saturation
+    temperature. Those points are interpolated along their isotherm between
+    the block that has the temperature and the dome edge, the straight line
+    joining the two blocks' Sat nodes in (P, T), so nothing is extrapolated.
+    """
+    t_axis = grid.temperatures
+    values = grid.values[..., props]
+    if it is None:
+        it = _bracket(t_axis, temperature)
+    wt = ((temperature - t_axis[it]) / (t_axis[it + 1] - t_axis[it]))[..., None]
+    low = _lerp(values[ip, it], values[ip, it + 1], wt)
+    high = _lerp(values[ip + 1, it], values[ip + 1, it + 1], wt)
+    result = _lerp(low, high, wp, out=out)
+
+    ts0 = grid.t_sat[ip]
+    ts1 = grid.t_sat[ip + 1]
+    w = wp[..., 0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Weight between the blocks at which the isotherm meets the dome edge
+        wd = (temperature - ts0) / (ts1 - ts0)
+    vapor = _vapor_side(grid)
+    if vapor:
+        dome = (wd >= w) & (wd < 1)
+    else:
+        dome = (wd <= w) & (wd > 0)
+    dome &= np.isnan(result[..., 0])
+    if not dome.any():
+        return result
+
+    i = ip[dome]
+    wd = wd[dome]
+    w = w[dome]
+    k = it[dome]
+    wt = wt[dome]
+    edge = _lerp(values[i, _saturation_nodes(grid, i)], values[i + 1, _saturation_nodes(grid, i + 1)], wd[:, None])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if vapor:
+            side = _lerp(values[i, k], values[i, k + 1], wt)
+            result[dome] = _lerp(side, edge, (w / wd)[:, None])
+        else:
+            side = _lerp(values[i + 1, k], values[i + 1, k + 1], wt)
+            result[dome] = _lerp(edge, side, ((w - wd) / (1 - wd))[:, None])
+    return result
+
+def interpolate_grid(grid, temperature, pressure, out=None):
+    """
+    Bilinear interpolation of all grid properties at once.
+
+    Accepts scalars or arrays and returns an array of shape (..., 4) in
+    GRID_PROPERTIES order, written into `out` when given; points outside
+    the tabulated range, including the far side of the dome, are NaN.
+    """
+    temperature = np.asarray(temperature, dtype=np.float64)
+    pressure = np.asarray(pressure, dtype=np.float64)
+    temperature, pressure = np.broadcast_arrays(temperature, pressure)
+
+    p_axis = grid.pressures
+    t_axis = grid.temperatures
+    ip = _bracket(p_axis, pressure)
+    wp = ((pressure - p_axis[ip]) / (p_axis[ip + 1] - p_axis[ip]))[..., None]
+    result = _interpolate_cells(grid, temperature, ip, wp, out=out)
+
+    outside = ((pressure < p_axis[0]) | (pressure > p_axis[-1]) |
+               (temperature < t_axis[0]) | (temperature > t_axis[-1]))
+    result[outside] = np.nan
+    return result
+
+_compiled_grids = {}
+
+def compiled_property_grid(df, saturation_side='low'):
+    """Return the compiled form of a raw SHV/CL frame, compiling it on first use."""
+    if isinstance(df, PropertyGrid):
+        return df
+    grid = _compiled_grids.get(id(df))
+    if grid is None:
+        grid = compile_property_grid(df, saturation_side=saturation_side)
+        _compiled_grids[id(df)] = grid
+        weakref.finalize(df, _compiled_grids.pop, id(df), None)
+    return grid
+
+def standardize_sheet_name(sheet_name):
+    """Table name used for a sheet of thermo_data.xlsx, e.g. 'Sat Water-Temp Table' -> 'water_temp_table'."""
+    return sheet_name.lower().replace(' ', '_').replace('-', '_').replace('sat_', '').replace('r134a', 'r_134a')
+
+_GRID_SHEET_WORDS = re.compile(r'\b(superheated|compressed|liquid|vapor)\b', re.IGNORECASE)
+
+def grid_table_name(sheet_name, suffix):
+    """Table name for an SHV/CL sheet, e.g. ('Superheated R-134a Vapor', 'shv_table') -> 'r_134a_shv_table'."""
+    substance = ' '.join(_GRID_SHEET_WORDS.sub(' ', sheet_name).split())
+    return f"{standardize_sheet_name(substance)}_{suffix}"
+
+def table_substance(name):
+    """Substance a table name belongs to, e.g. 'r_134a_pressure_table' -> 'r_134a'."""
+    for suffix in ('_pressure_table', '_temp_table', '_shv_table', '_cl_table', '_ideal_table'):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+def solve_grid_temperature(grid, pressure, prop, target):
+    """
+    Inverse lookup T(P, z): the temperature at which grid property `prop`
+    (index into GRID_PROPERTIES) equals `target` at the given pressure.
+
+    Every property increases with temperature along an isobar, so each query
+    is a vectorized bisection over the temperature nodes of the isobar
+    interpolated between the two bracketing pressure blocks, followed by
+    linear interpolation inside the final bracket. Where the blocks have Sat
+    rows the isobar ends at the dome edge, so nodes past it count as that end
+    point; other missing cells count as -inf below a block's first row and
+    +inf past its last. Consistent with interpolate_grid; NaN where the
+    target is outside the table.
+    """
+    pressure = np.asarray(pressure, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    pressure, target = np.broadcast_arrays(pressure, target)
+
+    p_axis = grid.pressures
+    t_axis = grid.temperatures
+    ip = _bracket(p_axis, pressure)
+    wp = ((pressure - p_axis[ip]) / (p_axis[ip + 1] - p_axis[ip]))[..., None]
+    cold_end = np.maximum(grid.t_min[ip], grid.t_min[ip + 1])
+    props = slice(prop, prop + 1)
+
+    # Where the isobar meets the dome edge between the two blocks' Sat nodes
+    t_edge = _lerp(grid.t_sat[ip], grid.t_sat[ip + 1], wp[..., 0])
+    z_edge = np.full(pressure.shape, np.nan)
+    has_edge = ~np.isnan(t_edge)
+    if has_edge.any():
+        i = ip[has_edge]
+        z_edge[has_edge] = _lerp(grid.values[i, _saturation_nodes(grid, i), prop],
+                                 grid.values[i + 1, _saturation_nodes(grid, i + 1), prop], wp[has_edge, 0])
+    past_edge = np.greater if not _vapor_side(grid) else np.less
+
+    last = t_axis.shape[0] - 2
+
+    def isobar(k):
+        temperature = t_axis[k]
+        value = _interpolate_cells(grid, temperature, ip, wp, props, it=np.minimum(k, last))[..., 0]
+        beyond = past_edge(temperature, t_edge)
+        temperature = np.where(beyond, t_edge, temperature)
+        value = np.where(beyond, z_edge, value)
+        missing = np.where(temperature < cold_end, -np.inf, np.inf)
+        return temperature, np.where(np.isnan(value), missing, value)
+
+    lo = np.zeros(target.shape, dtype=np.intp)
+    hi = np.full(target.shape, t_axis.shape[0] - 1, dtype=np.intp)
+    while True:
+        active = hi - lo > 1
+        if not active.any():
+            break
+        mid = (lo + hi) // 2
+        below = isobar(mid)[1] <= target
+        lo = np.where(active & below, mid, lo)
+        hi = np.where(active & ~below, mid, hi)
+
+    t_lo, z_lo = isobar(lo)
+    t_hi, z_hi = isobar(hi)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        temperature = t_lo + (target - z_lo) * (t_hi - t_lo) / (z_hi - z_lo)
+    temperature = np.where(target == z_hi, t_hi, np.where(target == z_lo, t_lo, temperature))
+    # An infinite end only brackets a target sitting exactly on the other one
+    valid = ((target >= z_lo) & (target <= z_hi) & np.isfinite(z_lo) & np.isfinite(z_hi) |
+             (target == z_lo) | (target == z_hi)) & (pressure >= p_axis[0]) & (pressure <= p_axis[-1])
+
+    # Next to the dome the isobar is not linear between nodes; bisect those brackets
+    curved = valid & (t_lo < grid.t_sat[ip + 1]) & (t_hi > grid.t_sat[ip])
+    if curved.any():
+        i = ip[curved]
+        w = wp[curved]
+        z = target[curved]
+        lo_t = t_lo[curved]
+        hi_t = t_hi[curved]
+        for _ in range(_BISECTION_STEPS):
+            mid = 0.5 * (lo_t + hi_t)
+            below = _interpolate_cells(grid, mid, i, w, props)[..., 0] <= z
+            lo_t = np.where(below, mid, lo_t)
+            hi_t = np.where(below, hi_t, mid)
+        temperature[curved] = np.where(target[curved] == z_lo[curved], t_lo[curved],
+                                       np.where(target[curved] == z_hi[curved], t_hi[curved], 0.5 * (lo_t + hi_t)))
+    return np.where(valid, temperature, np.nan)
+
+def solve_grid_pressure(grid, temperature, prop, target):
+    """
+    Inverse lookup P(T, z): the pressure at which grid property `prop`
+    equals `target` at the given temperature.
+
+    Along an isotherm a property may rise or fall with pressure and the hot
+    end of low-pressure blocks is missing, so instead of bisection this
+    scans the (short) pressure axis for the first segment whose end values
+    bracket the target. A segment crossed by the dome edge is cut there, as
+    in interpolate_grid. NaN where no segment does.
+    """
+    temperature = np.asarray(temperature, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    temperature, target = np.broadcast_arrays(temperature, target)
+
+    p_axis = grid.pressures
+    t_axis = grid.temperatures
+    it = _bracket(t_axis, temperature)
+    wt = ((temperature - t_axis[it]) / (t_axis[it + 1] - t_axis[it]))[..., None]
+    column = grid.values[..., prop]
+    # Isotherm through every pressure node, shape (..., nP)
+    isotherm = _lerp(column[:, it].T, column[:, it + 1].T, wt)
+    isotherm = isotherm.reshape(target.shape + (p_axis.shape[0],))
+
+    # The dome edge cuts at most one segment of each isotherm: keep its part on this side
+    vapor = _vapor_side(grid)
+    blocks = np.flatnonzero(~np.isnan(grid.t_sat))
+    j = np.searchsorted(grid.t_sat[blocks], temperature, side='right' if vapor else 'left') - 1
+    j = np.clip(j, 0, max(blocks.shape[0] - 2, 0))
+    cut = np.full(target.shape, -1, dtype=np.intp)
+    if blocks.shape[0] > 1:
+        k = blocks[j]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            wd = (temperature - grid.t_sat[k]) / (grid.t_sat[blocks[j + 1]] - grid.t_sat[k])
+        cut = np.where((blocks[j + 1] == k + 1) & ((wd >= 0) & (wd < 1) if vapor else (wd > 0) & (wd <= 1)),
+                       k, -1)
+    cuts = cut >= 0
+    if cuts.any():
+        k = cut[cuts]
+        wd = wd[cuts]
+        edge_value = _lerp(column[k, _saturation_nodes(grid, k)], column[k + 1, _saturation_nodes(grid, k + 1)], wd)
+        edge_pressure = _lerp(p_axis[k], p_axis[k + 1], wd)
+        isotherm = isotherm.reshape(-1, p_axis.shape[0])
+        rows = np.flatnonzero(cuts)
+        z0 = isotherm[:, :-1].copy()
+        z1 = isotherm[:, 1:].copy()
+        (z1 if vapor else z0)[rows, k] = edge_value
+        z0 = z0.reshape(target.shape + (-1,))
+        z1 = z1.reshape(target.shape + (-1,))
+    else:
+        z0 = isotherm[..., :-1]
+        z1 = isotherm[..., 1:]
+
+    t = target[..., None]
+    crosses = ((z0 - t) * (z1 - t) <= 0) & (z0 != z1)
+    found = crosses.any(axis=-1)
+    k = np.argmax(crosses, axis=-1)
+
+    z_lo = np.take_along_axis(z0, k[..., None], -1)[..., 0]
+    z_hi = np.take_along_axis(z1, k[..., None], -1)[..., 0]
+    p_lo = p_axis[k]
+    p_hi = p_axis[k + 1]
+    if cuts.any():
+        # Segments that were cut end (vapor) or start (liquid) at the dome edge
+        edge = np.full(target.shape, np.nan)
+        edge[cuts] = edge_pressure
+        if vapor:
+            p_hi = np.where(k == cut, edge, p_hi)
+        else:
+            p_lo = np.where(k == cut, edge, p_lo)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pressure = p_lo + (target - z_lo) * (p_hi - p_lo) / (z_hi - z_lo)
+    valid = found & (temperature >= t_axis[0]) & (temperature <= t_axis[-1])
+    return np.where(valid, pressure, np.nan)
+
+class IdealGasTable:
+    """
+    Ideal-gas properties of one gas as a function of temperature alone.
+
+    `data` has one contiguous row per IDEAL_COLUMNS entry over strictly
+    increasing temperatures (K); h, u and s° are per kg when `basis` is
+    'mass' and per kmol when it is 'molar'. `slopes` holds the per-segment
+    derivative of every row with respect to temperature. Only ratios of the
+    relative pressure and volume are meaningful.
+    """
+    __slots__ = ('name', 'basis', 'molar_mass', 'data', 'slopes', 'temperatures', '__weakref__')
+
+    def __init__(self, name, basis, molar_mass, data, slopes=None):
+        if basis not in ('mass', 'molar'):
+            raise ValueError(f"Unknown basis '{basis}' for table {name}")
+        self.name = name
+        self.basis = basis
+        self.molar_mass = float(molar_mass)
+        self.data = np.ascontiguousarray(data, dtype=np.float64)
+        if self.data.shape[0] != len(IDEAL_COLUMNS):
+            raise ValueError(f"Table {name} has {self.data.shape[0]} columns, expected {len(IDEAL_COLUMNS)}")
+        self.temperatures = self.data[IDEAL_TEMPERATURE]
+        if slopes is None:
+            slopes = np.diff(self.data, axis=1) / np.diff(self.temperatures)
+        self.slopes = np.ascontiguousarray(slopes, dtype=np.float64)
+
+    @property
+    def gas_constant(self):
+        """R in the units of the table: kJ/kg/K or kJ/kmol/K."""
+        return GAS_CONSTANT / self.molar_mass if self.basis == 'mass' else GAS_CONSTANT
+
+    def __len__(self):
+        return self.temperatures.shape[0]
+
+    def __repr__(self):
+        return f"IdealGasTable({self.name!r}, basis={self.basis!r}, rows={len(self)})"
+
+def ideal_gas_table_name(sheet_name):
+    """Table name for a sheet of ideal_table.xlsx, e.g. 'H2O' -> 'water_ideal_table'."""
+    substance = standardize_sheet_name(sheet_name)
+    return f"{_IDEAL_GAS_SUBSTANCES.get(substance, substance)}_ideal_table"
+
+def ideal_column_index(header):
+    """Column of the ideal-gas schema a sheet header belongs to, or None."""
+    text = str(header).strip().lower() + ' '
+    for prefix, index in _IDEAL_HEADERS:
+        if text.startswith(prefix):
+            return index
+    return None
+
+def compile_ideal_gas_table(raw, name=None):
+    """
+    Compile a raw ideal-gas sheet (read with header=None) into an IdealGasTable.
+
+    The sheets lay the table out as side-by-side groups of columns, each
+    starting with a 'Temp. [K]' header; the groups are stacked and sorted by
+    temperature. The basis comes from the units of the h header ('kJ/kg' or
+    'kJ/kmol'). Sheets without pr and vr columns get them from s°:
+    pr = exp((s° - s°_1) / R), with s°_1 at the lowest positive temperature,
+    and vr = T / pr.
+    """
+    cells = raw.to_numpy(dtype=object)
+    header = [ideal_column_index(h) if isinstance(h, str) else None for h in cells[0]]
+    starts = [c for c, index in enumerate(header) if index == IDEAL_TEMPERATURE]
+    if not starts:
+        raise ValueError(f"Table {name} has no 'Temp. [K]' column")
+
+    groups = []
+    found = None
+    h_header = None
+    for start in starts:
+        columns = {}
+        for c in range(start, len(header)):
+            if header[c] is None or (c > start and header[c] == IDEAL_TEMPERATURE):
+                break
+            if header[c] in columns:
+                raise ValueError(f"Duplicate column '{cells[0, c]}' in table {name}")
+            columns[header[c]] = c
+        if found is not None and set(columns) != found:
+            raise ValueError(f"Column groups of table {name} have different columns")
+        found = set(columns)
+        if IDEAL_H in columns:
+            h_header = str(cells[0, columns[IDEAL_H]])
+        block = np.full((len(IDEAL_COLUMNS), cells.shape[0] - 1), np.nan)
+        for index, c in columns.items():
+            block[index] = pd.to_numeric(pd.Series(cells[1:, c]).astype(str).str.strip(),
+                                         errors='coerce').to_numpy(dtype=np.float64)
+        groups.append(block)
+
+    missing = [IDEAL_COLUMNS[i] for i in (IDEAL_TEMPERATURE, IDEAL_H, IDEAL_U, IDEAL_S0) if i not in found]
+    if missing:
+        raise ValueError(f"Table {name} is missing columns {missing}")
+    basis = 'molar' if 'kmol' in h_header else 'mass'
+    substance = table_substance(name) if name else None
+    if substance not in MOLAR_MASS:
+        raise ValueError(f"No molar mass known for table {name}")
+
+    data = np.hstack(groups)
+    data = data[:, ~np.isnan(data[IDEAL_TEMPERATURE])]
+    data = data[:, np.argsort(data[IDEAL_TEMPERATURE], kind='stable')]
+    if np.any(np.diff(data[IDEAL_TEMPERATURE]) <= 0):
+        raise ValueError(f"Temperature column of table {name} has duplicate values")
+
+    if IDEAL_PR not in found:
+        r = GAS_CONSTANT / MOLAR_MASS[substance] if basis == 'mass' else GAS_CONSTANT
+        temperature = data[IDEAL_TEMPERATURE]
+        s_ref = data[IDEAL_S0][np.argmax(temperature > 0)]
+        data[IDEAL_PR] = np.exp((data[IDEAL_S0] - s_ref) / r)
+        data[IDEAL_VR] = temperature / data[IDEAL_PR]
+    elif IDEAL_VR not in found:
+        data[IDEAL_VR] = data[IDEAL_TEMPERATURE] / data[IDEAL_PR]
+
+    table = IdealGasTable(name, basis, MOLAR_MASS[substance], data)
+    validate_ideal_gas_table(table)
+    return table
+
+def validate_ideal_gas_table(table):
+    """
+    Reject an ideal-gas table with fewer than two rows, missing or
+    non-numeric cells, negative temperatures, h, u, s° or pr not strictly
+    increasing with temperature, or vr not strictly decreasing above 0 K
+    (the inverse lookups rely on it).
+    """
+    data = table.data
+    if data.shape[1] < 2:
+        raise ValueError(f"Table {table.name} needs at least two rows")
+    bad = ~np.isfinite(data)
+    if bad.any():
+        column, row = np.argwhere(bad)[0]
+        raise ValueError(f"Table {table.name} has a missing or non-numeric '{IDEAL_COLUMNS[column]}' "
+                         f"at T = {data[IDEAL_TEMPERATURE, row]:g} K")
+    if data[IDEAL_TEMPERATURE, 0] < 0:
+        raise ValueError(f"Table {table.name} has a negative temperature")
+    for index in (IDEAL_H, IDEAL_U, IDEAL_S0, IDEAL_PR):
+        step = np.diff(data[index])
+        if np.any(step <= 0):
+            row = np.argmax(step <= 0) + 1
+            raise ValueError(f"Column '{IDEAL_COLUMNS[index]}' of table {table.name} does not increase "
+                             f"at T = {data[IDEAL_TEMPERATURE, row]:g} K")
+    start = int(np.argmax(data[IDEAL_TEMPERATURE] > 0))
+    if np.any(np.diff(data[IDEAL_VR, start:]) >= 0):
+        raise ValueError(f"Column 'vr' of table {table.name} does not decrease with temperature")
+
+def interpolate_ideal_gas(table, temperature, column):
+    """
+    Linearly interpolate column `column` (an IDEAL_* index) of an ideal-gas
+    table at `temperature` (K, scalar or array); NaN outside the table.
+    """
+    temperature = np.asarray(temperature, dtype=np.float64)
+    axis = table.temperatures
+    i = _bracket(axis, temperature)
+    result = table.data[column, i] + table.slopes[column, i] * (temperature - axis[i])
+    return np.where((temperature >= axis[0]) & (temperature <= axis[-1]), result, np.nan)
+
+def solve_ideal_gas_temperature(table, column, value):
+    """
+    Inverse lookup T(z) from column `column` of an ideal-gas table. h, u, s°
+    and pr increase with temperature; vr decreases and is searched from the
+    first positive temperature, since it is 0 at 0 K. Exact inverse of
+    interpolate_ideal_gas; NaN where `value` is outside the table.
+    """
+    value = np.asarray(value, dtype=np.float64)
+    axis = table.data[column]
+    temperatures = table.temperatures
+    slopes = table.slopes[column]
+    if column == IDEAL_VR:
+        start = int(np.argmax(temperatures > 0))
+        axis, temperatures, slopes, value = -axis[start:], temperatures[start:], -slopes[start:], -value
+    i = _bracket(axis, value)
+    result = temperatures[i] + (value - axis[i]) / slopes[i]
+    return np.where((value >= axis[0]) & (value <= axis[-1]), result, np.nan)